@@ -1,22 +1,32 @@
 # CORRECTED views.py
+# Explicit imports only: this module is on the path of /api/auth/login/, so
+# anything a cold worker does not need to serve it (token blacklist, the
+# password-hashing pool) is imported inside the action that uses it.
+# Check the effect with `python manage.py profile_startup`.
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework import status
-from django.utils import timezone
-from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework_gis.filters import InBBoxFilter
-from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.parsers import MultiPartParser, JSONParser
 from django.contrib.auth import authenticate
-from django.db.models import Q, Sum, Avg
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
-from .models import *
-from .serializers import *
-from .serializers import UserRegistrationSerializer
+from .models import User
+from .serializers import (
+    LoginSerializer, UserBulkRegistrationSerializer, UserRegistrationSerializer, UserSerializer,
+)
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import ClaimsJWTAuthentication, get_model_user
+from .parsers import CSVParser, parse_csv_rows
+from .login_executor import LoginRejected, get_login_verifier, use_login_verifier
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from .pagination import (
+    USER_LIST_FIELDS, USER_MAX_PAGE_SIZE, USER_PAGE_SIZE,
+    approximate_count, decode_cursor, encode_cursor,
+)
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
@@ -24,6 +34,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
         token['email'] = user.email
         token['role'] = getattr(user, 'role', 'Viewer')
+        token['username'] = user.username
         return token
 
 class CustomTokenObtainPairView(TokenObtainPairView):
@@ -34,7 +45,7 @@ class AuthViewSet(viewsets.GenericViewSet):
     """
     Authentication viewset for login, logout, and user management
     """
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     
     def get_permissions(self):
         """
@@ -42,7 +53,7 @@ class AuthViewSet(viewsets.GenericViewSet):
         """
         if self.action in ['login']:
             permission_classes = [permissions.AllowAny]
-        elif self.action in ['register', 'users']:
+        elif self.action in ['register', 'bulk_register', 'users', 'login_metrics']:
             permission_classes = [IsAuthenticated, IsAdminUser]
         else:
             permission_classes = [IsAuthenticated]
@@ -59,7 +70,23 @@ class AuthViewSet(viewsets.GenericViewSet):
             username = serializer.validated_data['username']
             password = serializer.validated_data['password']
             
-            user = authenticate(username=username, password=password)
+            if use_login_verifier(request):
+                try:
+                    user = get_login_verifier().authenticate(username=username, password=password)
+                except LoginRejected as exc:
+                    return Response(
+                        {'error': 'Too many logins in progress, please retry shortly'},
+                        status=status.HTTP_429_TOO_MANY_REQUESTS,
+                        headers={'Retry-After': str(exc.retry_after)}
+                    )
+                except FutureTimeoutError:
+                    return Response(
+                        {'error': 'Login verification timed out, please retry'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        headers={'Retry-After': '1'}
+                    )
+            else:
+                user = authenticate(username=username, password=password)
             if user and user.is_active:
                 # Generate JWT tokens
                 refresh = RefreshToken.for_user(user)
@@ -68,6 +95,7 @@ class AuthViewSet(viewsets.GenericViewSet):
                 # Add custom claims
                 access_token['email'] = user.email
                 access_token['role'] = getattr(user, 'role', 'Viewer')
+                access_token['username'] = user.username
                 
                 return Response({
                     'access': str(access_token),
@@ -82,6 +110,14 @@ class AuthViewSet(viewsets.GenericViewSet):
                 )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['get'], url_path='login-metrics')
+    def login_metrics(self, request):
+        """
+        Login verifier queue-wait / verify-time histograms (Admin only)
+        GET /api/auth/login-metrics/
+        """
+        return Response(get_login_verifier().snapshot())
+
     @action(detail=False, methods=['post'])
     def logout(self, request):
         """
@@ -93,7 +129,8 @@ class AuthViewSet(viewsets.GenericViewSet):
             # if using django-rest-framework-simplejwt with blacklist app
             refresh_token = request.data.get("refresh")
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                from .token_blacklist import BloomRefreshToken
+                token = BloomRefreshToken(refresh_token)
                 token.blacklist()
         except Exception as e:
             pass  # Token might already be invalid
@@ -106,7 +143,7 @@ class AuthViewSet(viewsets.GenericViewSet):
         Get current user profile
         GET /api/auth/profile/
         """
-        return Response(UserSerializer(request.user).data)
+        return Response(UserSerializer(get_model_user(request.user)).data)
     
     @action(detail=False, methods=['post'])
     def register(self, request):
@@ -123,19 +160,136 @@ class AuthViewSet(viewsets.GenericViewSet):
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'], url_path='register/bulk',
+            parser_classes=[JSONParser, CSVParser, MultiPartParser])
+    def bulk_register(self, request):
+        """
+        Admin-only bulk registration from a JSON array, a text/csv body or a
+        multipart CSV upload ("file"), with columns username, email, first_name,
+        last_name, role, password
+        POST /api/auth/register/bulk/
+        Passwords are hashed on a process pool and users inserted with bulk_create.
+        """
+        if 'file' in request.FILES:
+            rows = parse_csv_rows(request.FILES['file'].file)
+        else:
+            rows = request.data
+        if not isinstance(rows, list) or not rows:
+            return Response(
+                {'error': 'Expected a non-empty JSON array or CSV file'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_rows = getattr(settings, 'BULK_REGISTER_MAX_ROWS', 10000)
+        if len(rows) > max_rows:
+            return Response(
+                {'error': f'At most {max_rows} users per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [None] * len(rows)
+        valid = []
+        seen = {}
+        for i, row in enumerate(rows):
+            serializer = UserBulkRegistrationSerializer(data=row)
+            if not serializer.is_valid():
+                results[i] = {'row': i, 'status': 'error', 'errors': serializer.errors}
+                continue
+            username = serializer.validated_data['username']
+            if username in seen:
+                results[i] = {'row': i, 'status': 'error',
+                              'errors': {'username': [f'Duplicate of row {seen[username]}']}}
+                continue
+            seen[username] = i
+            valid.append((i, serializer.validated_data))
+
+        taken = set(User.objects.filter(username__in=list(seen)).values_list('username', flat=True))
+        pending = []
+        for i, data in valid:
+            if data['username'] in taken:
+                results[i] = {'row': i, 'status': 'error',
+                              'errors': {'username': ['A user with that username already exists.']}}
+            else:
+                pending.append((i, data))
+
+        if pending:
+            from .hashing import hash_passwords
+            hashes = hash_passwords([data['password'] for _, data in pending])
+            users = []
+            for (i, data), password_hash in zip(pending, hashes):
+                fields = {k: v for k, v in data.items() if k != 'password'}
+                users.append(User(password=password_hash, **fields))
+            with transaction.atomic():
+                User.objects.bulk_create(users, batch_size=1000)
+            if users and users[0].pk is None:
+                # Backends without RETURNING leave pk unset; read the ids back in one query
+                ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'id'))
+                for user in users:
+                    user.pk = ids.get(user.username)
+            for (i, _), user in zip(pending, users):
+                results[i] = {'row': i, 'status': 'created', 'id': user.pk, 'username': user.username}
+
+        created = sum(1 for r in results if r['status'] == 'created')
+        return Response({
+            'results': results,
+            'count': len(results),
+            'created': created,
+            'errors': len(results) - created
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
     @action(detail=False, methods=['get'])
     def users(self, request):
         """
-        Get all users (Admin only)
-        GET /api/auth/users/
+        Get users, newest first, one keyset page at a time (Admin only)
+        GET /api/auth/users/?cursor=<next_cursor>&page_size=50&include_count=true
+                            &search=<name or email>&role=<role>
+        count is only computed when include_count is set and is an estimate
+        on PostgreSQL (exact when search or role narrows the list).
+        Frontend Integration: authAPI.getUsers (UserManagement load more)
         """
-        users = User.objects.all().order_by('-created_at')
+        try:
+            page_size = min(int(request.query_params.get('page_size', USER_PAGE_SIZE)), USER_MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'page_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if page_size < 1:
+            return Response({'error': 'page_size must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+        users = User.objects.order_by('-created_at', '-id')
+        search = request.query_params.get('search', '').strip()
+        if search:
+            users = users.filter(
+                Q(username__icontains=search) | Q(email__icontains=search)
+                | Q(first_name__icontains=search) | Q(last_name__icontains=search)
+            )
+        role = request.query_params.get('role', '').strip()
+        if role and role.lower() != 'all':
+            users = users.filter(role__iexact=role)
+        filtered = bool(search or (role and role.lower() != 'all'))
+        matching = users
+
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                created_at, pk = decode_cursor(cursor)
+            except ValueError as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            users = users.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        rows = list(users.values(*USER_LIST_FIELDS)[:page_size + 1])
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+        include_count = request.query_params.get('include_count', '').lower() in ('1', 'true', 'yes')
         return Response({
-            'results': UserSerializer(users, many=True).data,
-            'count': users.count()
+            'results': rows,
+            'next_cursor': next_cursor,
+            'count': (matching.count() if filtered else approximate_count(User)) if include_count else None
         })
 
 # CORRECTED serializers.py additions
+from rest_framework.validators import UniqueValidator
+
 class LoginSerializer(serializers.Serializer):
     """
     Login serializer for user authentication
@@ -167,419 +321,6623 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
-# REQUIRED settings.py configuration
-"""
-# Add to your Django settings.py:
+class UserBulkRegistrationSerializer(UserRegistrationSerializer):
+    """
+    Row validation for bulk registration - username uniqueness is checked once
+    for the whole batch instead of one query per row.
+    """
 
-INSTALLED_APPS = [
-    # ... other apps
-    'rest_framework',
-    'rest_framework_simplejwt',
-    'rest_framework_simplejwt.token_blacklist',  # For token blacklisting
-    # ... your apps
-]
+    def get_fields(self):
+        fields = super().get_fields()
+        for field in fields.values():
+            field.validators = [v for v in field.validators if not isinstance(v, UniqueValidator)]
+        return fields
 
-REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ],
-    'DEFAULT_PERMISSION_CLASSES': [
-        'rest_framework.permissions.IsAuthenticated',
-    ],
-}
+# authentication/authentication.py - claims-based JWT authentication with a short-TTL user cache
+import threading
+import time
+from collections import OrderedDict
 
-from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 
-SIMPLE_JWT = {
-    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
-    'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
-    'ROTATE_REFRESH_TOKENS': True,
-    'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
-    'ALGORITHM': 'HS256',
-    'SIGNING_KEY': SECRET_KEY,
-    'VERIFYING_KEY': None,
-    'AUTH_HEADER_TYPES': ('Bearer',),
-    'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
-    'USER_ID_FIELD': 'id',
-    'USER_ID_CLAIM': 'user_id',
-    'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
-    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
-}
 
-# CORS settings if frontend is on different port
-CORS_ALLOWED_ORIGINS = [
-    "http://localhost:3000",  # React dev server
-    "http://127.0.0.1:3000",
-]
+class TTLLRUCache:
+    """
+    Thread-safe in-process cache with a per-entry TTL and LRU eviction
+    once max_size entries are held.
+    """
+    _missing = object()
 
-CORS_ALLOW_CREDENTIALS = True
-"""
+    def __init__(self, max_size=10000, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
 
-# ==============================================================================
-# MATERIALS APP - ALL RESOURCES CONSOLIDATED
-# ==============================================================================
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, self._missing)
+            if item is self._missing:
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
 
-# =================
-# TECHNOLOGY ENTRY MODEL FOR MATERIALS APP
-# =================
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
 
-class TechnologyEntry(models.Model):
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# user id -> {'is_active', 'is_staff', 'is_superuser'} (None for a deleted user)
+user_state_cache = TTLLRUCache(
+    max_size=getattr(settings, 'AUTH_USER_CACHE_MAX_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 30),
+)
+_USER_STATE_FIELDS = ('is_active', 'is_staff', 'is_superuser')
+
+
+class ClaimsUser(TokenUser):
     """
-    Represents a technology entry with irrigation type and all suitability criteria.
-    Example: Pressurized Irrigation Technology -> Drip Irrigation.
-    Frontend Integration: TechnologySelectionStep.tsx, useTechnologySelection.ts
+    Lightweight request.user built from access token claims (user_id, email,
+    role, username) plus the cached active/staff flags. Use get_model_user()
+    when a full User instance is needed.
     """
 
-    TECHNOLOGY_CHOICES = [
-        ('surface', 'Surface Irrigation Technology'),
-        ('subsurface', 'Subsurface Irrigation Technology'),
-        ('pressurized', 'Pressurized Irrigation Technology'),
-    ]
-
-    MAINTENANCE_LEVELS = [
-        ('low', 'Low'),
-        ('medium', 'Medium'),
-        ('high', 'High'),
-    ]
+    def __init__(self, token, state):
+        super().__init__(token)
+        self._state = state
 
-    # Core fields
-    technology_name = models.CharField(max_length=50, choices=TECHNOLOGY_CHOICES)
-    irrigation_type = models.CharField(max_length=100)  # validated on frontend
-    description = models.TextField(blank=True, null=True)
+    @property
+    def is_active(self):
+        return self._state['is_active']
 
-    efficiency = models.DecimalField(max_digits=5, decimal_places=2, help_text="Efficiency in %")
-    water_requirement = models.DecimalField(max_digits=6, decimal_places=2, help_text="Liters/m²/day")
-    lifespan = models.PositiveIntegerField(help_text="Lifespan in years")
-    maintenance_level = models.CharField(max_length=10, choices=MAINTENANCE_LEVELS)
+    @property
+    def is_staff(self):
+        return self._state['is_staff']
 
-    # Suitability criteria
-    suitable_soil_types = models.JSONField(default=list)  
-    suitable_crop_types = models.JSONField(default=list)  
-    suitable_farm_sizes = models.JSONField(default=list)  
-    water_quality_requirements = models.JSONField(default=list)  
-    suitable_topography = models.JSONField(default=list)  
-    climate_zones = models.JSONField(default=list)  
+    @property
+    def is_superuser(self):
+        return self._state['is_superuser']
 
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    @property
+    def email(self):
+        return self.token.get('email', '')
 
-    def __str__(self):
-        return f"{self.get_technology_name_display()} - {self.irrigation_type}"
+    @property
+    def role(self):
+        return self.token.get('role', 'Viewer')
 
-    class Meta:
-        db_table = 'materials_technologyentry'
-        verbose_name_plural = "Technology Entries"
-        unique_together = ['technology_name', 'irrigation_type']
+    def get_model_user(self):
+        return get_user_model().objects.get(pk=self.id)
 
-# =================
 
-# materials/views.py - Add to existing views or create
-class MaterialsViewSet(viewsets.GenericViewSet):
+class ClaimsJWTAuthentication(JWTAuthentication):
     """
-    Materials management viewset for all resources, suitability criteria and costing rules
+    JWTAuthentication that skips loading the User row per request.
+    The active check reads a handful of flags through user_state_cache, which
+    is invalidated by User save/delete in this process and expires after
+    AUTH_USER_CACHE_TTL seconds for changes made elsewhere.
     """
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
-    
-    # RESOURCES ENDPOINTS
-    @action(detail=False, methods=['get'], url_path='materials')
-    def materials(self, request):
-        """
-        Get materials database
-        GET /api/materials/materials/
-        """
-        # Sample data - replace with your actual Material model
-        materials = [
-            {
-                'id': 1,
-                'name': 'PVC Pipe 4"',
-                'category': 'Pipes',
-                'unit': 'meter',
-                'cost_per_unit': 25.50,
-                'supplier': 'Local Supplier A'
-            },
-            {
-                'id': 2,
-                'name': 'Drip Emitter',
-                'category': 'Irrigation Components',
-                'unit': 'piece',
-                'cost_per_unit': 0.75,
-                'supplier': 'Irrigation Co.'
-            }
-        ]
-        return Response(materials)
-    
-    @action(detail=False, methods=['get'], url_path='equipment')
-    def equipment(self, request):
-        """
-        Get equipment database
-        GET /api/materials/equipment/
-        """
-        # Sample data - replace with your actual Equipment model
-        equipment = [
-            {
-                'id': 1,
-                'name': 'Excavator Small',
-                'category': 'Heavy Machinery',
-                'unit': 'hour',
-                'cost_per_unit': 150.00,
-                'supplier': 'Equipment Rental Co.'
-            },
-            {
-                'id': 2,
-                'name': 'Water Pump 5HP',
-                'category': 'Pumps',
-                'unit': 'piece',
-                'cost_per_unit': 850.00,
-                'supplier': 'Pump Solutions Ltd'
-            }
-        ]
-        return Response(equipment)
-    
-    @action(detail=False, methods=['get'], url_path='labor')
-    def labor(self, request):
-        """
-        Get labor rates
-        GET /api/materials/labor/
-        """
-        # Sample data - replace with your actual Labor model
-        labor = [
-            {
-                'id': 1,
-                'category': 'Skilled Technician',
-                'hourly_rate': 25.00,
-                'region': 'Urban',
-                'currency': 'USD'
-            },
-            {
-                'id': 2,
-                'category': 'General Labor',
-                'hourly_rate': 15.00,
-                'region': 'Rural',
-                'currency': 'USD'
-            }
-        ]
-        return Response(labor)
-    
-    @action(detail=False, methods=['get'], url_path='technologies')
-    def technologies(self, request):
-        """
-        Get irrigation technologies with comprehensive data
-        GET /api/materials/technologies/
-        Frontend Integration: useTechnologySelection.ts, TechnologySelectionStep.tsx
-        """
-        # Sample data that matches TechnologyEntry model - replace with actual queryset
-        technologies = [
-            {
-                'id': 1,
-                'technology_name': 'surface',
-                'irrigation_type': 'Basin Irrigation',
-                'description': 'Traditional surface irrigation method suitable for rice and wheat',
-                'efficiency': 60.0,
-                'water_requirement': 1200.0,
-                'lifespan': 15,
-                'maintenance_level': 'low',
-                'suitable_soil_types': ['Clay', 'Loam'],
-                'suitable_crop_types': ['Rice', 'Wheat', 'Maize'],
-                'suitable_farm_sizes': ['Small (< 2 ha)', 'Medium (2-10 ha)'],
-                'water_quality_requirements': ['Fresh Water', 'Groundwater'],
-                'suitable_topography': ['Flat'],
-                'climate_zones': ['Tropical', 'Temperate']
-            },
-            {
-                'id': 2,
-                'technology_name': 'surface',
-                'irrigation_type': 'Furrow Irrigation',
-                'description': 'Row crop irrigation using furrows between crop rows',
-                'efficiency': 65.0,
-                'water_requirement': 1100.0,
-                'lifespan': 12,
-                'maintenance_level': 'low',
-                'suitable_soil_types': ['Sandy', 'Loam'],
-                'suitable_crop_types': ['Vegetables', 'Cotton', 'Maize'],
-                'suitable_farm_sizes': ['Medium (2-10 ha)', 'Large (> 10 ha)'],
-                'water_quality_requirements': ['Fresh Water', 'Groundwater'],
-                'suitable_topography': ['Gentle Slope'],
-                'climate_zones': ['Arid', 'Semi-Arid', 'Temperate']
-            },
-            {
-                'id': 3,
-                'technology_name': 'pressurized',
-                'irrigation_type': 'Drip Irrigation',
-                'description': 'High-efficiency micro-irrigation delivering water directly to root zone',
-                'efficiency': 90.0,
-                'water_requirement': 650.0,
-                'lifespan': 8,
-                'maintenance_level': 'medium',
-                'suitable_soil_types': ['Sandy', 'Loam', 'Clay'],
-                'suitable_crop_types': ['Vegetables', 'Fruits', 'Cotton'],
-                'suitable_farm_sizes': ['Small (< 2 ha)', 'Medium (2-10 ha)', 'Large (> 10 ha)'],
-                'water_quality_requirements': ['Fresh Water', 'Treated Wastewater'],
-                'suitable_topography': ['Flat', 'Gentle Slope', 'Steep Slope'],
-                'climate_zones': ['Arid', 'Semi-Arid', 'Tropical']
-            },
-            {
-                'id': 4,
-                'technology_name': 'pressurized',
-                'irrigation_type': 'Sprinkler Systems',
-                'description': 'Overhead irrigation simulating natural rainfall',
-                'efficiency': 75.0,
-                'water_requirement': 850.0,
-                'lifespan': 12,
-                'maintenance_level': 'medium',
-                'suitable_soil_types': ['Sandy', 'Loam', 'Silt'],
-                'suitable_crop_types': ['Rice', 'Wheat', 'Vegetables', 'Fruits'],
-                'suitable_farm_sizes': ['Medium (2-10 ha)', 'Large (> 10 ha)'],
-                'water_quality_requirements': ['Fresh Water', 'Groundwater'],
-                'suitable_topography': ['Flat', 'Gentle Slope'],
-                'climate_zones': ['Temperate', 'Humid', 'Semi-Arid']
-            },
-            {
-                'id': 5,
-                'technology_name': 'subsurface',
-                'irrigation_type': 'Subsurface Drip',
-                'description': 'Underground drip irrigation for maximum water efficiency',
-                'efficiency': 95.0,
-                'water_requirement': 600.0,
-                'lifespan': 10,
-                'maintenance_level': 'high',
-                'suitable_soil_types': ['Sandy', 'Loam'],
-                'suitable_crop_types': ['Vegetables', 'Fruits', 'Cotton'],
-                'suitable_farm_sizes': ['Small (< 2 ha)', 'Medium (2-10 ha)'],
-                'water_quality_requirements': ['Fresh Water', 'Treated Wastewater'],
-                'suitable_topography': ['Flat', 'Gentle Slope'],
-                'climate_zones': ['Arid', 'Semi-Arid']
-            }
-        ]
-        return Response(technologies)
-    
-    @action(detail=False, methods=['post'], url_path='technologies')
-    def create_technology(self, request):
-        """
-        Create new irrigation technology
-        POST /api/materials/technologies/
-        """
-        data = request.data
-        # In real implementation, create TechnologyEntry instance
-        # For now, return success response with the data
-        new_technology = {
-            'id': len(data) + 10,  # Mock ID generation
-            **data,
-            'created_at': timezone.now().isoformat(),
-            'updated_at': timezone.now().isoformat()
-        }
-        return Response(new_technology, status=status.HTTP_201_CREATED)
-    
-    @action(detail=False, methods=['put'], url_path=r'technologies/(?P<tech_id>[^/.]+)')
-    def update_technology(self, request, tech_id=None):
-        """
-        Update irrigation technology
-        PUT /api/materials/technologies/{id}/
-        """
-        data = request.data
-        # In real implementation, update TechnologyEntry instance
-        updated_technology = {
-            'id': tech_id,
-            **data,
-            'updated_at': timezone.now().isoformat()
-        }
-        return Response(updated_technology)
-    
-    @action(detail=False, methods=['delete'], url_path=r'technologies/(?P<tech_id>[^/.]+)')
-    def delete_technology(self, request, tech_id=None):
-        """
-        Delete irrigation technology
-        DELETE /api/materials/technologies/{id}/
-        """
-        # In real implementation, delete TechnologyEntry instance
-        return Response(status=status.HTTP_204_NO_CONTENT)
-    
-    # EXISTING ENDPOINTS
-    @action(detail=False, methods=['get', 'post'], url_path='costing-rules')
-    def costing_rules(self, request):
-        """
-        Costing Rules CRUD
-        GET/POST /api/materials/costing-rules/
-        """
-        if request.method == 'GET':
-            # Sample data - replace with your actual CostingRule model
-            rules = [
-                {
-                    'id': 1,
-                    'rule_name': 'Material Cost Adjustment',
-                    'rule_type': 'percentage',
-                    'value': 15.0,
-                    'applies_to': 'materials',
-                    'region': 'remote_areas'
-                },
-                {
-                    'id': 2,
-                    'rule_name': 'Labor Cost Premium',
-                    'rule_type': 'multiplier',
-                    'value': 1.25,
-                    'applies_to': 'labor',
-                    'region': 'urban'
-                }
-            ]
-            return Response(rules)
-        
-        elif request.method == 'POST':
-            # Handle creation - implement your creation logic here
-            return Response({
-                'id': 3,
-                'message': 'Costing rule created successfully'
-            }, status=status.HTTP_201_CREATED)
-    
-    @action(detail=False, methods=['get', 'post'], url_path='suitability-criteria')
-    def suitability_criteria(self, request):
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+    def _state_query(self, user_id):
+        return get_user_model().objects.filter(
+            **{jwt_settings.USER_ID_FIELD: user_id}
+        ).values(*_USER_STATE_FIELDS)
+
+    def _claims_user(self, validated_token, state):
+        if state is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if not state['is_active']:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return ClaimsUser(validated_token, state)
+
+    def get_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        state = user_state_cache.get(user_id, TTLLRUCache._missing)
+        if state is TTLLRUCache._missing:
+            state = self._state_query(user_id).first()
+            user_state_cache.set(user_id, state)
+        return self._claims_user(validated_token, state)
+
+    async def aget_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        state = user_state_cache.get(user_id, TTLLRUCache._missing)
+        if state is TTLLRUCache._missing:
+            state = await self._state_query(user_id).afirst()
+            user_state_cache.set(user_id, state)
+        return self._claims_user(validated_token, state)
+
+    async def aauthenticate(self, request):
         """
-        Suitability Criteria CRUD
-        GET/POST /api/materials/suitability-criteria/
+        authenticate() for plain Django async views. Token checks are CPU
+        only; the database is touched on a user-state cache miss alone.
         """
-        if request.method == 'GET':
-            # This endpoint seems to be working based on the logs
-            criteria = [
-                {
-                    'id': 1,
-                    'name': 'Soil Type Compatibility',
-                    'parameter': 'soil_type',
-                    'suitable_values': ['clay', 'loam', 'sandy_loam'],
-                    'technology': 'drip_irrigation'
-                },
-                {
-                    'id': 2,
-                    'name': 'Water Quality Requirements',
-                    'parameter': 'water_salinity',
-                    'max_value': 2000,
-                    'unit': 'ppm',
-                    'technology': 'sprinkler_irrigation'
-                }
-            ]
-            return Response(criteria)
-        
-        elif request.method == 'POST':
-            # Handle creation - implement your creation logic here
-            return Response({
-                'id': 3,
-                'message': 'Suitability criterion created successfully'
-            }, status=status.HTTP_201_CREATED)
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
 
 
-# ==============================================================================
-# URL PATTERNS - Update your urls.py files
-# ==============================================================================
+def get_model_user(user):
+    """Full User instance for request.user, whichever authenticator produced it"""
+    return user.get_model_user() if isinstance(user, ClaimsUser) else user
 
-# materials/urls.py - Update your existing materials URLs
-"""
-from django.urls import path, include
-from rest_framework.routers import DefaultRouter
-from .views import MaterialsViewSet
 
-router = DefaultRouter()
-router.register(r'', MaterialsViewSet, basename='materials')
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_state(sender, instance, **kwargs):
+    user_state_cache.pop(getattr(instance, jwt_settings.USER_ID_FIELD))
+
+# authentication/token_blacklist.py - Bloom filter in front of the simplejwt blacklist
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+BLACKLIST_VERSION_KEY = 'auth:token_blacklist_version'
+BLACKLIST_MIN_CAPACITY = 10000
+# Ids skipped within this distance of the high-water mark are re-checked on
+# catch-up, for rows whose transactions committed out of id order
+BLACKLIST_ID_LOOKBACK = 1000
 
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings (no false negatives, tunable false positives).
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistFilter:
+    """
+    Per-process Bloom filter of blacklisted JTIs.
+    Kept in step with other workers through a shared version counter: when it
+    moves, only rows past the last seen id (or in a recent gap) are read.
+    Rebuilt from scratch when it fills up or after
+    JWT_BLACKLIST_BLOOM_REBUILD_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._filter = None
+        self._last_id = 0
+        self._gaps = set()
+        self._version = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def error_rate(self):
+        return getattr(settings, 'JWT_BLACKLIST_BLOOM_ERROR_RATE', 0.001)
+
+    @property
+    def rebuild_interval(self):
+        return getattr(settings, 'JWT_BLACKLIST_BLOOM_REBUILD_INTERVAL', 300)
+
+    @staticmethod
+    def _scan(bloom, rows, last_id, gaps):
+        """
+        Add rows (ordered by id) to `bloom`. Returns the new high-water mark
+        and the ids skipped within BLACKLIST_ID_LOOKBACK of it, which may
+        still commit. Every row read is new, so bloom.count stays exact.
+        """
+        for row_id, jti in rows.iterator(chunk_size=10000):
+            bloom.add(jti)
+            if row_id <= last_id:
+                gaps.discard(row_id)
+                continue
+            gaps.update(range(max(last_id + 1, row_id - BLACKLIST_ID_LOOKBACK), row_id))
+            last_id = row_id
+            if len(gaps) > 2 * BLACKLIST_ID_LOOKBACK:
+                gaps = {gap for gap in gaps if gap > last_id - BLACKLIST_ID_LOOKBACK}
+        return last_id, {gap for gap in gaps if gap > last_id - BLACKLIST_ID_LOOKBACK}
+
+    def _rebuild(self, version):
+        rows = BlacklistedToken.objects.order_by('id').values_list('id', 'token__jti')
+        bloom = BloomFilter(max(rows.count() * 2, BLACKLIST_MIN_CAPACITY), self.error_rate)
+        last_id, gaps = self._scan(bloom, rows, 0, set())
+        self._filter, self._last_id, self._gaps, self._version = bloom, last_id, gaps, version
+        self._built_at = time.monotonic()
+
+    def _catch_up(self, version):
+        pending = Q(id__gt=self._last_id)
+        if self._gaps:
+            pending |= Q(id__in=self._gaps)
+        rows = BlacklistedToken.objects.filter(pending).order_by('id').values_list('id', 'token__jti')
+        self._last_id, self._gaps = self._scan(self._filter, rows, self._last_id, self._gaps)
+        self._version = version
+
+    def sync(self):
+        version = cache.get(BLACKLIST_VERSION_KEY, 0)
+        if (self._filter is not None and version == self._version
+                and time.monotonic() - self._built_at < self.rebuild_interval):
+            return
+        with self._lock:
+            stale = self._filter is None or time.monotonic() - self._built_at >= self.rebuild_interval
+            if stale or self._filter.count >= self._filter.capacity:
+                self._rebuild(version)
+            elif version != self._version:
+                self._catch_up(version)
+
+    def might_contain(self, jti):
+        self.sync()
+        return jti in self._filter
+
+    def add(self, jti):
+        bloom = self._filter
+        if bloom is not None:
+            bloom.add(jti)
+
+
+blacklist_filter = BlacklistFilter()
+
+
+def bump_blacklist_version():
+    try:
+        cache.incr(BLACKLIST_VERSION_KEY)
+    except ValueError:
+        cache.add(BLACKLIST_VERSION_KEY, 1, timeout=None)
+
+
+class BloomRefreshToken(RefreshToken):
+    """
+    RefreshToken whose blacklist check only hits the database when the
+    Bloom filter reports a possible match.
+    """
+
+    def check_blacklist(self):
+        jti = self.payload[jwt_settings.JTI_CLAIM]
+        if blacklist_filter.might_contain(jti) and BlacklistedToken.objects.filter(token__jti=jti).exists():
+            raise TokenError(_('Token is blacklisted'))
+
+
+class BloomTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = BloomRefreshToken
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def track_blacklisted_token(sender, instance, created, **kwargs):
+    if created:
+        blacklist_filter.add(instance.token.jti)
+        transaction.on_commit(bump_blacklist_version)
+
+
+def prune_expired_tokens(batch_size=5000):
+    """
+    Delete expired outstanding tokens and their blacklist rows in id batches,
+    so each statement stays short and does not lock the whole table.
+    Returns (outstanding_deleted, blacklisted_deleted).
+    """
+    now = aware_utcnow()
+    outstanding_deleted = blacklisted_deleted = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            blacklisted_deleted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            outstanding_deleted += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+    return outstanding_deleted, blacklisted_deleted
+
+
+# authentication/management/commands/prune_jwt_tokens.py
+"""
+from django.core.management.base import BaseCommand
+
+from authentication.token_blacklist import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired outstanding and blacklisted JWT refresh tokens in batches. "
+        "Schedule it (e.g. hourly cron) to keep the blacklist tables small."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, batch_size=5000, **options):
+        outstanding, blacklisted = prune_expired_tokens(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Pruned {outstanding} outstanding and {blacklisted} blacklisted tokens'
+        ))
+"""
+
+# authentication/pagination.py - keyset pagination helpers for the users listing
+import base64
+import json
+
+from django.db import connection
+from django.utils.dateparse import parse_datetime
+
+USER_LIST_FIELDS = [
+    'id', 'username', 'email', 'first_name', 'last_name', 'role',
+    'is_active', 'created_at', 'last_login',
+]
+USER_PAGE_SIZE = 50
+USER_MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at, pk):
+    raw = json.dumps([created_at.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from an opaque cursor; raises ValueError when malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = parse_datetime(created_at)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+    if created_at is None or not isinstance(pk, int) or isinstance(pk, bool):
+        raise ValueError('Invalid cursor')
+    return created_at, pk
+
+
+def approximate_count(model):
+    """
+    Planner row estimate on PostgreSQL (no table scan); exact count elsewhere.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+    return model.objects.count()
+
+
+# models.py - index backing the (created_at, id) keyset on the User model
+"""
+class User(AbstractUser):
+    ...
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='user_created_id_idx'),
+        ]
+"""
+
+# authentication/parsers.py
+import csv
+import io
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class CSVParser(BaseParser):
+    """
+    Parses a text/csv body with a header row into a list of dicts.
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return []
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        return parse_csv_rows(stream, encoding)
+
+
+def parse_csv_rows(stream, encoding='utf-8'):
+    text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+    try:
+        return [
+            {key.strip(): (value or '').strip() for key, value in row.items() if key}
+            for row in csv.DictReader(text)
+        ]
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise ParseError(f'CSV parse error: {exc}')
+    finally:
+        text.detach()
+
+
+# authentication/hashing.py - password hashing on a bounded process pool
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+# Below this many passwords the IPC overhead outweighs the parallelism
+HASH_POOL_MIN_BATCH = 16
+
+_hash_pool = None
+_hash_pool_workers = 1
+_hash_pool_lock = threading.Lock()
+
+
+def _init_hash_worker():
+    import django
+    django.setup()
+
+
+def get_hash_pool():
+    """
+    Lazily started, process-wide pool of BULK_REGISTER_HASH_WORKERS processes.
+    Uses spawn so workers never share the parent's database connections.
+    """
+    global _hash_pool, _hash_pool_workers
+    if _hash_pool is None:
+        with _hash_pool_lock:
+            if _hash_pool is None:
+                workers = getattr(settings, 'BULK_REGISTER_HASH_WORKERS', None) or min(4, os.cpu_count() or 1)
+                _hash_pool_workers = workers
+                _hash_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_hash_worker,
+                )
+    return _hash_pool
+
+
+def hash_passwords(passwords):
+    """make_password for each raw password, spread across the hash pool"""
+    if len(passwords) < HASH_POOL_MIN_BATCH:
+        return [make_password(password) for password in passwords]
+    pool = get_hash_pool()
+    chunksize = max(1, len(passwords) // (_hash_pool_workers * 4))
+    return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+# core/metrics.py - low-overhead in-process histograms
+import bisect
+import threading
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram (Prometheus style) guarded by a lock.
+    observe() is a bisect plus three additions.
+    """
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            running += n
+            cumulative.append((bound, running))
+        return {'buckets': cumulative, 'sum': total, 'count': count}
+
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class MetricsRegistry:
+    """
+    Named histograms with label sets, rendered in Prometheus text format.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, labels=None, buckets=DEFAULT_LATENCY_BUCKETS, help_text=''):
+        key = (name, tuple(sorted((labels or {}).items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(buckets)
+                    self._help.setdefault(name, help_text)
+        return histogram
+
+    def register(self, name, histogram, labels=None, help_text=''):
+        """Expose a histogram owned elsewhere (e.g. the login verifier)"""
+        with self._lock:
+            self._histograms[(name, tuple(sorted((labels or {}).items())))] = histogram
+            self._help.setdefault(name, help_text)
+
+    def render_prometheus(self):
+        def fmt_labels(pairs):
+            if not pairs:
+                return ''
+            escaped = (
+                '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                for k, v in pairs
+            )
+            return '{' + ','.join(escaped) + '}'
+
+        with self._lock:
+            items = sorted(self._histograms.items(), key=lambda item: item[0])
+        lines, described = [], set()
+        for (name, labels), histogram in items:
+            if name not in described:
+                described.add(name)
+                if self._help.get(name):
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} histogram')
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{name}_bucket{fmt_labels(labels + (("le", le),))} {count}')
+            lines.append(f'{name}_sum{fmt_labels(labels)} {snapshot["sum"]}')
+            lines.append(f'{name}_count{fmt_labels(labels)} {snapshot["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry()
+
+
+# core/instrumentation.py - per-action timing, SQL and payload metrics, slow-request profiler
+import contextvars
+import hmac
+import ipaddress
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+_current = contextvars.ContextVar('instrumentation_request', default=None)
+
+DEFAULT_METRICS_ALLOWED_NETWORKS = [
+    '127.0.0.0/8', '::1/128', '10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16', 'fc00::/7',
+]
+
+
+class _RequestStats:
+    __slots__ = ('queries', 'sql_seconds', 'serialize_seconds', 'serialize_depth', 'stacks')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.serialize_depth = 0
+        self.stacks = None
+
+
+def _count_queries(execute, sql, params, many, context):
+    stats = _current.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += time.perf_counter() - started
+
+
+def _timed_serialization(method):
+    """Time the outermost serializer/renderer call of the current request"""
+    def wrapper(*args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return method(*args, **kwargs)
+        stats.serialize_depth += 1
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stats.serialize_depth -= 1
+            if not stats.serialize_depth:
+                stats.serialize_seconds += time.perf_counter() - started
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+def install_serializer_timing():
+    """
+    Wrap DRF serializer to_representation and JSON rendering once at startup
+    (call from an AppConfig.ready()).
+    """
+    from rest_framework import renderers, serializers as drf_serializers
+    for cls, name in (
+        (drf_serializers.Serializer, 'to_representation'),
+        (drf_serializers.ListSerializer, 'to_representation'),
+        (renderers.JSONRenderer, 'render'),
+    ):
+        method = getattr(cls, name)
+        if not hasattr(method, '__wrapped__'):
+            setattr(cls, name, _timed_serialization(method))
+
+
+class SlowRequestProfiler:
+    """
+    Opt-in sampling profiler: a single daemon thread samples the stacks of
+    threads serving profiled requests every INSTRUMENTATION_PROFILE_INTERVAL
+    seconds; requests slower than INSTRUMENTATION_PROFILE_SLOW_MS are dumped
+    as folded stacks (flamegraph.pl / speedscope input).
+    """
+
+    def __init__(self, interval, output_dir, max_depth=64):
+        self.interval = interval
+        self.output_dir = output_dir
+        self.max_depth = max_depth
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, stacks in active.items():
+                frame = frames.get(thread_id)
+                parts = []
+                while frame is not None and len(parts) < self.max_depth:
+                    code = frame.f_code
+                    parts.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                if parts:
+                    stacks[';'.join(reversed(parts))] += 1
+
+    def start(self, stats):
+        self._ensure_started()
+        stats.stacks = Counter()
+        with self._lock:
+            self._active[threading.get_ident()] = stats.stacks
+
+    def stop(self, stats, label, wall_seconds, slow_seconds):
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+        if wall_seconds < slow_seconds or not stats.stacks:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        filename = f'{time.strftime("%Y%m%dT%H%M%S")}-{int(wall_seconds * 1000)}ms-{label}.folded'
+        with open(os.path.join(self.output_dir, filename.replace('/', '_')), 'w') as out:
+            for stack, count in stats.stacks.most_common():
+                out.write(f'{stack} {count}\n')
+
+
+_profiler = None
+
+
+def _get_profiler():
+    global _profiler
+    if _profiler is None:
+        _profiler = SlowRequestProfiler(
+            interval=getattr(settings, 'INSTRUMENTATION_PROFILE_INTERVAL', 0.005),
+            output_dir=getattr(settings, 'INSTRUMENTATION_PROFILE_DIR', '/tmp/request-profiles'),
+        )
+    return _profiler
+
+
+def _action_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    func = match.func
+    cls = getattr(func, 'cls', None)
+    actions = getattr(func, 'actions', None)
+    if cls is not None and actions:
+        return f'{cls.__name__}.{actions.get(request.method.lower(), request.method.lower())}'
+    if cls is not None:
+        return cls.__name__
+    return match.view_name or getattr(func, '__name__', 'view')
+
+
+class InstrumentationMiddleware:
+    """
+    Records, per view action: wall time, SQL query count and time, serializer
+    + renderer time and response bytes into in-process histograms exposed by
+    metrics_view. Put it first in MIDDLEWARE.
+    Async-capable, so it does not force async views back onto a thread under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.profile_slow_seconds = getattr(settings, 'INSTRUMENTATION_PROFILE_SLOW_MS', None)
+        if self.profile_slow_seconds is not None:
+            self.profile_slow_seconds /= 1000.0
+        self.profile_sample_rate = getattr(settings, 'INSTRUMENTATION_PROFILE_SAMPLE_RATE', 0.1)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = _RequestStats()
+        token = _current.set(stats)
+        profiling = self.profile_slow_seconds is not None and random.random() < self.profile_sample_rate
+        if profiling:
+            _get_profiler().start(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_count_queries))
+                response = self.get_response(request)
+        finally:
+            wall = time.perf_counter() - started
+            _current.reset(token)
+
+        label = self._record(request, response, wall, stats)
+        if profiling:
+            _get_profiler().stop(stats, label, wall, self.profile_slow_seconds)
+        return response
+
+    async def __acall__(self, request):
+        # Async views run their queries in sync_to_async threads, outside the
+        # per-connection execute wrappers, and the sampling profiler only sees
+        # the event loop thread - so only wall time and size are recorded here
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    def _record(self, request, response, wall, stats=None):
+        label = _action_label(request)
+        labels = {'action': label}
+        metrics_registry.histogram('http_request_duration_seconds', labels,
+                                   help_text='Wall time per view action').observe(wall)
+        if stats is not None:
+            metrics_registry.histogram('http_request_sql_queries', labels, COUNT_BUCKETS,
+                                       help_text='SQL queries per request').observe(stats.queries)
+            metrics_registry.histogram('http_request_sql_seconds', labels,
+                                       help_text='Time spent in SQL per request').observe(stats.sql_seconds)
+            metrics_registry.histogram('http_request_serialize_seconds', labels,
+                                       help_text='Serializer and renderer time per request').observe(stats.serialize_seconds)
+        if not getattr(response, 'streaming', False):
+            metrics_registry.histogram('http_response_bytes', labels, SIZE_BUCKETS,
+                                       help_text='Response body size').observe(len(response.content))
+        return label
+
+
+def _metrics_allowed(request):
+    token = getattr(settings, 'INSTRUMENTATION_METRICS_TOKEN', None)
+    if token:
+        return hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+    if settings.DEBUG:
+        return True
+    # REMOTE_ADDR only - X-Forwarded-For is client-controlled
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    networks = getattr(settings, 'INSTRUMENTATION_METRICS_ALLOWED_NETWORKS', DEFAULT_METRICS_ALLOWED_NETWORKS)
+    return any(address in ipaddress.ip_network(network) for network in networks)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint
+    GET /api/metrics/
+    Requires "Authorization: Bearer <INSTRUMENTATION_METRICS_TOKEN>" when that
+    setting is set; otherwise only INSTRUMENTATION_METRICS_ALLOWED_NETWORKS
+    may scrape (anyone when DEBUG).
+    """
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics_registry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+# core/apps.py
+"""
+class CoreConfig(AppConfig):
+    name = 'core'
+
+    def ready(self):
+        from .dashboard import connect_dashboard_signals
+        from .instrumentation import install_serializer_timing
+        connect_dashboard_signals()
+        install_serializer_timing()
+"""
+
+
+
+# authentication/login_executor.py - credential verification off the request path
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.db import close_old_connections
+
+from core.metrics import Histogram, metrics_registry
+
+
+class LoginRejected(Exception):
+    """Raised when the verifier queue is full; carries a Retry-After hint in seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__('Login verification queue is full')
+        self.retry_after = retry_after
+
+
+class LoginVerifier:
+    """
+    Runs authenticate() on a dedicated, fixed-size thread pool (password
+    hashers release the GIL while hashing). At most workers + max_queue
+    verifications are admitted; beyond that callers get LoginRejected
+    immediately instead of tying up another request worker.
+    The pool and its admission count are per process, so this only bounds
+    anything when a process serves requests concurrently - see
+    use_login_verifier().
+    """
+
+    def __init__(self, workers, max_queue, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='login-verify')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self.queue_wait = Histogram()
+        self.verify_time = Histogram()
+        metrics_registry.register('auth_login_queue_wait_seconds', self.queue_wait,
+                                  help_text='Time a login waited for a verifier thread')
+        metrics_registry.register('auth_login_verify_seconds', self.verify_time,
+                                  help_text='Password verification time')
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _retry_after(self):
+        backlog = self._in_flight / self.workers
+        return max(1, math.ceil(backlog * max(self.verify_time.mean(), 0.1)))
+
+    def _verify(self, submitted_at, credentials):
+        started = time.perf_counter()
+        self.queue_wait.observe(started - submitted_at)
+        close_old_connections()
+        try:
+            return authenticate(**credentials)
+        finally:
+            self.verify_time.observe(time.perf_counter() - started)
+            close_old_connections()
+
+    def _release(self, future):
+        with self._in_flight_lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def authenticate(self, **credentials):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise LoginRejected(self._retry_after())
+        with self._in_flight_lock:
+            self._in_flight += 1
+        future = self._executor.submit(self._verify, time.perf_counter(), credentials)
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.timed_out += 1
+            raise
+
+    def snapshot(self):
+        return {
+            'workers': self.workers,
+            'in_flight': self._in_flight,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'queue_wait_seconds': self.queue_wait.snapshot(),
+            'verify_seconds': self.verify_time.snapshot(),
+        }
+
+
+_login_verifier = None
+_login_verifier_lock = threading.Lock()
+
+
+def use_login_verifier(request):
+    """
+    True when LOGIN_VERIFY_MODE is 'executor' and the worker is threaded
+    (gunicorn gthread, uWSGI threads) or ASGI. A single-threaded sync worker
+    (wsgi.multithread false) never has two logins in flight, so the pool
+    would only add a thread hop: such workers verify inline.
+    """
+    if getattr(settings, 'LOGIN_VERIFY_MODE', 'inline') != 'executor':
+        return False
+    return request.META.get('wsgi.multithread', True)  # ASGI requests carry no WSGI keys
+
+
+def get_login_verifier():
+    global _login_verifier
+    if _login_verifier is None:
+        with _login_verifier_lock:
+            if _login_verifier is None:
+                _login_verifier = LoginVerifier(
+                    workers=getattr(settings, 'LOGIN_VERIFY_WORKERS', 2),
+                    max_queue=getattr(settings, 'LOGIN_VERIFY_MAX_QUEUE', 16),
+                    timeout=getattr(settings, 'LOGIN_VERIFY_TIMEOUT', 10),
+                )
+    return _login_verifier
+
+# REQUIRED settings.py configuration
+"""
+# Add to your Django settings.py:
+
+INSTALLED_APPS = [
+    # ... other apps
+    'rest_framework',
+    'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',  # For token blacklisting
+    # ... your apps
+]
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework_simplejwt.authentication.JWTAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+}
+
+from datetime import timedelta
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+    'UPDATE_LAST_LOGIN': True,
+    'ALGORITHM': 'HS256',
+    'SIGNING_KEY': SECRET_KEY,
+    'VERIFYING_KEY': None,
+    'AUTH_HEADER_TYPES': ('Bearer',),
+    'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
+    'USER_ID_FIELD': 'id',
+    'USER_ID_CLAIM': 'user_id',
+    'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
+    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.token_blacklist.BloomTokenRefreshSerializer',
+}
+
+# Blacklist Bloom filter; run `python manage.py prune_jwt_tokens` on a schedule
+JWT_BLACKLIST_BLOOM_ERROR_RATE = 0.001
+JWT_BLACKLIST_BLOOM_REBUILD_INTERVAL = 300  # seconds
+
+# Bulk user registration (POST /api/auth/register/bulk/)
+BULK_REGISTER_MAX_ROWS = 10000
+BULK_REGISTER_HASH_WORKERS = None  # defaults to min(4, cpu count)
+
+# Login verification: 'inline' or 'executor' (dedicated pool with admission control).
+# 'executor' needs threaded (gunicorn --threads / gthread) or ASGI workers: the
+# pool and its admission count are per process, and single-threaded sync
+# workers fall back to inline verification.
+LOGIN_VERIFY_MODE = 'executor'
+LOGIN_VERIFY_WORKERS = 2
+LOGIN_VERIFY_MAX_QUEUE = 16  # beyond workers + queue, login answers 429 with Retry-After
+LOGIN_VERIFY_TIMEOUT = 10  # seconds
+
+# Instrumentation (core.instrumentation) - add first in MIDDLEWARE:
+#   'core.instrumentation.InstrumentationMiddleware',
+# and route path('api/metrics/', metrics_view) for Prometheus
+INSTRUMENTATION_METRICS_TOKEN = None  # set to require a bearer token on /api/metrics/
+# Without a token, scrapes are limited to these client networks (by REMOTE_ADDR,
+# so behind a reverse proxy either set the token or keep the path off the proxy)
+INSTRUMENTATION_METRICS_ALLOWED_NETWORKS = [
+    '127.0.0.0/8', '::1/128', '10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16', 'fc00::/7',
+]
+INSTRUMENTATION_PROFILE_SLOW_MS = None  # e.g. 500 to enable the slow-request sampling profiler
+INSTRUMENTATION_PROFILE_SAMPLE_RATE = 0.1  # share of requests sampled while profiling is on
+INSTRUMENTATION_PROFILE_INTERVAL = 0.005  # seconds between stack samples
+INSTRUMENTATION_PROFILE_DIR = '/tmp/request-profiles'
+
+# CORS settings if frontend is on different port
+CORS_ALLOWED_ORIGINS = [
+    "http://localhost:3000",  # React dev server
+    "http://127.0.0.1:3000",
+]
+
+CORS_ALLOW_CREDENTIALS = True
+
+# Claims-based JWT authentication: user active-state cache
+AUTH_USER_CACHE_TTL = 30  # seconds; bounds staleness for changes made in other workers
+AUTH_USER_CACHE_MAX_SIZE = 10000
+
+# Crop water requirements (POST /api/materials/cwr/)
+CWR_MAX_CELLS = 20_000_000  # zone-crop combinations x season days per request
+
+# Hydraulic design (POST /api/materials/hydraulic-design/)
+HYDRAULIC_MAX_CELLS = 20_000_000  # pipe segments x candidate pipes per request
+HYDRAULIC_MAX_OUTLETS = 10_000  # outlets on a single lateral
+
+# Dashboard aggregates (core.dashboard); rebuild with `python manage.py rebuild_dashboard_stats`
+# DASHBOARD_STAT_SOURCES = {...}  # override core.dashboard.DEFAULT_DASHBOARD_SOURCES field mapping
+
+# Project wizard delta saves (PATCH /api/projects/{id}/wizard/)
+WIZARD_PATCH_REQUIRE_IF_MATCH = True  # 428 for PATCH without If-Match
+WIZARD_COMPACT_AFTER = 50  # patches before the document is folded back into one row
+WIZARD_CACHE_TIMEOUT = 60 * 60  # seconds a materialized version stays cached
+WIZARD_MATERIALIZE_ATTEMPTS = 3  # replays racing a compaction before GET answers 503
+
+# Async catalog/auth endpoints - serve over ASGI, e.g.
+#   gunicorn main_project.asgi:application -k uvicorn.workers.UvicornWorker
+# with pooled connections (Django 5.1+, psycopg 3; requires CONN_MAX_AGE = 0):
+#   DATABASES['default']['OPTIONS'] = {'pool': {'min_size': 2, 'max_size': 10, 'timeout': 10}}
+ASYNC_DB_CONCURRENCY = 8  # concurrent async ORM calls per worker; keep <= pool max_size
+
+# Catalog snapshot (materials.snapshot); prebuild with `python manage.py build_catalog_snapshot`
+CATALOG_SNAPSHOT_DIR = '/var/lib/irrigation/catalog-snapshots'  # host-local, shared by all workers
+CATALOG_SNAPSHOT_KEEP = 3  # older versions are unlinked
+
+# Technology matching (GET /api/materials/technologies/match/)
+TECHNOLOGY_MATCH_CHECK_INTERVAL = 1.0  # seconds between catalog version checks per worker
+
+# Scenario sweeps (POST /api/materials/scenarios/sweep/)
+SCENARIO_SWEEP_WORKERS = 2  # processes per web worker - keep web workers x this within the host's cores
+SCENARIO_SWEEP_POOL_MIN = 2000  # smaller sweeps run inline
+SCENARIO_SWEEP_MAX_COMBINATIONS = 200_000
+
+# GIS zone vector tiles (GET /api/gis/tiles/{z}/{x}/{y}.mvt)
+GIS_ZONE_MODEL = 'gis.IrrigationZone'
+GIS_TILE_MAX_ZOOM = 22
+GIS_TILE_SIMPLIFY_PIXELS = 0.5  # simplification tolerance in screen pixels at each zoom
+GIS_TILE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # in-process LRU per worker
+GIS_TILE_CACHE_DIR = None  # e.g. '/var/cache/tides/tiles' to share tiles between workers
+
+# Shapefile ingestion (POST /api/gis/shapefiles/ returns a job; GET .../shapefiles/jobs/{id}/ for progress)
+GIS_INGEST_MODE = 'thread'  # 'thread' runs jobs in-process; 'command' leaves them for run_shapefile_imports
+GIS_INGEST_WORKERS = 1
+GIS_INGEST_CHUNK_SIZE = 2000  # zones per bulk insert and progress update
+GIS_INGEST_DIR = None  # spool directory; defaults to <tmp>/shapefile-imports, must be shared in 'command' mode
+GIS_INGEST_MAX_BYTES = 2 * 1024 ** 3  # largest uncompressed archive accepted
+GIS_INGEST_MAX_RECORDED_ERRORS = 100
+"""
+
+# ==============================================================================
+# MATERIALS APP - ALL RESOURCES CONSOLIDATED
+# ==============================================================================
+
+# =================
+# TECHNOLOGY ENTRY MODEL FOR MATERIALS APP
+# =================
+
+class TechnologyEntry(models.Model):
+    """
+    Represents a technology entry with irrigation type and all suitability criteria.
+    Example: Pressurized Irrigation Technology -> Drip Irrigation.
+    Frontend Integration: TechnologySelectionStep.tsx, useTechnologySelection.ts
+    """
+
+    TECHNOLOGY_CHOICES = [
+        ('surface', 'Surface Irrigation Technology'),
+        ('subsurface', 'Subsurface Irrigation Technology'),
+        ('pressurized', 'Pressurized Irrigation Technology'),
+    ]
+
+    MAINTENANCE_LEVELS = [
+        ('low', 'Low'),
+        ('medium', 'Medium'),
+        ('high', 'High'),
+    ]
+
+    # Core fields
+    technology_name = models.CharField(max_length=50, choices=TECHNOLOGY_CHOICES)
+    irrigation_type = models.CharField(max_length=100)  # validated on frontend
+    description = models.TextField(blank=True, null=True)
+
+    efficiency = models.DecimalField(max_digits=5, decimal_places=2, help_text="Efficiency in %")
+    water_requirement = models.DecimalField(max_digits=6, decimal_places=2, help_text="Liters/m²/day")
+    lifespan = models.PositiveIntegerField(help_text="Lifespan in years")
+    maintenance_level = models.CharField(max_length=10, choices=MAINTENANCE_LEVELS)
+
+    # Suitability criteria
+    suitable_soil_types = models.JSONField(default=list)  
+    suitable_crop_types = models.JSONField(default=list)  
+    suitable_farm_sizes = models.JSONField(default=list)  
+    water_quality_requirements = models.JSONField(default=list)  
+    suitable_topography = models.JSONField(default=list)  
+    climate_zones = models.JSONField(default=list)  
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.get_technology_name_display()} - {self.irrigation_type}"
+
+    class Meta:
+        db_table = 'materials_technologyentry'
+        verbose_name_plural = "Technology Entries"
+        unique_together = ['technology_name', 'irrigation_type']
+        # technology_name lookups use the unique_together index (leading column)
+        indexes = [
+            models.Index(fields=['maintenance_level'], name='tech_maintenance_idx'),
+            models.Index(fields=['efficiency'], name='tech_efficiency_idx'),
+            models.Index(fields=['lifespan'], name='tech_lifespan_idx'),
+        ]
+        # GIN indexes on the suitability lists are PostgreSQL-only and are
+        # created in migration 0003_technologyentry_gin_indexes (see below)
+
+
+# materials/migrations/0003_technologyentry_gin_indexes.py
+"""
+from django.db import migrations
+
+SUITABILITY_FIELDS = [
+    'suitable_soil_types', 'suitable_crop_types', 'suitable_farm_sizes',
+    'water_quality_requirements', 'suitable_topography', 'climate_zones',
+]
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return  # SQLite: suitability filters fall back to the in-process inverted index
+    for field in SUITABILITY_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS tech_{field}_gin '
+            f'ON materials_technologyentry USING gin ({field} jsonb_path_ops)'
+        )
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in SUITABILITY_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS tech_{field}_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0002_technologyentry_filter_indexes'),  # the makemigrations output for Meta.indexes
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
+"""
+
+# materials/management/commands/seed_technologies.py
+"""
+from django.core.management.base import BaseCommand
+
+from materials.bulk import bulk_upsert_technologies
+from materials.catalog import SAMPLE_TECHNOLOGIES
+
+
+class Command(BaseCommand):
+    help = "Upserts the sample technology catalog into TechnologyEntry"
+
+    def handle(self, *args, **options):
+        rows = [{k: v for k, v in row.items() if k != 'id'} for row in SAMPLE_TECHNOLOGIES]
+        results = bulk_upsert_technologies(rows)
+        created = sum(1 for r in results if r['status'] == 'created')
+        self.stdout.write(self.style.SUCCESS(f'{created} created, {len(results) - created} updated or skipped'))
+"""
+
+# =================
+
+# =================
+# RESOURCE CATALOGS - materials/catalog.py
+# =================
+# Single source for the materials, equipment, labor and costing-rule catalogs
+# used by the views and the costing engine.
+
+# Sample data - replace with your actual Material model
+SAMPLE_MATERIALS = [
+    {
+        'id': 1,
+        'name': 'PVC Pipe 4"',
+        'category': 'Pipes',
+        'unit': 'meter',
+        'cost_per_unit': 25.50,
+        'supplier': 'Local Supplier A',
+        'inner_diameter_mm': 99.4
+    },
+    {
+        'id': 2,
+        'name': 'Drip Emitter',
+        'category': 'Irrigation Components',
+        'unit': 'piece',
+        'cost_per_unit': 0.75,
+        'supplier': 'Irrigation Co.'
+    },
+    {
+        'id': 3,
+        'name': 'PE Lateral 16mm',
+        'category': 'Pipes',
+        'unit': 'meter',
+        'cost_per_unit': 0.35,
+        'supplier': 'Irrigation Co.',
+        'inner_diameter_mm': 13.6
+    },
+    {
+        'id': 4,
+        'name': 'PE Pipe 32mm',
+        'category': 'Pipes',
+        'unit': 'meter',
+        'cost_per_unit': 1.20,
+        'supplier': 'Irrigation Co.',
+        'inner_diameter_mm': 28.0
+    },
+    {
+        'id': 5,
+        'name': 'PVC Pipe 2"',
+        'category': 'Pipes',
+        'unit': 'meter',
+        'cost_per_unit': 9.80,
+        'supplier': 'Local Supplier A',
+        'inner_diameter_mm': 49.4
+    },
+    {
+        'id': 6,
+        'name': 'PVC Pipe 3"',
+        'category': 'Pipes',
+        'unit': 'meter',
+        'cost_per_unit': 16.40,
+        'supplier': 'Local Supplier A',
+        'inner_diameter_mm': 73.6
+    }
+]
+
+# Sample data - replace with your actual Equipment model
+SAMPLE_EQUIPMENT = [
+    {
+        'id': 1,
+        'name': 'Excavator Small',
+        'category': 'Heavy Machinery',
+        'unit': 'hour',
+        'cost_per_unit': 150.00,
+        'supplier': 'Equipment Rental Co.'
+    },
+    {
+        'id': 2,
+        'name': 'Water Pump 5HP',
+        'category': 'Pumps',
+        'unit': 'piece',
+        'cost_per_unit': 850.00,
+        'supplier': 'Pump Solutions Ltd'
+    }
+]
+
+# Sample data - replace with your actual Labor model
+SAMPLE_LABOR = [
+    {
+        'id': 1,
+        'category': 'Skilled Technician',
+        'hourly_rate': 25.00,
+        'region': 'Urban',
+        'currency': 'USD'
+    },
+    {
+        'id': 2,
+        'category': 'General Labor',
+        'hourly_rate': 15.00,
+        'region': 'Rural',
+        'currency': 'USD'
+    }
+]
+
+# Sample data - replace with your actual CostingRule model
+SAMPLE_COSTING_RULES = [
+    {
+        'id': 1,
+        'rule_name': 'Material Cost Adjustment',
+        'rule_type': 'percentage',
+        'value': 15.0,
+        'applies_to': 'materials',
+        'region': 'remote_areas'
+    },
+    {
+        'id': 2,
+        'rule_name': 'Labor Cost Premium',
+        'rule_type': 'multiplier',
+        'value': 1.25,
+        'applies_to': 'labor',
+        'region': 'urban'
+    }
+]
+
+# Sample data - replace with your actual SuitabilityCriterion model
+SAMPLE_SUITABILITY_CRITERIA = [
+    {
+        'id': 1,
+        'name': 'Soil Type Compatibility',
+        'parameter': 'soil_type',
+        'suitable_values': ['clay', 'loam', 'sandy_loam'],
+        'technology': 'drip_irrigation'
+    },
+    {
+        'id': 2,
+        'name': 'Water Quality Requirements',
+        'parameter': 'water_salinity',
+        'max_value': 2000,
+        'unit': 'ppm',
+        'technology': 'sprinkler_irrigation'
+    }
+]
+
+# Sample TechnologyEntry rows - load with `python manage.py seed_technologies`
+SAMPLE_TECHNOLOGIES = [
+    {
+        'id': 1,
+        'technology_name': 'surface',
+        'irrigation_type': 'Basin Irrigation',
+        'description': 'Traditional surface irrigation method suitable for rice and wheat',
+        'efficiency': 60.0,
+        'water_requirement': 1200.0,
+        'lifespan': 15,
+        'maintenance_level': 'low',
+        'suitable_soil_types': ['Clay', 'Loam'],
+        'suitable_crop_types': ['Rice', 'Wheat', 'Maize'],
+        'suitable_farm_sizes': ['Small (< 2 ha)', 'Medium (2-10 ha)'],
+        'water_quality_requirements': ['Fresh Water', 'Groundwater'],
+        'suitable_topography': ['Flat'],
+        'climate_zones': ['Tropical', 'Temperate']
+    },
+    {
+        'id': 2,
+        'technology_name': 'surface',
+        'irrigation_type': 'Furrow Irrigation',
+        'description': 'Row crop irrigation using furrows between crop rows',
+        'efficiency': 65.0,
+        'water_requirement': 1100.0,
+        'lifespan': 12,
+        'maintenance_level': 'low',
+        'suitable_soil_types': ['Sandy', 'Loam'],
+        'suitable_crop_types': ['Vegetables', 'Cotton', 'Maize'],
+        'suitable_farm_sizes': ['Medium (2-10 ha)', 'Large (> 10 ha)'],
+        'water_quality_requirements': ['Fresh Water', 'Groundwater'],
+        'suitable_topography': ['Gentle Slope'],
+        'climate_zones': ['Arid', 'Semi-Arid', 'Temperate']
+    },
+    {
+        'id': 3,
+        'technology_name': 'pressurized',
+        'irrigation_type': 'Drip Irrigation',
+        'description': 'High-efficiency micro-irrigation delivering water directly to root zone',
+        'efficiency': 90.0,
+        'water_requirement': 650.0,
+        'lifespan': 8,
+        'maintenance_level': 'medium',
+        'suitable_soil_types': ['Sandy', 'Loam', 'Clay'],
+        'suitable_crop_types': ['Vegetables', 'Fruits', 'Cotton'],
+        'suitable_farm_sizes': ['Small (< 2 ha)', 'Medium (2-10 ha)', 'Large (> 10 ha)'],
+        'water_quality_requirements': ['Fresh Water', 'Treated Wastewater'],
+        'suitable_topography': ['Flat', 'Gentle Slope', 'Steep Slope'],
+        'climate_zones': ['Arid', 'Semi-Arid', 'Tropical']
+    },
+    {
+        'id': 4,
+        'technology_name': 'pressurized',
+        'irrigation_type': 'Sprinkler Systems',
+        'description': 'Overhead irrigation simulating natural rainfall',
+        'efficiency': 75.0,
+        'water_requirement': 850.0,
+        'lifespan': 12,
+        'maintenance_level': 'medium',
+        'suitable_soil_types': ['Sandy', 'Loam', 'Silt'],
+        'suitable_crop_types': ['Rice', 'Wheat', 'Vegetables', 'Fruits'],
+        'suitable_farm_sizes': ['Medium (2-10 ha)', 'Large (> 10 ha)'],
+        'water_quality_requirements': ['Fresh Water', 'Groundwater'],
+        'suitable_topography': ['Flat', 'Gentle Slope'],
+        'climate_zones': ['Temperate', 'Humid', 'Semi-Arid']
+    },
+    {
+        'id': 5,
+        'technology_name': 'subsurface',
+        'irrigation_type': 'Subsurface Drip',
+        'description': 'Underground drip irrigation for maximum water efficiency',
+        'efficiency': 95.0,
+        'water_requirement': 600.0,
+        'lifespan': 10,
+        'maintenance_level': 'high',
+        'suitable_soil_types': ['Sandy', 'Loam'],
+        'suitable_crop_types': ['Vegetables', 'Fruits', 'Cotton'],
+        'suitable_farm_sizes': ['Small (< 2 ha)', 'Medium (2-10 ha)'],
+        'water_quality_requirements': ['Fresh Water', 'Treated Wastewater'],
+        'suitable_topography': ['Flat', 'Gentle Slope'],
+        'climate_zones': ['Arid', 'Semi-Arid']
+    }
+]
+
+
+def get_materials():
+    return SAMPLE_MATERIALS
+
+
+def get_equipment():
+    return SAMPLE_EQUIPMENT
+
+
+def get_labor_rates():
+    return SAMPLE_LABOR
+
+
+def get_costing_rules():
+    return SAMPLE_COSTING_RULES
+
+
+def get_suitability_criteria():
+    return SAMPLE_SUITABILITY_CRITERIA
+
+# =================
+# VERSIONED CATALOG CACHE - materials/catalog_cache.py
+# =================
+import functools
+import hashlib
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from rest_framework.renderers import JSONRenderer
+
+CATALOG_VERSION_KEY = 'materials:catalog_version'
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+CATALOG_LOCAL_CACHE_SIZE = 256
+
+_local_responses = {}
+_local_lock = threading.Lock()
+
+
+def get_catalog_version():
+    """
+    Current catalog version, shared by all workers through the Django cache.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached catalog response. Call after any catalog write.
+    """
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Key missing or evicted - restart above any version a reader could hold
+        cache.add(CATALOG_VERSION_KEY, 2, timeout=None)
+        return cache.get(CATALOG_VERSION_KEY, 2)
+
+
+async def aget_catalog_version():
+    """get_catalog_version() for async views"""
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = await cache.aget(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def catalog_keys(name, version, query=''):
+    """(ETag, cache key) of a catalog response for one version and query string"""
+    query_hash = hashlib.sha1(query.encode()).hexdigest()[:12] if query else '0'
+    return f'"{name}-v{version}-{query_hash}"', f'materials:catalog:{name}:{version}:{query_hash}'
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+
+def _remember_local(key, body):
+    with _local_lock:
+        if len(_local_responses) >= CATALOG_LOCAL_CACHE_SIZE:
+            _local_responses.clear()
+        _local_responses[key] = body
+
+
+def catalog_response(body, etag, status=200):
+    response = HttpResponse(body, status=status, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def cached_catalog_response(name):
+    """
+    Cache a catalog GET action as pre-rendered JSON bytes keyed by catalog version.
+    Emits ETag / Cache-Control and answers a matching If-None-Match with 304.
+    Non-GET requests fall through to the wrapped action untouched.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_method(self, request, *args, **kwargs)
+
+            version = get_catalog_version()
+            etag, key = catalog_keys(name, version, request.META.get('QUERY_STRING', ''))
+            if etag_matches(request, etag):
+                return catalog_response(b'', etag, status=304)
+
+            body = _local_responses.get(key)
+            if body is None:
+                body = cache.get(key)
+                if body is None:
+                    result = view_method(self, request, *args, **kwargs)
+                    if result.status_code != 200:
+                        return result
+                    body = JSONRenderer().render(result.data)
+                    cache.set(key, body, CATALOG_CACHE_TIMEOUT)
+                _remember_local(key, body)
+            return catalog_response(body, etag)
+        return wrapper
+    return decorator
+
+
+async def acached_catalog_body(name, version, query, build):
+    """
+    Async counterpart of the cached_catalog_response lookup - same keys, so
+    sync and async views share rendered bodies. `build` is a coroutine
+    function returning the catalog data on a miss.
+    """
+    _, key = catalog_keys(name, version, query)
+    body = _local_responses.get(key)
+    if body is None:
+        body = await cache.aget(key)
+        if body is None:
+            body = JSONRenderer().render(await build())
+            await cache.aset(key, body, CATALOG_CACHE_TIMEOUT)
+        _remember_local(key, body)
+    return body
+
+
+@receiver(post_save, sender=TechnologyEntry)
+@receiver(post_delete, sender=TechnologyEntry)
+def bump_catalog_version_on_write(sender, **kwargs):
+    # After commit: a reader seeing the new version must also see the rows,
+    # or it would cache (and snapshot) the pre-commit catalog under it
+    transaction.on_commit(bump_catalog_version)
+
+# materials/apps.py - make sure the receivers above are registered
+"""
+class MaterialsConfig(AppConfig):
+    name = 'materials'
+
+    def ready(self):
+        from . import catalog_cache  # noqa: F401
+"""
+
+# =================
+# TECHNOLOGY SUITABILITY MATCHER - materials/matching.py
+# =================
+import threading
+import time
+
+from django.conf import settings
+
+from .catalog_cache import get_catalog_version
+
+
+# Query parameter -> TechnologyEntry suitability field
+MATCH_CRITERIA = {
+    'soil': 'suitable_soil_types',
+    'crop': 'suitable_crop_types',
+    'farm_size': 'suitable_farm_sizes',
+    'water_quality': 'water_quality_requirements',
+    'topography': 'suitable_topography',
+    'climate': 'climate_zones',
+}
+
+
+def _normalize_value(value):
+    return str(value).strip().casefold()
+
+
+def _iter_bits(bits):
+    """Yield the positions of the set bits, lowest first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class _MatchIndex:
+    """
+    Immutable snapshot of the inverted index for one catalog version.
+    Each technology gets a dense bit position; every (criterion, value) pair
+    maps to a Python int used as a bitset of those positions.
+    """
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.entries = []
+        self.postings = {criterion: {} for criterion in MATCH_CRITERIA}
+        for position, row in enumerate(rows):
+            self.entries.append({
+                'id': row['id'],
+                'technology_name': row['technology_name'],
+                'irrigation_type': row['irrigation_type'],
+                'efficiency': float(row['efficiency']),
+                'maintenance_level': row['maintenance_level'],
+            })
+            bit = 1 << position
+            for criterion, field in MATCH_CRITERIA.items():
+                postings = self.postings[criterion]
+                for value in row[field] or []:
+                    key = _normalize_value(value)
+                    postings[key] = postings.get(key, 0) | bit
+
+
+class TechnologyMatcher:
+    """
+    Matches site conditions against TechnologyEntry suitability criteria.
+    The index is built lazily from the database, rebuilt whenever the catalog
+    version moves (any entry created, updated or deleted), and queried by
+    intersecting bitsets.
+    Frontend Integration: TechnologySelectionStep.tsx, useTechnologySelection.ts
+    """
+
+    def __init__(self):
+        self._index = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_index(self, max_age=0.0):
+        """
+        Index for the current catalog version. With max_age, an index whose
+        version was confirmed less than max_age seconds ago is returned
+        without asking the cache again.
+        """
+        index = self._index
+        now = time.monotonic()
+        if index is not None and now - self._checked_at < max_age:
+            return index
+        version = get_catalog_version()
+        self._checked_at = now
+        if index is None or index.version != version:
+            with self._lock:
+                index = self._index
+                if index is None or index.version != version:
+                    rows = TechnologyEntry.objects.order_by('id').values(
+                        'id', 'technology_name', 'irrigation_type', 'efficiency',
+                        'maintenance_level', *MATCH_CRITERIA.values()
+                    )
+                    index = self._index = _MatchIndex(list(rows), version)
+        return index
+
+    def ids_for(self, criterion, values):
+        """Ids of technologies listing any of values under criterion"""
+        # Always checks the version: the result ends up in catalog bodies
+        # cached under the version the view just read
+        index = self.get_index()
+        postings = index.postings[criterion]
+        bits = 0
+        for value in values:
+            bits |= postings.get(_normalize_value(value), 0)
+        return [index.entries[position]['id'] for position in _iter_bits(bits)]
+
+    def match(self, site, min_score=0.0, limit=None):
+        """
+        site: {criterion: [values]} using the keys of MATCH_CRITERIA.
+        Several values for one criterion are OR-ed; criteria are AND-ed for an
+        exact match and counted for the partial-match score. May lag a catalog
+        write by up to TECHNOLOGY_MATCH_CHECK_INTERVAL seconds.
+        """
+        index = self.get_index(getattr(settings, 'TECHNOLOGY_MATCH_CHECK_INTERVAL', 1.0))
+        criteria = {c: values for c, values in site.items() if values}
+        total = len(criteria)
+        if not total:
+            return []
+
+        # Bit-sliced counter: planes[i] holds bit i of each technology's
+        # matched-criteria count, so scoring stays in bitset arithmetic.
+        planes = []
+        candidates = 0
+        for criterion, values in criteria.items():
+            postings = index.postings[criterion]
+            bits = 0
+            for value in values:
+                bits |= postings.get(_normalize_value(value), 0)
+            candidates |= bits
+            carry = bits
+            for i, plane in enumerate(planes):
+                planes[i] = plane ^ carry
+                carry &= plane
+                if not carry:
+                    break
+            if carry:
+                planes.append(carry)
+
+        results = []
+        for matched in range(total, 0, -1):
+            score = matched / total
+            if score < min_score:
+                break
+            bucket = candidates
+            for i, plane in enumerate(planes):
+                bucket &= plane if matched >> i & 1 else ~plane
+            if matched >> len(planes):
+                bucket = 0
+            for position in _iter_bits(bucket):
+                entry = index.entries[position]
+                results.append({
+                    **entry,
+                    'score': round(score, 4),
+                    'matched_criteria': matched,
+                    'exact_match': matched == total,
+                })
+                if limit and len(results) >= limit:
+                    return results
+        return results
+
+
+technology_matcher = TechnologyMatcher()
+
+
+# =================
+
+# =================
+# TECHNOLOGY BULK UPSERT - materials/serializers.py, materials/parsers.py, materials/bulk.py
+# =================
+import json
+
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .catalog_cache import bump_catalog_version
+
+
+class TechnologyEntrySerializer(serializers.ModelSerializer):
+    """
+    Serializer for TechnologyEntry rows.
+    Frontend Integration: TechnologyForm.tsx, TechnologiesTable.tsx
+    """
+
+    class Meta:
+        model = TechnologyEntry
+        fields = '__all__'
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+TECHNOLOGY_LIST_FIELDS = [
+    'id', 'technology_name', 'irrigation_type', 'description', 'efficiency',
+    'water_requirement', 'lifespan', 'maintenance_level', 'suitable_soil_types',
+    'suitable_crop_types', 'suitable_farm_sizes', 'water_quality_requirements',
+    'suitable_topography', 'climate_zones', 'created_at', 'updated_at',
+]
+
+
+class TechnologyEntryBulkSerializer(TechnologyEntrySerializer):
+    """
+    Row validation for bulk upserts - the unique_together validator is dropped
+    because conflicts on (technology_name, irrigation_type) become updates.
+    """
+
+    class Meta(TechnologyEntrySerializer.Meta):
+        validators = []
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON (one object per line) into a list.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        rows = []
+        if stream is None:
+            return rows
+        for line_number, line in enumerate(stream, start=1):
+            line = line.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(f'NDJSON parse error on line {line_number}: {exc}')
+        return rows
+
+
+TECHNOLOGY_UPSERT_KEY = ('technology_name', 'irrigation_type')
+TECHNOLOGY_UPSERT_FIELDS = [
+    'description', 'efficiency', 'water_requirement', 'lifespan', 'maintenance_level',
+    'suitable_soil_types', 'suitable_crop_types', 'suitable_farm_sizes',
+    'water_quality_requirements', 'suitable_topography', 'climate_zones', 'updated_at',
+]
+TECHNOLOGY_BULK_BATCH_SIZE = 1000
+
+
+def bulk_upsert_technologies(rows):
+    """
+    Validate and upsert a batch of technology rows in one transaction.
+    Returns one outcome dict per input row: created, updated, skipped or error.
+    """
+    results = [None] * len(rows)
+    pending = {}  # upsert key -> (row index, validated data); the last row for a key wins
+
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results[i] = {'row': i, 'status': 'error', 'errors': {'non_field_errors': ['Expected an object']}}
+            continue
+        serializer = TechnologyEntryBulkSerializer(data=row)
+        if not serializer.is_valid():
+            results[i] = {'row': i, 'status': 'error', 'errors': serializer.errors}
+            continue
+        data = serializer.validated_data
+        key = (data['technology_name'], data['irrigation_type'])
+        if key in pending:
+            earlier = pending[key][0]
+            results[earlier] = {'row': earlier, 'status': 'skipped', 'reason': f'Superseded by row {i}'}
+        pending[key] = (i, data)
+
+    if pending:
+        names = {key[0] for key in pending}
+        types = {key[1] for key in pending}
+        with transaction.atomic():
+            existing = {
+                (name, irrigation_type)
+                for name, irrigation_type in TechnologyEntry.objects.filter(
+                    technology_name__in=names, irrigation_type__in=types
+                ).values_list(*TECHNOLOGY_UPSERT_KEY)
+            }
+            TechnologyEntry.objects.bulk_create(
+                [TechnologyEntry(**data) for _, data in pending.values()],
+                batch_size=TECHNOLOGY_BULK_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=list(TECHNOLOGY_UPSERT_KEY),
+                update_fields=TECHNOLOGY_UPSERT_FIELDS,
+            )
+            ids = {
+                (name, irrigation_type): pk
+                for name, irrigation_type, pk in TechnologyEntry.objects.filter(
+                    technology_name__in=names, irrigation_type__in=types
+                ).values_list(*TECHNOLOGY_UPSERT_KEY, 'id')
+            }
+            # bulk_create skips post_save, so bump the catalog version explicitly
+            transaction.on_commit(bump_catalog_version)
+
+        for key, (i, _) in pending.items():
+            results[i] = {
+                'row': i,
+                'status': 'updated' if key in existing else 'created',
+                'id': ids.get(key),
+            }
+
+    return results
+
+# =================
+
+# =================
+# CATALOG SNAPSHOT - materials/snapshot.py
+# =================
+# The materials, equipment, labor, costing-rule and technology catalogs are
+# compiled into one read-only file per catalog version and memory-mapped, so
+# every worker on a host shares the same page-cache copy instead of holding
+# its own dicts. Layout: a fixed header, a small JSON directory, then aligned
+# binary blocks - one column array per field (int64 / float64 values, uint32
+# indexes into an interned string table, offset arrays for string lists) and
+# a sorted id -> row index per table.
+import array
+import bisect
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .catalog import (
+    get_costing_rules, get_equipment, get_labor_rates, get_materials, get_suitability_criteria,
+)
+from .catalog_cache import get_catalog_version
+from .models import TechnologyEntry
+from .serializers import TECHNOLOGY_LIST_FIELDS
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'IRCS'
+SNAPSHOT_FORMAT = 3
+# magic, format, reserved, catalog version, directory length
+_HEADER = struct.Struct('<4sHHQI')
+_ALIGN = 8
+_NULL_INT = -(2 ** 63)
+_NULL_STRING = 0xFFFFFFFF
+_TYPECODES = {'i64': 'q', 'f64': 'd', 'str': 'I', 'strlist': 'I', 'json': 'I'}
+_MISSING = object()
+
+
+class SnapshotError(Exception):
+    """The file is not a readable snapshot for this build"""
+
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _normalize(value):
+    # Same representation the JSON renderer gives these types
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _column_kind(values):
+    present = [v for v in values if v is not _MISSING and v is not None]
+    if not present:
+        return 'json'
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return 'i64'
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return 'f64'
+    if all(isinstance(v, str) for v in present):
+        return 'str'
+    if len(present) == sum(v is not _MISSING for v in values) and all(
+            isinstance(v, list) and all(isinstance(item, str) for item in v) for v in present):
+        return 'strlist'
+    return 'json'
+
+
+class _SnapshotWriter:
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.strings = {}
+
+    def intern(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def blob(self, data):
+        self.buffer.extend(b'\0' * (_aligned(len(self.buffer)) - len(self.buffer)))
+        offset = len(self.buffer)
+        self.buffer.extend(data)
+        return [offset, len(data)]
+
+    def table(self, rows):
+        rows = [{key: _normalize(value) for key, value in row.items()} for row in rows]
+        fields = list(dict.fromkeys(key for row in rows for key in row))
+        columns = {}
+        for field in fields:
+            values = [row.get(field, _MISSING) for row in rows]
+            kind = _column_kind(values)
+            column = {'kind': kind}
+            if any(v is _MISSING for v in values):
+                column['missing'] = self.blob(bytes(v is _MISSING for v in values))
+            values = [None if v is _MISSING else v for v in values]
+
+            if kind == 'i64':
+                data = array.array('q', (_NULL_INT if v is None else v for v in values))
+            elif kind == 'f64':
+                data = array.array('d', (math.nan if v is None else float(v) for v in values))
+            elif kind == 'str':
+                data = array.array('I', (_NULL_STRING if v is None else self.intern(v) for v in values))
+            elif kind == 'strlist':
+                offsets, data = array.array('I', [0]), array.array('I')
+                for items in values:
+                    data.extend(self.intern(item) for item in items or ())
+                    offsets.append(len(data))
+                column['offsets'] = self.blob(offsets.tobytes())
+            else:
+                data = array.array('I', (
+                    _NULL_STRING if v is None else self.intern(json.dumps(v, separators=(',', ':')))
+                    for v in values
+                ))
+            column['data'] = self.blob(data.tobytes())
+            columns[field] = column
+
+        # Every table gets an index (empty without rows); rows without an
+        # integer id are simply not reachable by id
+        keyed = sorted(
+            (row['id'], i) for i, row in enumerate(rows)
+            if isinstance(row.get('id'), int) and not isinstance(row['id'], bool)
+        )
+        return {
+            'rows': len(rows),
+            'fields': fields,
+            'columns': columns,
+            'index': {
+                'ids': self.blob(array.array('q', (id for id, _ in keyed)).tobytes()),
+                'positions': self.blob(array.array('I', (i for _, i in keyed)).tobytes()),
+            },
+        }
+
+    def strings_table(self):
+        encoded = [value.encode('utf-8') for value in self.strings]
+        offsets = array.array('I', [0])
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+        return {'offsets': self.blob(offsets.tobytes()), 'data': self.blob(b''.join(encoded))}
+
+
+class CatalogTable:
+    """
+    Read-only view of one catalog inside a snapshot. Numeric columns and the
+    id index are memoryviews over the mapped file; strings are decoded once
+    per process and interned.
+    """
+
+    def __init__(self, snapshot, spec):
+        self._snapshot = snapshot
+        self._length = spec['rows']
+        self.fields = spec['fields']
+        self._columns = {}
+        for name, column in spec['columns'].items():
+            self._columns[name] = (
+                column['kind'],
+                snapshot._view(column['data'], _TYPECODES[column['kind']]),
+                snapshot._view(column['offsets'], 'I') if 'offsets' in column else None,
+                snapshot._view(column['missing'], 'B') if 'missing' in column else None,
+            )
+        self.sorted_ids = snapshot._view(spec['index']['ids'], 'q')
+        self.id_positions = snapshot._view(spec['index']['positions'], 'I')
+
+    def __len__(self):
+        return self._length
+
+    def kind(self, name):
+        """Storage kind of a column ('i64', 'f64', 'str', 'strlist', 'json'), None if absent"""
+        column = self._columns.get(name)
+        return None if column is None else column[0]
+
+    def column(self, name):
+        """Raw column array - int64/float64 values or uint32 string indexes"""
+        return self._columns[name][1]
+
+    def float_values(self, name):
+        """
+        Column as float64 in row order, NaN where null, missing or not a
+        number. Zero-copy for f64 columns; other kinds are converted.
+        """
+        kind = self.kind(name)
+        if kind == 'f64':
+            return self.column(name)
+        if kind == 'i64':
+            return array.array('d', (math.nan if raw == _NULL_INT else raw for raw in self.column(name)))
+        values = array.array('d')
+        for position in range(self._length):
+            value = self.value(position, name)
+            try:
+                values.append(float(value))
+            except (TypeError, ValueError):
+                values.append(math.nan)
+        return values
+
+    def position(self, id):
+        """Row position of `id`, or None"""
+        i = bisect.bisect_left(self.sorted_ids, id)
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == id:
+            return self.id_positions[i]
+        return None
+
+    def value(self, position, name, default=None):
+        column = self._columns.get(name)
+        if column is None:
+            return default
+        kind, data, offsets, missing = column
+        if missing is not None and missing[position]:
+            return default
+        raw = data[position]
+        if kind == 'i64':
+            return None if raw == _NULL_INT else raw
+        if kind == 'f64':
+            return None if math.isnan(raw) else raw
+        if kind == 'strlist':
+            string = self._snapshot.string
+            return [string(data[i]) for i in range(offsets[position], offsets[position + 1])]
+        if raw == _NULL_STRING:
+            return None
+        if kind == 'str':
+            return self._snapshot.string(raw)
+        return json.loads(self._snapshot.string(raw))
+
+    def get(self, id, name, default=None):
+        """Single field of the row with `id`"""
+        position = self.position(id)
+        return default if position is None else self.value(position, name, default)
+
+    def row(self, position):
+        row = {}
+        for name in self.fields:
+            value = self.value(position, name, _MISSING)
+            if value is not _MISSING:
+                row[name] = value
+        return row
+
+    def rows(self):
+        return [self.row(position) for position in range(self._length)]
+
+
+class CatalogSnapshot:
+    """
+    Snapshot for one catalog version over any buffer - normally a shared
+    mapping from open(). Never closed explicitly: a replaced snapshot is
+    released once no request holds its views.
+    """
+
+    def __init__(self, buffer, source='<memory>'):
+        self._buffer = buffer
+        if len(buffer) < _HEADER.size:
+            raise SnapshotError(f'{source}: truncated snapshot')
+        magic, file_format, _, self.version, directory_length = _HEADER.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC or file_format != SNAPSHOT_FORMAT:
+            raise SnapshotError(f'{source}: not a format {SNAPSHOT_FORMAT} catalog snapshot')
+        directory = json.loads(bytes(buffer[_HEADER.size:_HEADER.size + directory_length]))
+        if directory['byteorder'] != sys.byteorder:
+            raise SnapshotError(f'{source}: written on a {directory["byteorder"]}-endian host')
+
+        self.fingerprint = directory['fingerprint']
+        self._data = memoryview(buffer)[_aligned(_HEADER.size + directory_length):]
+        self._string_offsets = self._view(directory['strings']['offsets'], 'I')
+        self._string_data = self._view(directory['strings']['data'], 'B')
+        self._decoded = {}
+        self.tables = {name: CatalogTable(self, spec) for name, spec in directory['tables'].items()}
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                raise SnapshotError(f'{path}: truncated snapshot')
+        return cls(buffer, path)
+
+    def _view(self, blob, typecode):
+        offset, length = blob
+        return self._data[offset:offset + length].cast(typecode)
+
+    def string(self, index):
+        value = self._decoded.get(index)
+        if value is None:
+            start, end = self._string_offsets[index], self._string_offsets[index + 1]
+            value = self._decoded[index] = sys.intern(str(self._string_data[start:end], 'utf-8'))
+        return value
+
+    def __getitem__(self, name):
+        return self.tables[name]
+
+
+def get_snapshot_dir():
+    return getattr(settings, 'CATALOG_SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'catalog-snapshots'))
+
+
+def snapshot_path(version):
+    return os.path.join(get_snapshot_dir(), f'catalog-v{version}.snap')
+
+
+def catalog_fingerprint():
+    """
+    Digest of the technology table's row count, highest id and latest update.
+    The version counter restarts at 1 after a cache flush or restart (and per
+    process with LocMemCache), so a file is only reused if this still matches.
+    """
+    summary = TechnologyEntry.objects.aggregate(rows=Count('id'), last_id=Max('id'), last_update=Max('updated_at'))
+    last_update = summary['last_update'].isoformat() if summary['last_update'] else ''
+    return f"{summary['rows']}:{summary['last_id'] or 0}:{last_update}"
+
+
+def _catalog_sources():
+    return {
+        'materials': get_materials(),
+        'equipment': get_equipment(),
+        'labor': get_labor_rates(),
+        'costing_rules': get_costing_rules(),
+        'suitability_criteria': get_suitability_criteria(),
+        'technologies': TechnologyEntry.objects.order_by('id').values(*TECHNOLOGY_LIST_FIELDS),
+    }
+
+
+def _prune_snapshots(directory, keep):
+    # Unlinking is safe on POSIX: workers still mapping an old file keep it
+    snapshots = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.startswith('catalog-v') and entry.name.endswith('.snap')),
+        key=lambda entry: entry.stat().st_mtime, reverse=True
+    )
+    for entry in snapshots[keep:]:
+        try:
+            os.unlink(entry.path)
+        except OSError:
+            pass
+
+
+def compile_catalog_snapshot(version):
+    """Snapshot bytes for the current catalog rows, labelled `version`"""
+    # Taken before the rows: a write in between leaves the file looking stale,
+    # so it is rebuilt, never trusted with rows newer than its fingerprint
+    fingerprint = catalog_fingerprint()
+    writer = _SnapshotWriter()
+    tables = {name: writer.table(rows) for name, rows in _catalog_sources().items()}
+    directory = json.dumps({
+        'byteorder': sys.byteorder,
+        'fingerprint': fingerprint,
+        'tables': tables,
+        'strings': writer.strings_table(),
+    }).encode()
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, 0, version, len(directory))
+    padding = _aligned(len(header) + len(directory)) - len(header) - len(directory)
+    return b''.join((header, directory, b'\0' * padding, writer.buffer))
+
+
+def publish_catalog_snapshot(data, version):
+    """
+    Write snapshot bytes for `version` and publish them with an atomic
+    rename. Concurrent builders of the same version each write a private
+    temp file, so readers never see a partial one.
+    """
+    snapshot_dir = get_snapshot_dir()
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = snapshot_path(version)
+    fd, tmp_path = tempfile.mkstemp(dir=snapshot_dir, prefix='.catalog-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    _prune_snapshots(snapshot_dir, getattr(settings, 'CATALOG_SNAPSHOT_KEEP', 3))
+    return path
+
+
+def build_catalog_snapshot(version=None):
+    """Compile and publish the snapshot for `version` (default: current)"""
+    if version is None:
+        version = get_catalog_version()
+    return publish_catalog_snapshot(compile_catalog_snapshot(version), version)
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_catalog_snapshot():
+    """Mapped snapshot for the current catalog version, built on first use"""
+    global _snapshot
+    version = get_catalog_version()
+    snapshot = _snapshot
+    if snapshot is None or snapshot.version != version:
+        with _snapshot_lock:
+            snapshot = _snapshot
+            if snapshot is None or snapshot.version != version:
+                try:
+                    snapshot = CatalogSnapshot.open(snapshot_path(version))
+                    if snapshot.fingerprint != catalog_fingerprint():
+                        raise SnapshotError(f'{snapshot_path(version)}: left over from an earlier version counter')
+                except (OSError, SnapshotError):
+                    data = compile_catalog_snapshot(version)
+                    try:
+                        snapshot = CatalogSnapshot.open(publish_catalog_snapshot(data, version))
+                    except (OSError, SnapshotError) as exc:
+                        # Unwritable snapshot dir: serve a private copy rather than fail
+                        logger.warning('Catalog snapshot not shared, using an in-memory copy: %s', exc)
+                        snapshot = CatalogSnapshot(data)
+                _snapshot = snapshot
+    return snapshot
+
+# materials/management/commands/build_catalog_snapshot.py - run at deploy so
+# the first request after boot does not pay for the build
+"""
+import os
+
+from django.core.management.base import BaseCommand
+
+from materials.snapshot import build_catalog_snapshot
+
+
+class Command(BaseCommand):
+    help = "Compiles the resource and technology catalogs into a memory-mapped snapshot"
+
+    def handle(self, *args, **options):
+        path = build_catalog_snapshot()
+        self.stdout.write(f'Wrote {path} ({os.path.getsize(path)} bytes)')
+"""
+
+# =================
+# BOQ COSTING ENGINE - materials/costing.py
+# =================
+# Requires numpy (pip install numpy)
+import math
+import threading
+
+import numpy as np
+
+from .snapshot import CatalogTable, get_catalog_snapshot
+
+# Resource type codes used for the line columns
+RESOURCE_TYPES = ('materials', 'equipment', 'labor')
+# Rule `region` / `applies_to` values that match every region / resource type
+_GLOBAL_REGIONS = {'', 'all', 'any'}
+_ALL_RESOURCE_TYPES = {'', 'all', 'any'}
+
+
+def _price_table(rows, price_field):
+    """Sorted id and unit price arrays for searchsorted lookups"""
+    if isinstance(rows, CatalogTable):
+        # Ids come pre-sorted from the snapshot index; only prices are gathered.
+        # float_values() maps null and non-numeric prices to NaN (unresolved)
+        ids = np.asarray(rows.sorted_ids, dtype=np.int64)
+        positions = np.asarray(rows.id_positions, dtype=np.intp)
+        prices = np.asarray(rows.float_values(price_field), dtype=np.float64)
+        return ids, prices[positions] if len(positions) else np.empty(0, dtype=np.float64)
+    ids = np.fromiter((row['id'] for row in rows), dtype=np.int64, count=len(rows))
+    prices = np.fromiter((row[price_field] for row in rows), dtype=np.float64, count=len(rows))
+    order = np.argsort(ids, kind='stable')
+    return ids[order], prices[order]
+
+
+class BOQCostingEngine:
+    """
+    Costs bills of quantities for many projects at once.
+    Every BOQ line becomes a row in column arrays (project, resource type,
+    resource id, quantity, unit price); catalog prices are resolved with
+    searchsorted and costing rules are applied as masked multipliers, so the
+    work per rule is one vectorized pass over all lines.
+    Frontend Integration: BOQCostingStep.tsx, CostingStep.tsx
+    """
+
+    def __init__(self, materials, equipment, labor, rules):
+        self.tables = [
+            _price_table(materials, 'cost_per_unit'),
+            _price_table(equipment, 'cost_per_unit'),
+            _price_table(labor, 'hourly_rate'),
+        ]
+        self.rules = rules
+
+    def _rule_factor(self, rule):
+        if not isinstance(rule, dict):
+            raise ValueError(f'Costing rule must be an object, got {type(rule).__name__}')
+        rule_type = rule.get('rule_type')
+        try:
+            value = float(rule.get('value', 0))
+        except (TypeError, ValueError):
+            raise ValueError(f"Rule {rule.get('id')}: value must be a number")
+        if not math.isfinite(value):
+            raise ValueError(f"Rule {rule.get('id')}: value must be finite")
+        if rule_type == 'percentage':
+            return 1.0 + value / 100.0
+        if rule_type == 'multiplier':
+            return value
+        raise ValueError(f"Unknown rule_type '{rule_type}' in rule {rule.get('id')}")
+
+    def cost(self, projects, rules=None, include_lines=False):
+        """
+        projects: [{'project_id', 'region', 'lines': [{'resource_type', 'resource_id',
+        'quantity', optional 'unit_price'}]}]
+        Returns one summary per project, in input order.
+        """
+        rules = self.rules if rules is None else rules
+        type_codes = {name: code for code, name in enumerate(RESOURCE_TYPES)}
+        # Every rule is checked up front, not only those that match a line
+        rule_factors = [self._rule_factor(rule) for rule in rules]
+
+        regions = {}
+        project_region = []
+        project_idx, line_type, resource_id, quantity, explicit_price = [], [], [], [], []
+        for p, project in enumerate(projects):
+            if not isinstance(project, dict):
+                raise ValueError(f'Project {p}: must be an object')
+            lines = project.get('lines') or []
+            if not isinstance(lines, list):
+                raise ValueError(f'Project {p}: lines must be a list')
+            region = str(project.get('region') or '').strip().casefold()
+            project_region.append(regions.setdefault(region, len(regions)))
+            for n, line in enumerate(lines):
+                try:
+                    code = type_codes[line['resource_type']]
+                    qty = float(line['quantity'])
+                    unit_price = line.get('unit_price')
+                    unit_price = float('nan') if unit_price is None else float(unit_price)
+                    rid = int(line.get('resource_id') or 0)
+                except (KeyError, TypeError, ValueError) as exc:
+                    raise ValueError(f'Project {p} line {n}: invalid line ({exc!r})')
+                if not math.isfinite(qty) or qty < 0:
+                    raise ValueError(f'Project {p} line {n}: quantity must be a finite, non-negative number')
+                if line.get('unit_price') is not None and not math.isfinite(unit_price):
+                    raise ValueError(f'Project {p} line {n}: unit_price must be finite')
+                project_idx.append(p)
+                line_type.append(code)
+                resource_id.append(rid)
+                quantity.append(qty)
+                explicit_price.append(unit_price)
+
+        project_idx = np.asarray(project_idx, dtype=np.int64)
+        line_type = np.asarray(line_type, dtype=np.int8)
+        resource_id = np.asarray(resource_id, dtype=np.int64)
+        quantity = np.asarray(quantity, dtype=np.float64)
+        unit_price = np.asarray(explicit_price, dtype=np.float64)
+        line_region = np.asarray(project_region, dtype=np.int64)[project_idx] if len(project_idx) else project_idx
+
+        # Resolve catalog prices for lines without an explicit unit_price
+        needs_price = np.isnan(unit_price)
+        for code, (ids, prices) in enumerate(self.tables):
+            mask = needs_price & (line_type == code)
+            if not mask.any() or not len(ids):
+                continue
+            wanted = resource_id[mask]
+            pos = np.clip(np.searchsorted(ids, wanted), 0, len(ids) - 1)
+            unit_price[mask] = np.where(ids[pos] == wanted, prices[pos], np.nan)
+        unresolved = np.isnan(unit_price)
+        unit_price[unresolved] = 0.0
+
+        # Apply costing rules as multiplicative factors over masked lines
+        factor = np.ones_like(quantity)
+        for rule, rule_factor in zip(rules, rule_factors):
+            applies_to = str(rule.get('applies_to') or 'all').strip().casefold()
+            mask = np.ones_like(factor, dtype=bool)
+            if applies_to not in _ALL_RESOURCE_TYPES:
+                if applies_to not in type_codes:
+                    continue
+                mask &= line_type == type_codes[applies_to]
+            region = str(rule.get('region') or '').strip().casefold()
+            if region not in _GLOBAL_REGIONS:
+                if region not in regions:
+                    continue
+                mask &= line_region == regions[region]
+            factor[mask] *= rule_factor
+
+        base_cost = quantity * unit_price
+        adjusted_cost = base_cost * factor
+
+        count = len(projects)
+        base_totals = np.bincount(project_idx, weights=base_cost, minlength=count)
+        adjusted_totals = np.bincount(project_idx, weights=adjusted_cost, minlength=count)
+        by_type = np.bincount(
+            project_idx * len(RESOURCE_TYPES) + line_type,
+            weights=adjusted_cost, minlength=count * len(RESOURCE_TYPES)
+        ).reshape(count, len(RESOURCE_TYPES))
+        line_counts = np.bincount(project_idx, minlength=count)
+        unresolved_counts = np.bincount(project_idx, weights=unresolved, minlength=count)
+
+        results = []
+        starts = np.concatenate(([0], np.cumsum(line_counts)))
+        for p, project in enumerate(projects):
+            summary = {
+                'project_id': project.get('project_id'),
+                'region': project.get('region'),
+                'line_count': int(line_counts[p]),
+                'unresolved_lines': int(unresolved_counts[p]),
+                'base_total': round(float(base_totals[p]), 2),
+                'adjusted_total': round(float(adjusted_totals[p]), 2),
+                'totals_by_type': {
+                    name: round(float(by_type[p, code]), 2)
+                    for code, name in enumerate(RESOURCE_TYPES)
+                },
+            }
+            if include_lines:
+                s, e = starts[p], starts[p + 1]
+                summary['lines'] = [
+                    {
+                        'resource_type': RESOURCE_TYPES[t],
+                        'resource_id': int(r),
+                        'quantity': float(q),
+                        'unit_price': float(u),
+                        'factor': round(float(f), 6),
+                        'base_cost': round(float(b), 2),
+                        'adjusted_cost': round(float(a), 2),
+                        'resolved': not bool(x),
+                    }
+                    for t, r, q, u, f, b, a, x in zip(
+                        line_type[s:e], resource_id[s:e], quantity[s:e], unit_price[s:e],
+                        factor[s:e], base_cost[s:e], adjusted_cost[s:e], unresolved[s:e]
+                    )
+                ]
+            results.append(summary)
+        return results
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_costing_engine():
+    """Costing engine for the current catalog version, rebuilt when it moves"""
+    global _engine
+    snapshot = get_catalog_snapshot()
+    engine = _engine
+    if engine is None or engine[0] != snapshot.version:
+        with _engine_lock:
+            engine = _engine
+            if engine is None or engine[0] != snapshot.version:
+                engine = _engine = (snapshot.version, BOQCostingEngine(
+                    snapshot['materials'], snapshot['equipment'], snapshot['labor'],
+                    snapshot['costing_rules'].rows()
+                ))
+    return engine[1]
+
+# =================
+
+# =================
+# CROP WATER REQUIREMENT ENGINE - materials/cwr.py
+# =================
+# Requires numpy (pip install numpy)
+import numpy as np
+
+# FAO-56 Table 11/12 defaults: Kc (initial, mid, end) and stage lengths in days
+# (initial, development, mid_season, late_season). Requests may override both.
+CROP_COEFFICIENTS = {
+    'wheat': {'kc': (0.30, 1.15, 0.30), 'stages': (20, 25, 60, 30)},
+    'rice': {'kc': (1.05, 1.20, 0.75), 'stages': (30, 30, 60, 30)},
+    'cotton': {'kc': (0.35, 1.18, 0.60), 'stages': (30, 50, 60, 55)},
+    'sugarcane': {'kc': (0.40, 1.25, 0.75), 'stages': (35, 60, 190, 120)},
+    'maize': {'kc': (0.30, 1.20, 0.50), 'stages': (20, 35, 40, 30)},
+    'soybean': {'kc': (0.40, 1.15, 0.50), 'stages': (20, 35, 60, 25)},
+    'vegetables': {'kc': (0.70, 1.05, 0.95), 'stages': (20, 30, 30, 15)},
+    'fruits': {'kc': (0.60, 0.95, 0.75), 'stages': (20, 70, 90, 30)},
+}
+KC_KEYS = ('initial', 'mid', 'end')
+STAGE_KEYS = ('initial', 'development', 'mid_season', 'late_season')
+CLIMATE_SERIES = ('tmin', 'tmax', 'rh_min', 'rh_max', 'rh_mean', 'tdew',
+                  'wind_speed', 'solar_radiation', 'sunshine_hours', 'rainfall')
+
+SOLAR_CONSTANT = 0.0820  # MJ m-2 min-1
+STEFAN_BOLTZMANN = 4.903e-9  # MJ K-4 m-2 day-1
+ALBEDO = 0.23
+DEFAULT_WIND_SPEED = 2.0  # m/s at 2 m, FAO-56 recommendation when wind is not measured
+
+
+def _saturation_vapour_pressure(temperature):
+    return 0.6108 * np.exp(17.27 * temperature / (temperature + 237.3))
+
+
+def reference_et0(tmin, tmax, day_of_year, latitude, elevation, rh_min=None, rh_max=None,
+                  rh_mean=None, tdew=None, wind_speed=None, solar_radiation=None, sunshine_hours=None):
+    """
+    Daily FAO-56 Penman-Monteith reference evapotranspiration in mm/day.
+    All arguments broadcast (stations x days); optional series may hold NaN
+    where a value is missing. Actual vapour pressure falls back from
+    RH min/max to mean RH, dew point and finally Tmin; solar radiation from
+    measured to Angstrom (sunshine hours) to Hargreaves (temperature range).
+    """
+    t_mean = (tmax + tmin) / 2.0
+    pressure = 101.3 * ((293.0 - 0.0065 * elevation) / 293.0) ** 5.26
+    gamma = 0.000665 * pressure
+    es_tmax = _saturation_vapour_pressure(tmax)
+    es_tmin = _saturation_vapour_pressure(tmin)
+    es = (es_tmax + es_tmin) / 2.0
+    delta = 4098.0 * _saturation_vapour_pressure(t_mean) / (t_mean + 237.3) ** 2
+
+    nan = np.full(np.broadcast(tmin, tmax).shape, np.nan)
+    ea = nan.copy()
+    if rh_min is not None and rh_max is not None:
+        ea = (es_tmin * rh_max / 100.0 + es_tmax * rh_min / 100.0) / 2.0
+    if rh_mean is not None:
+        ea = np.where(np.isnan(ea), es * rh_mean / 100.0, ea)
+    if tdew is not None:
+        ea = np.where(np.isnan(ea), _saturation_vapour_pressure(tdew), ea)
+    ea = np.where(np.isnan(ea), es_tmin, ea)
+
+    # Extraterrestrial radiation (FAO-56 eq. 21-25)
+    phi = np.radians(latitude)
+    angle = 2.0 * np.pi * day_of_year / 365.0
+    dr = 1.0 + 0.033 * np.cos(angle)
+    declination = 0.409 * np.sin(angle - 1.39)
+    ws = np.arccos(np.clip(-np.tan(phi) * np.tan(declination), -1.0, 1.0))
+    ra = (24.0 * 60.0 / np.pi) * SOLAR_CONSTANT * dr * (
+        ws * np.sin(phi) * np.sin(declination) + np.cos(phi) * np.cos(declination) * np.sin(ws)
+    )
+
+    rs = nan.copy() if solar_radiation is None else solar_radiation
+    if sunshine_hours is not None:
+        daylight_hours = 24.0 / np.pi * ws
+        rs = np.where(np.isnan(rs), (0.25 + 0.50 * sunshine_hours / daylight_hours) * ra, rs)
+    rs = np.where(np.isnan(rs), 0.16 * np.sqrt(np.maximum(tmax - tmin, 0.0)) * ra, rs)
+
+    rso = (0.75 + 2e-5 * elevation) * ra
+    relative_shortwave = np.clip(np.divide(rs, rso, out=np.ones_like(rs), where=rso > 0), 0.0, 1.0)
+    rns = (1.0 - ALBEDO) * rs
+    rnl = STEFAN_BOLTZMANN * ((tmax + 273.16) ** 4 + (tmin + 273.16) ** 4) / 2.0 * (
+        0.34 - 0.14 * np.sqrt(np.maximum(ea, 0.0))
+    ) * (1.35 * relative_shortwave - 0.35)
+    rn = rns - rnl
+
+    u2 = DEFAULT_WIND_SPEED if wind_speed is None else np.where(np.isnan(wind_speed), DEFAULT_WIND_SPEED, wind_speed)
+    et0 = (0.408 * delta * rn + gamma * 900.0 / (t_mean + 273.0) * u2 * (es - ea)) / (
+        delta + gamma * (1.0 + 0.34 * u2)
+    )
+    return np.maximum(et0, 0.0)
+
+
+def kc_curves(stages, kc):
+    """
+    Daily crop coefficient per crop row from the FAO-56 four-stage curve:
+    flat initial, linear development, flat mid-season, linear late season.
+    stages: (crops, 4) days, kc: (crops, 3). Returns (crops, longest season),
+    NaN past the end of each season.
+    """
+    t = np.arange(int(stages.sum(axis=1).max()), dtype=np.float64)[None, :]
+    initial, development, mid_season, late_season = (stages[:, i:i + 1] for i in range(4))
+    kc_ini, kc_mid, kc_end = (kc[:, i:i + 1] for i in range(3))
+    end_initial = initial
+    end_development = end_initial + development
+    end_mid = end_development + mid_season
+    end_late = end_mid + late_season
+    return np.select(
+        [t < end_initial, t < end_development, t < end_mid, t < end_late],
+        [
+            np.broadcast_to(kc_ini, (len(stages), t.shape[1])),
+            kc_ini + (t - end_initial) / np.maximum(development, 1) * (kc_mid - kc_ini),
+            np.broadcast_to(kc_mid, (len(stages), t.shape[1])),
+            kc_mid + (t - end_mid) / np.maximum(late_season, 1) * (kc_end - kc_mid),
+        ],
+        default=np.nan,
+    )
+
+
+def _climate_arrays(climate):
+    """Stack named daily climate series into (stations x days) arrays"""
+    names = list(climate)
+    lengths = []
+    for name in names:
+        station = climate[name]
+        if len(station.get('tmin') or []) != len(station.get('tmax') or []) or not station.get('tmax'):
+            raise ValueError(f"Climate '{name}': tmin and tmax must be non-empty series of equal length")
+        lengths.append(len(station['tmax']))
+    days = max(lengths)
+
+    series = {}
+    for key in CLIMATE_SERIES:
+        if not any(climate[name].get(key) is not None for name in names):
+            series[key] = None
+            continue
+        stacked = np.full((len(names), days), np.nan)
+        for s, name in enumerate(names):
+            values = climate[name].get(key)
+            if values is None:
+                continue
+            if len(values) != lengths[s]:
+                raise ValueError(f"Climate '{name}': {key} must have {lengths[s]} values")
+            try:
+                stacked[s, :lengths[s]] = np.asarray(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                raise ValueError(f"Climate '{name}': {key} must contain numbers")
+        series[key] = stacked
+
+    try:
+        starts = np.array([np.datetime64(climate[name]['start_date'], 'D') for name in names])
+        latitude = np.array([float(climate[name]['latitude']) for name in names])[:, None]
+        elevation = np.array([float(climate[name].get('elevation') or 0.0) for name in names])[:, None]
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f'Climate stations need start_date, latitude and optional elevation ({exc!r})')
+    dates = starts[:, None] + np.arange(days)
+    day_of_year = (dates - dates.astype('datetime64[Y]')).astype(np.int64) + 1
+    month = dates.astype('datetime64[M]').astype(np.int64) % 12
+    return names, np.asarray(lengths), starts, latitude, elevation, day_of_year, month, series
+
+
+def _daily_series(values, decimals):
+    """Rounded daily values as a JSON-safe list; days without weather data are None"""
+    rounded = np.round(values, decimals)
+    return np.where(np.isfinite(rounded), rounded, None).tolist()
+
+
+def compute_water_requirements(climate, zones, technology_efficiency=None,
+                               effective_rainfall_fraction=0.8, include_daily=False, max_cells=None):
+    """
+    Net and gross irrigation requirement for every zone-crop combination.
+    climate: {name: {'start_date', 'latitude', 'elevation'?, 'tmin', 'tmax', optional
+    'rh_min'/'rh_max'/'rh_mean'/'tdew', 'wind_speed', 'solar_radiation'/'sunshine_hours', 'rainfall'}}
+    zones: [{'zone_id', 'climate', 'efficiency'? (%) or 'technology_id'?, 'crops': [{'crop',
+    'planting_date', 'area' (ha), 'stages'? {initial, development, mid_season, late_season},
+    'kc'? {initial, mid, end}}]}]
+    technology_efficiency: {technology_id: efficiency %} for zones given a technology_id.
+    ET0 is computed once per station-day; Kc curves, ETc, effective rainfall and
+    gross demand are (combinations x season days) array operations.
+    """
+    technology_efficiency = technology_efficiency or {}
+    names, lengths, starts, latitude, elevation, day_of_year, month, series = _climate_arrays(climate)
+    station_index = {name: s for s, name in enumerate(names)}
+
+    et0 = reference_et0(
+        series['tmin'], series['tmax'], day_of_year, latitude, elevation,
+        rh_min=series['rh_min'], rh_max=series['rh_max'], rh_mean=series['rh_mean'], tdew=series['tdew'],
+        wind_speed=series['wind_speed'], solar_radiation=series['solar_radiation'],
+        sunshine_hours=series['sunshine_hours'],
+    )
+    rainfall = series['rainfall']
+
+    rows, station, offset, efficiency, area, stages, kc = [], [], [], [], [], [], []
+    for z, zone in enumerate(zones):
+        name = zone.get('climate')
+        if name not in station_index:
+            raise ValueError(f"Zone {z}: unknown climate '{name}'")
+        zone_efficiency = zone.get('efficiency')
+        if zone_efficiency is None and zone.get('technology_id') is not None:
+            zone_efficiency = technology_efficiency.get(int(zone['technology_id']))
+        try:
+            zone_efficiency = float(zone_efficiency)
+        except (TypeError, ValueError):
+            raise ValueError(f'Zone {z}: efficiency or a known technology_id is required')
+        if not 0 < zone_efficiency <= 100:
+            raise ValueError(f'Zone {z}: efficiency must be in (0, 100]')
+
+        for c, crop in enumerate(zone.get('crops') or []):
+            defaults = CROP_COEFFICIENTS.get(str(crop.get('crop', '')).strip().casefold(), {})
+            try:
+                crop_stages = crop.get('stages') or {}
+                crop_kc = crop.get('kc') or {}
+                stage_days = [
+                    int(crop_stages.get(key, defaults['stages'][i] if defaults else None))
+                    for i, key in enumerate(STAGE_KEYS)
+                ]
+                crop_kcs = [
+                    float(crop_kc.get(key, defaults['kc'][i] if defaults else None))
+                    for i, key in enumerate(KC_KEYS)
+                ]
+                planting = np.datetime64(crop['planting_date'], 'D')
+                crop_area = float(crop.get('area', 0))
+            except (KeyError, TypeError, ValueError) as exc:
+                raise ValueError(
+                    f'Zone {z} crop {c}: planting_date is required, and stages/kc are required '
+                    f'for crops without FAO-56 defaults ({exc!r})'
+                )
+            if min(stage_days) < 0 or sum(stage_days) == 0 or crop_area < 0:
+                raise ValueError(f'Zone {z} crop {c}: stages and area must not be negative')
+            s = station_index[name]
+            start = int((planting - starts[s]).astype(np.int64))
+            if start < 0 or start + sum(stage_days) > lengths[s]:
+                raise ValueError(f"Zone {z} crop {c}: climate '{name}' does not cover the whole season")
+
+            rows.append((zone.get('zone_id'), crop.get('crop'), str(planting)))
+            station.append(s)
+            offset.append(start)
+            efficiency.append(zone_efficiency)
+            area.append(crop_area)
+            stages.append(stage_days)
+            kc.append(crop_kcs)
+
+    if not rows:
+        return {'results': [], 'totals': {'net_m3': 0.0, 'gross_m3': 0.0}}
+
+    station = np.asarray(station, dtype=np.int64)
+    offset = np.asarray(offset, dtype=np.int64)
+    efficiency = np.asarray(efficiency, dtype=np.float64)
+    area = np.asarray(area, dtype=np.float64)
+    stages = np.asarray(stages, dtype=np.float64)
+    kc = np.asarray(kc, dtype=np.float64)
+    season_days = stages.sum(axis=1).astype(np.int64)
+    if max_cells and len(rows) * int(season_days.max()) > max_cells:
+        raise ValueError(f'Request too large: {len(rows)} crops x {int(season_days.max())} days')
+
+    kc_daily = kc_curves(stages, kc)
+    t = np.arange(kc_daily.shape[1])[None, :]
+    in_season = t < season_days[:, None]
+    day = np.where(in_season, offset[:, None] + t, 0)
+
+    et0_daily = np.where(in_season, et0[station[:, None], day], np.nan)
+    etc_daily = kc_daily * et0_daily
+    if rainfall is not None:
+        rain = np.nan_to_num(rainfall[station[:, None], day])
+        peff_daily = np.where(in_season, effective_rainfall_fraction * rain, np.nan)
+    else:
+        peff_daily = np.where(in_season, 0.0, np.nan)
+    net_daily = np.maximum(etc_daily - peff_daily, 0.0)
+    gross_daily = net_daily / (efficiency[:, None] / 100.0)
+
+    missing = (in_season & np.isnan(et0_daily)).sum(axis=1)
+    et0_total = np.nansum(et0_daily, axis=1)
+    etc_total = np.nansum(etc_daily, axis=1)
+    peff_total = np.nansum(peff_daily, axis=1)
+    net_total = np.nansum(net_daily, axis=1)
+    gross_total = np.nansum(gross_daily, axis=1)
+    peak_gross = np.nan_to_num(gross_daily).max(axis=1)
+
+    valid = in_season & ~np.isnan(gross_daily)
+    combo = np.broadcast_to(np.arange(len(rows))[:, None], valid.shape)
+    monthly = np.bincount(
+        (combo * 12 + month[station[:, None], day])[valid],
+        weights=gross_daily[valid], minlength=len(rows) * 12
+    ).reshape(len(rows), 12)
+
+    # 1 mm over 1 ha is 10 m3
+    net_m3 = net_total * area * 10.0
+    gross_m3 = gross_total * area * 10.0
+    results = []
+    for i, (zone_id, crop_name, planting) in enumerate(rows):
+        result = {
+            'zone_id': zone_id,
+            'crop': crop_name,
+            'planting_date': planting,
+            'season_days': int(season_days[i]),
+            'area': float(area[i]),
+            'efficiency': float(efficiency[i]),
+            'et0_mm': round(float(et0_total[i]), 1),
+            'etc_mm': round(float(etc_total[i]), 1),
+            'effective_rainfall_mm': round(float(peff_total[i]), 1),
+            'net_mm': round(float(net_total[i]), 1),
+            'gross_mm': round(float(gross_total[i]), 1),
+            'net_m3': round(float(net_m3[i]), 1),
+            'gross_m3': round(float(gross_m3[i]), 1),
+            'peak_gross_mm_day': round(float(peak_gross[i]), 2),
+            'peak_flow_lps': round(float(peak_gross[i] * area[i] * 10.0 * 1000.0 / 86400.0), 2),
+            'monthly_gross_mm': [round(float(value), 1) for value in monthly[i]],
+            'missing_days': int(missing[i]),
+        }
+        if include_daily:
+            n = season_days[i]
+            result['daily'] = {
+                'kc': _daily_series(kc_daily[i, :n], 3),
+                'et0_mm': _daily_series(et0_daily[i, :n], 2),
+                'etc_mm': _daily_series(etc_daily[i, :n], 2),
+                'gross_mm': _daily_series(gross_daily[i, :n], 2),
+            }
+        results.append(result)
+
+    return {
+        'results': results,
+        'totals': {
+            'net_m3': round(float(net_m3.sum()), 1),
+            'gross_m3': round(float(gross_m3.sum()), 1),
+        },
+    }
+
+# =================
+
+# =================
+# HYDRAULIC DESIGN SOLVER - materials/hydraulics.py
+# =================
+# Requires numpy (pip install numpy)
+import re
+import threading
+
+import numpy as np
+
+from .catalog import get_materials
+from .catalog_cache import get_catalog_version
+
+GRAVITY = 9.81
+KINEMATIC_VISCOSITY = 1.004e-6  # m2/s, water at 20 C
+FRICTION_METHODS = ('darcy-weisbach', 'hazen-williams')
+
+# Hazen-Williams C and absolute roughness (mm) by pipe material keyword
+PIPE_MATERIALS = {
+    'pvc': (150.0, 0.0015),
+    'pe': (140.0, 0.007),
+    'hdpe': (140.0, 0.007),
+    'steel': (120.0, 0.045),
+    'gi': (120.0, 0.15),
+}
+DEFAULT_PIPE_MATERIAL = (140.0, 0.007)
+_DIAMETER_IN_NAME = re.compile(r'(\d+(?:\.\d+)?)\s*(mm|"|in\b|inch)', re.IGNORECASE)
+
+
+def _pipe_row(row):
+    """Catalog material -> (id, name, inner diameter m, C, roughness m, cost/m), or None"""
+    diameter_mm = row.get('inner_diameter_mm')
+    if diameter_mm is None:
+        match = _DIAMETER_IN_NAME.search(row.get('name', ''))
+        if not match:
+            return None
+        size, unit = float(match.group(1)), match.group(2).lower()
+        diameter_mm = size if unit == 'mm' else size * 25.4
+    words = re.findall(r'[a-z]+', row.get('name', '').casefold())
+    c, roughness_mm = next((PIPE_MATERIALS[w] for w in words if w in PIPE_MATERIALS), DEFAULT_PIPE_MATERIAL)
+    return (
+        row['id'], row.get('name', ''), float(diameter_mm) / 1000.0,
+        float(row.get('hazen_williams_c', c)), float(row.get('roughness_mm', roughness_mm)) / 1000.0,
+        float(row['cost_per_unit']),
+    )
+
+
+def friction_loss(flow, length, diameter, method='darcy-weisbach', c=150.0, roughness=1.5e-6):
+    """
+    Friction head loss (m) for flow (m3/s) through length (m) of pipe with inner
+    diameter (m). All arguments broadcast, so a (segments x 1) flow against
+    (1 x candidates) pipe arrays yields every segment-candidate loss at once.
+    Darcy-Weisbach uses 64/Re when laminar and Swamee-Jain otherwise.
+    """
+    flow = np.abs(flow)
+    if method == 'hazen-williams':
+        return 10.67 * length * flow ** 1.852 / (c ** 1.852 * diameter ** 4.87)
+
+    area = np.pi * diameter ** 2 / 4.0
+    velocity = flow / area
+    reynolds = velocity * diameter / KINEMATIC_VISCOSITY
+    safe_re = np.maximum(reynolds, 1.0)
+    turbulent = 0.25 / np.log10(roughness / (3.7 * diameter) + 5.74 / safe_re ** 0.9) ** 2
+    friction = np.where(reynolds < 2000.0, 64.0 / safe_re, turbulent)
+    return friction * length / diameter * velocity ** 2 / (2.0 * GRAVITY)
+
+
+class HydraulicSolver:
+    """
+    Sizes laterals and mains against the pipe catalog.
+    Every run is split into segments (one per outlet on a lateral) and all
+    segments of all runs are solved against all candidate pipes as one
+    (segments x pipes) matrix: friction, a segmented cumulative sum for the
+    pressure profile, reduceat for per-run extremes, then the cheapest pipe
+    meeting the pressure-variation and velocity limits.
+    Frontend Integration: HydraulicDesignStep.tsx
+    """
+
+    def __init__(self, pipes):
+        rows = [row for row in (_pipe_row(pipe) for pipe in pipes) if row is not None]
+        rows.sort(key=lambda row: row[2])
+        self.pipes = rows
+        self.ids = np.array([row[0] for row in rows])
+        self.diameter = np.array([row[2] for row in rows], dtype=np.float64)
+        self.c = np.array([row[3] for row in rows], dtype=np.float64)
+        self.roughness = np.array([row[4] for row in rows], dtype=np.float64)
+        self.cost = np.array([row[5] for row in rows], dtype=np.float64)
+
+    def solve(self, runs, method='darcy-weisbach', include_profile=False, max_cells=None):
+        """
+        runs: [{'id', 'kind': 'lateral'|'main', 'length' (m), 'elevation_change' (m, end minus start),
+        'nominal_pressure' (m head at the outlets / delivery point),
+        'max_pressure_variation' (fraction of nominal, default 0.2), 'max_velocity' (m/s),
+        lateral: 'outlets', 'outlet_flow' (l/h each); main: 'flow' (l/s); 'pipe_ids'? candidate subset}]
+        """
+        if method not in FRICTION_METHODS:
+            raise ValueError(f"method must be one of: {', '.join(FRICTION_METHODS)}")
+        if not self.pipes:
+            raise ValueError('No pipes with a known inner diameter in the catalog')
+
+        segment_counts, unit_flow, nominal, max_variation, max_velocity = [], [], [], [], []
+        is_main, allowed, lengths, rises = [], [], [], []
+        total_segments = 0
+        for r, run in enumerate(runs):
+            try:
+                kind = run.get('kind', 'lateral')
+                length = float(run['length'])
+                rise = float(run.get('elevation_change', 0.0))
+                if kind == 'lateral':
+                    count = int(run['outlets'])
+                    flow = float(run['outlet_flow']) / 3_600_000.0  # l/h -> m3/s
+                elif kind == 'main':
+                    count = 1
+                    flow = float(run['flow']) / 1000.0  # l/s -> m3/s
+                else:
+                    raise ValueError(f"unknown kind '{kind}'")
+                run_nominal = float(run.get('nominal_pressure', 10.0 if kind == 'lateral' else 20.0))
+                run_variation = float(run.get('max_pressure_variation', 0.2))
+                run_velocity = float(run.get('max_velocity', 1.5 if kind == 'main' else 2.0))
+            except (KeyError, TypeError, ValueError) as exc:
+                raise ValueError(f'Run {r}: invalid run ({exc!r})')
+            if count < 1 or length <= 0 or run_nominal <= 0 or flow < 0:
+                raise ValueError(f'Run {r}: length, outlets, flow and nominal_pressure must be positive')
+
+            segment_counts.append(count)
+            total_segments += count
+            # Checked as runs are read, before any per-segment array exists
+            if max_cells and total_segments * len(self.ids) > max_cells:
+                raise ValueError(f'Design too large: over {max_cells} segment x pipe cells')
+            unit_flow.append(flow)
+            lengths.append(length)
+            rises.append(rise)
+            nominal.append(run_nominal)
+            max_variation.append(run_variation)
+            max_velocity.append(run_velocity)
+            is_main.append(kind == 'main')
+            pipe_ids = run.get('pipe_ids')
+            allowed.append(np.ones(len(self.ids), dtype=bool) if not pipe_ids else np.isin(self.ids, pipe_ids))
+
+        if not runs:
+            return {'results': [], 'total_cost': 0.0, 'infeasible_runs': 0}
+        segment_counts = np.asarray(segment_counts, dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(segment_counts)[:-1]))
+        seg_run = np.repeat(np.arange(len(runs)), segment_counts)
+        # Segment i of a lateral carries the flow of every outlet from i onwards
+        remaining = segment_counts[seg_run] - (np.arange(len(seg_run)) - starts[seg_run])
+        flow = (np.asarray(unit_flow)[seg_run] * remaining)[:, None]
+        seg_length = (np.asarray(lengths) / segment_counts)[seg_run][:, None]
+        seg_rise = (np.asarray(rises) / segment_counts)[seg_run][:, None]
+
+        losses = friction_loss(flow, seg_length, self.diameter[None, :], method,
+                               self.c[None, :], self.roughness[None, :])
+
+        # Pressure at each segment end relative to the run inlet
+        cumulative = np.cumsum(losses + seg_rise, axis=0)
+        before_run = np.vstack([np.zeros((1, losses.shape[1])), cumulative])[starts]
+        relative = -(cumulative - before_run[seg_run])
+
+        highest = np.maximum.reduceat(relative, starts, axis=0)
+        lowest = np.minimum.reduceat(relative, starts, axis=0)
+        is_main = np.asarray(is_main)[:, None]
+        highest = np.where(is_main, np.maximum(highest, 0.0), highest)
+        lowest = np.where(is_main, np.minimum(lowest, 0.0), lowest)
+        mean = np.add.reduceat(relative, starts, axis=0) / segment_counts[:, None]
+        head_loss = np.add.reduceat(losses, starts, axis=0)
+
+        nominal = np.asarray(nominal)[:, None]
+        # Mains deliver nominal pressure at the far end, laterals average it over the outlets
+        inlet_pressure = np.where(is_main, nominal - relative[starts + segment_counts - 1], nominal - mean)
+        variation = (highest - lowest) / nominal
+        velocity = flow[starts] / (np.pi * self.diameter[None, :] ** 2 / 4.0)
+
+        feasible = (
+            (variation <= np.asarray(max_variation)[:, None])
+            & (velocity <= np.asarray(max_velocity)[:, None])
+            & np.asarray(allowed)
+        )
+        run_cost = np.asarray(lengths)[:, None] * self.cost[None, :]
+        cheapest = np.argmin(np.where(feasible, run_cost, np.inf), axis=1)
+        any_feasible = feasible.any(axis=1)
+        # Nothing meets the limits: fall back to the allowed pipe with the least variation
+        fallback = np.argmin(np.where(allowed, variation, np.inf), axis=1)
+        choice = np.where(any_feasible, cheapest, fallback)
+
+        rows = np.arange(len(runs))
+        results = []
+        for r, run in enumerate(runs):
+            k = choice[r]
+            pipe = self.pipes[k]
+            result = {
+                'id': run.get('id', r),
+                'kind': run.get('kind', 'lateral'),
+                'feasible': bool(any_feasible[r]),
+                'pipe': {'id': pipe[0], 'name': pipe[1], 'inner_diameter_mm': round(pipe[2] * 1000.0, 1)},
+                'cost': round(float(run_cost[r, k]), 2),
+                'head_loss': round(float(head_loss[r, k]), 3),
+                'pressure_variation': round(float(variation[r, k]), 4),
+                'inlet_pressure': round(float(inlet_pressure[r, k]), 2),
+                'min_pressure': round(float(inlet_pressure[r, k] + lowest[r, k]), 2),
+                'max_pressure': round(float(inlet_pressure[r, k] + highest[r, k]), 2),
+                'inlet_velocity': round(float(velocity[r, k]), 3),
+            }
+            if include_profile:
+                s, e = starts[r], starts[r] + segment_counts[r]
+                result['pressure_profile'] = np.round(inlet_pressure[r, k] + relative[s:e, k], 3).tolist()
+            results.append(result)
+
+        chosen_cost = run_cost[rows, choice]
+        return {
+            'results': results,
+            'method': method,
+            'total_cost': round(float(chosen_cost.sum()), 2),
+            'infeasible_runs': int((~any_feasible).sum()),
+        }
+
+
+_solver = None
+_solver_lock = threading.Lock()
+
+
+def get_hydraulic_solver():
+    """Solver over the catalog pipes for the current catalog version"""
+    global _solver
+    version = get_catalog_version()
+    solver = _solver
+    if solver is None or solver[0] != version:
+        with _solver_lock:
+            solver = _solver
+            if solver is None or solver[0] != version:
+                pipes = [row for row in get_materials() if str(row.get('category', '')).casefold() == 'pipes']
+                solver = _solver = (version, HydraulicSolver(pipes))
+    return solver[1]
+
+# =================
+
+# =================
+# SCENARIO SWEEP - materials/scenarios.py
+# =================
+import heapq
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .costing import get_costing_engine
+from .matching import MATCH_CRITERIA
+
+# Capital cost per hectare by technology family when the project gives no BOQ
+# template; split between materials and labor so regional costing rules apply
+DEFAULT_CAPITAL_COST_PER_HA = {'surface': 1200.0, 'subsurface': 2500.0, 'pressurized': 3500.0}
+DEFAULT_CAPITAL_SPLIT = (('materials', 0.6), ('labor', 0.4))
+# Annual operation and maintenance as a share of capital cost
+MAINTENANCE_COST_RATES = {'low': 0.02, 'medium': 0.04, 'high': 0.07}
+RANK_KEYS = ('suitability', 'cost', 'water')
+SCENARIO_TECHNOLOGY_FIELDS = [
+    'id', 'technology_name', 'irrigation_type', 'efficiency', 'water_requirement',
+    'lifespan', 'maintenance_level', *MATCH_CRITERIA.values(),
+]
+# Each web worker process owns a pool, so a per-core default would multiply
+# processes by the web worker count
+DEFAULT_SWEEP_WORKERS = 2
+
+_sweep_pool = None
+_sweep_pool_workers = 1
+_sweep_pool_lock = threading.Lock()
+
+
+def _init_sweep_worker():
+    import django
+    django.setup()
+
+
+def get_sweep_pool():
+    """
+    Lazily started, process-wide pool of SCENARIO_SWEEP_WORKERS processes
+    (default DEFAULT_SWEEP_WORKERS, at most one per core). Uses spawn so
+    workers never share the parent's database connections; workers only
+    receive plain data.
+    """
+    global _sweep_pool, _sweep_pool_workers
+    if _sweep_pool is None:
+        with _sweep_pool_lock:
+            if _sweep_pool is None:
+                workers = getattr(settings, 'SCENARIO_SWEEP_WORKERS', None) or min(
+                    DEFAULT_SWEEP_WORKERS, os.cpu_count() or 1
+                )
+                _sweep_pool_workers = workers
+                _sweep_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_sweep_worker,
+                )
+    return _sweep_pool
+
+
+def capital_costs_per_ha(technology_names, regions, boq_lines=None):
+    """
+    Capital cost per hectare for every (technology family, region) pair, priced
+    in one costing-engine pass so the regional costing rules apply.
+    boq_lines: optional {technology_name: [BOQ lines for one hectare]}.
+    """
+    boq_lines = boq_lines or {}
+    projects = []
+    for name in technology_names:
+        lines = boq_lines.get(name) or [
+            {'resource_type': resource_type, 'quantity': 1,
+             'unit_price': DEFAULT_CAPITAL_COST_PER_HA.get(name, 0.0) * share}
+            for resource_type, share in DEFAULT_CAPITAL_SPLIT
+        ]
+        for region in regions:
+            projects.append({'project_id': f'{name}|{region}', 'region': region, 'lines': lines})
+    return {
+        summary['project_id']: summary['adjusted_total']
+        for summary in get_costing_engine().cost(projects)
+    }
+
+
+def _capital_recovery_factor(rate, years):
+    if years <= 0:
+        return 1.0
+    if rate <= 0:
+        return 1.0 / years
+    growth = (1.0 + rate) ** years
+    return rate * growth / (growth - 1.0)
+
+
+def evaluate_scenarios(technologies, regions, farm_sizes, capital_per_ha, project):
+    """
+    Suitability, water demand and annualized lifecycle cost for every
+    technology x region x farm size combination. Pure function over plain
+    data so it can run in a pool worker.
+    """
+    criteria = {
+        name: str(project[name]).strip().casefold()
+        for name in MATCH_CRITERIA if name != 'farm_size' and project.get(name)
+    }
+    discount_rate = float(project.get('discount_rate', 0.08))
+    water_cost = float(project.get('water_cost_per_m3', 0.0))
+    net_mm = project.get('net_irrigation_mm')
+    irrigation_days = float(project.get('irrigation_days', 120))
+
+    results = []
+    for tech in technologies:
+        tech_values = {
+            name: {str(v).strip().casefold() for v in tech.get(field) or []}
+            for name, field in MATCH_CRITERIA.items()
+        }
+        unmet_base = [name for name, value in criteria.items() if value not in tech_values[name]]
+        efficiency = max(float(tech['efficiency']), 1e-6)
+        # water_requirement is litres/m2/day, i.e. mm/day at the field
+        gross_mm = (float(net_mm) / (efficiency / 100.0) if net_mm is not None
+                    else float(tech['water_requirement']) * irrigation_days)
+        crf = _capital_recovery_factor(discount_rate, int(tech['lifespan']))
+        maintenance_rate = MAINTENANCE_COST_RATES.get(tech['maintenance_level'], MAINTENANCE_COST_RATES['medium'])
+
+        for region in regions:
+            per_ha = capital_per_ha[f"{tech['technology_name']}|{region}"]
+            for farm_size in farm_sizes:
+                area = farm_size['area']
+                unmet = list(unmet_base)
+                if farm_size['label'].strip().casefold() not in tech_values['farm_size']:
+                    unmet.append('farm_size')
+                considered = len(criteria) + 1
+                capital = per_ha * area
+                water_m3 = gross_mm * area * 10.0
+                annual_capital = capital * crf
+                annual_maintenance = capital * maintenance_rate
+                annual_water = water_m3 * water_cost
+                annual_cost = annual_capital + annual_maintenance + annual_water
+                results.append({
+                    'technology_id': tech['id'],
+                    'technology_name': tech['technology_name'],
+                    'irrigation_type': tech['irrigation_type'],
+                    'region': region,
+                    'farm_size': farm_size['label'],
+                    'area': area,
+                    'suitability': round((considered - len(unmet)) / considered, 4),
+                    'unmet_criteria': unmet,
+                    'efficiency': float(tech['efficiency']),
+                    'lifespan': int(tech['lifespan']),
+                    'maintenance_level': tech['maintenance_level'],
+                    'gross_mm': round(gross_mm, 1),
+                    'water_m3': round(water_m3, 1),
+                    'capital_cost': round(capital, 2),
+                    'annual_capital_cost': round(annual_capital, 2),
+                    'annual_maintenance_cost': round(annual_maintenance, 2),
+                    'annual_water_cost': round(annual_water, 2),
+                    'annual_cost': round(annual_cost, 2),
+                    'annual_cost_per_ha': round(annual_cost / area, 2) if area else None,
+                })
+    return results
+
+
+def rank_key(rank_by):
+    if rank_by == 'cost':
+        return lambda row: (row['annual_cost_per_ha'] or 0.0, -row['suitability'])
+    if rank_by == 'water':
+        return lambda row: (row['gross_mm'], row['annual_cost_per_ha'] or 0.0)
+    return lambda row: (-row['suitability'], row['annual_cost_per_ha'] or 0.0)
+
+
+def run_sweep(technologies, regions, farm_sizes, capital_per_ha, project):
+    """
+    Evaluate the grid, chunked by technology across the sweep pool (inline
+    below SCENARIO_SWEEP_POOL_MIN). Yields result lists as chunks finish.
+    """
+    global _sweep_pool
+    combinations = len(technologies) * len(regions) * len(farm_sizes)
+    if combinations < getattr(settings, 'SCENARIO_SWEEP_POOL_MIN', 2000):
+        yield evaluate_scenarios(technologies, regions, farm_sizes, capital_per_ha, project)
+        return
+
+    pool = get_sweep_pool()
+    chunk = max(1, math.ceil(len(technologies) / (_sweep_pool_workers * 4)))
+    futures = [
+        pool.submit(evaluate_scenarios, technologies[i:i + chunk], regions, farm_sizes, capital_per_ha, project)
+        for i in range(0, len(technologies), chunk)
+    ]
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    except BrokenProcessPool:
+        # A worker died; drop the pool so the next sweep starts a fresh one
+        with _sweep_pool_lock:
+            if _sweep_pool is pool:
+                _sweep_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def merge_ranked(best, chunk, rank_by='suitability', min_suitability=0.0, limit=None):
+    """
+    Fold one evaluated chunk into the running ranking. With a limit only the
+    best `limit` rows are kept, so memory stays flat however large the sweep.
+    """
+    key = rank_key(rank_by)
+    rows = best + [row for row in chunk if row['suitability'] >= min_suitability]
+    if limit:
+        return heapq.nsmallest(limit, rows, key=key)
+    return sorted(rows, key=key)
+
+# =================
+
+# =================
+# TECHNOLOGY FILTERS - materials/filters.py
+# =================
+import django_filters
+from django.db import connections
+
+
+class TechnologyEntryFilter(django_filters.FilterSet):
+    """
+    Server-side filters for GET /api/materials/technologies/.
+    Scalar filters use the B-tree indexes; suitability filters (soil, crop,
+    farm_size, water_quality, topography, climate - comma-separated values are
+    OR-ed) use JSON containment backed by GIN indexes on PostgreSQL and the
+    suitability matcher's inverted index on other databases.
+    Frontend Integration: useTechnologySelection.ts, boqAPI.getTechnologies
+    """
+    technology_name = django_filters.ChoiceFilter(choices=TechnologyEntry.TECHNOLOGY_CHOICES)
+    # Aliases sent by the existing frontend calls
+    type = django_filters.ChoiceFilter(field_name='technology_name', choices=TechnologyEntry.TECHNOLOGY_CHOICES)
+    technology_type = django_filters.ChoiceFilter(field_name='technology_name', choices=TechnologyEntry.TECHNOLOGY_CHOICES)
+    irrigation_type = django_filters.CharFilter()
+    maintenance_level = django_filters.ChoiceFilter(choices=TechnologyEntry.MAINTENANCE_LEVELS)
+    min_efficiency = django_filters.NumberFilter(field_name='efficiency', lookup_expr='gte')
+    max_efficiency = django_filters.NumberFilter(field_name='efficiency', lookup_expr='lte')
+    min_lifespan = django_filters.NumberFilter(field_name='lifespan', lookup_expr='gte')
+    max_lifespan = django_filters.NumberFilter(field_name='lifespan', lookup_expr='lte')
+
+    soil = django_filters.CharFilter(method='filter_suitability')
+    crop = django_filters.CharFilter(method='filter_suitability')
+    farm_size = django_filters.CharFilter(method='filter_suitability')
+    water_quality = django_filters.CharFilter(method='filter_suitability')
+    topography = django_filters.CharFilter(method='filter_suitability')
+    climate = django_filters.CharFilter(method='filter_suitability')
+
+    class Meta:
+        model = TechnologyEntry
+        fields = []
+
+    def filter_suitability(self, queryset, name, value):
+        values = [v.strip() for v in value.split(',') if v.strip()]
+        if not values:
+            return queryset
+        field = MATCH_CRITERIA[name]
+        if connections[queryset.db].vendor == 'postgresql':
+            condition = Q()
+            for v in values:
+                condition |= Q(**{f'{field}__contains': [v]})
+            return queryset.filter(condition)
+        # SQLite and friends have no JSON containment - use the inverted index
+        return queryset.filter(id__in=technology_matcher.ids_for(name, values))
+
+# =================
+
+# materials/views.py - Add to existing views or create
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+
+from core.streaming import streaming_response
+from .catalog_cache import bump_catalog_version, cached_catalog_response
+from .filters import TechnologyEntryFilter
+from .matching import MATCH_CRITERIA, technology_matcher
+from .models import TechnologyEntry
+from .parsers import NDJSONParser
+from .bulk import bulk_upsert_technologies
+from .serializers import TECHNOLOGY_LIST_FIELDS
+from .snapshot import get_catalog_snapshot
+# The numpy-backed engines (costing, cwr, hydraulics, scenarios) are imported
+# inside their actions, so workers serving only catalog reads never load numpy
+
+class MaterialsViewSet(viewsets.GenericViewSet):
+    """
+    Materials management viewset for all resources, suitability criteria and costing rules
+    """
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    
+    # RESOURCES ENDPOINTS
+    @action(detail=False, methods=['get'], url_path='materials')
+    @cached_catalog_response('materials')
+    def materials(self, request):
+        """
+        Get materials database
+        GET /api/materials/materials/
+        """
+        return Response(get_catalog_snapshot()['materials'].rows())
+    
+    @action(detail=False, methods=['get'], url_path='equipment')
+    @cached_catalog_response('equipment')
+    def equipment(self, request):
+        """
+        Get equipment database
+        GET /api/materials/equipment/
+        """
+        return Response(get_catalog_snapshot()['equipment'].rows())
+    
+    @action(detail=False, methods=['get'], url_path='labor')
+    @cached_catalog_response('labor')
+    def labor(self, request):
+        """
+        Get labor rates
+        GET /api/materials/labor/
+        """
+        return Response(get_catalog_snapshot()['labor'].rows())
+    
+    @action(detail=False, methods=['get'], url_path='technologies',
+            parser_classes=[JSONParser, NDJSONParser])
+    @cached_catalog_response('technologies')
+    def technologies(self, request):
+        """
+        Get irrigation technologies with comprehensive data
+        GET /api/materials/technologies/?technology_name=&maintenance_level=&min_efficiency=&soil=Loam,Clay
+        Filtering runs in the database - see TechnologyEntryFilter for parameters.
+        Frontend Integration: useTechnologySelection.ts, TechnologySelectionStep.tsx
+        """
+        if not request.query_params:
+            return Response(get_catalog_snapshot()['technologies'].rows())
+        filterset = TechnologyEntryFilter(
+            request.query_params,
+            queryset=TechnologyEntry.objects.order_by('technology_name', 'irrigation_type')
+        )
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        technologies = filterset.qs.values(*TECHNOLOGY_LIST_FIELDS)
+        return Response(list(technologies))
+    
+    # POST shares the technologies route; separate @action()s with the same
+    # url_path shadow each other in the router, so map the extra methods instead
+    @technologies.mapping.post
+    def create_technology(self, request):
+        """
+        Create new irrigation technology
+        POST /api/materials/technologies/
+        A JSON array or an application/x-ndjson body is treated as a bulk upsert:
+        rows are written in one transaction and conflicts on
+        (technology_name, irrigation_type) update the existing entry. A single
+        object is upserted the same way and answered with the stored row
+        (201 created, 200 updated).
+        """
+        data = request.data
+        if isinstance(data, list):
+            if not data:
+                return Response({'error': 'Empty batch'}, status=status.HTTP_400_BAD_REQUEST)
+            results = bulk_upsert_technologies(data)
+            summary = {
+                outcome: sum(1 for r in results if r['status'] == outcome)
+                for outcome in ('created', 'updated', 'skipped', 'error')
+            }
+            return Response({
+                'results': results,
+                'count': len(results),
+                **summary
+            }, status=status.HTTP_200_OK if summary['error'] < len(results) else status.HTTP_400_BAD_REQUEST)
+
+        # A single object goes through the same validation and upsert as a batch
+        result = bulk_upsert_technologies([data])[0]
+        if result['status'] == 'error':
+            return Response(result['errors'], status=status.HTTP_400_BAD_REQUEST)
+        technology = TechnologyEntry.objects.values(*TECHNOLOGY_LIST_FIELDS).get(pk=result['id'])
+        return Response(
+            technology,
+            status=status.HTTP_201_CREATED if result['status'] == 'created' else status.HTTP_200_OK
+        )
+    
+    @action(detail=False, methods=['put'], url_path=r'technologies/(?P<tech_id>\d+)')
+    def update_technology(self, request, tech_id=None):
+        """
+        Update irrigation technology
+        PUT /api/materials/technologies/{id}/
+        """
+        data = request.data
+        # In real implementation, update TechnologyEntry instance
+        updated_technology = {
+            'id': tech_id,
+            **data,
+            'updated_at': timezone.now().isoformat()
+        }
+        return Response(updated_technology)
+    
+    @update_technology.mapping.delete
+    def delete_technology(self, request, tech_id=None):
+        """
+        Delete irrigation technology
+        DELETE /api/materials/technologies/{id}/
+        """
+        # In real implementation, delete TechnologyEntry instance
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['get'], url_path='technologies/match')
+    def match_technologies(self, request):
+        """
+        Match site conditions against technology suitability criteria
+        GET /api/materials/technologies/match/?soil=Loam&crop=Maize&climate=Arid
+        Accepts soil, crop, farm_size, water_quality, topography and climate
+        (repeat a parameter or comma-separate values for alternatives), plus
+        optional min_score (0-1) and limit.
+        Frontend Integration: TechnologySelectionStep.tsx, useTechnologySelection.ts
+        """
+        site = {}
+        for criterion in MATCH_CRITERIA:
+            values = []
+            for raw in request.query_params.getlist(criterion):
+                values.extend(v for v in raw.split(',') if v.strip())
+            site[criterion] = values
+
+        if not any(site.values()):
+            return Response(
+                {'error': f"Provide at least one of: {', '.join(MATCH_CRITERIA)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            min_score = float(request.query_params.get('min_score', 0))
+            limit = int(request.query_params.get('limit', 0)) or None
+        except ValueError:
+            return Response(
+                {'error': 'min_score must be a number and limit an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if limit is not None and limit < 0:
+            return Response({'error': 'limit must not be negative'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = technology_matcher.match(site, min_score=min_score, limit=limit)
+        return Response({
+            'criteria': {c: v for c, v in site.items() if v},
+            'results': results,
+            'count': len(results)
+        })
+    
+    @action(detail=False, methods=['post'], url_path='boq-costing')
+    def cost_boq(self, request):
+        """
+        Cost bills of quantities for one or many projects with the current
+        catalog prices and costing rules
+        POST /api/materials/boq-costing/
+        Body: {"projects": [{"project_id", "region", "lines": [{"resource_type":
+        "materials|equipment|labor", "resource_id", "quantity", "unit_price"?}]}],
+        "rules": [...]? (defaults to the costing-rules catalog), "include_lines": bool}
+        Frontend Integration: BOQCostingStep.tsx, CostingStep.tsx
+        """
+        from .costing import get_costing_engine
+
+        projects = request.data.get('projects')
+        if not isinstance(projects, list) or not projects:
+            return Response(
+                {'error': 'projects must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        rules = request.data.get('rules')
+        if rules is not None and not isinstance(rules, list):
+            return Response({'error': 'rules must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = get_costing_engine().cost(
+                projects,
+                rules=rules,
+                include_lines=bool(request.data.get('include_lines', False))
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'results': results,
+            'count': len(results),
+            'grand_total': round(sum(r['adjusted_total'] for r in results), 2)
+        })
+
+    @action(detail=False, methods=['post'], url_path='cwr')
+    def crop_water_requirements(self, request):
+        """
+        Crop water requirements for many zone-crop combinations in one pass:
+        FAO-56 Penman-Monteith ET0, Kc curves per growth stage, effective
+        rainfall, then gross demand through the technology efficiency
+        POST /api/materials/cwr/
+        Body: {"climate": {name: {"start_date", "latitude", "elevation", "tmin": [...],
+        "tmax": [...], "rh_mean"|"rh_min"/"rh_max"|"tdew", "wind_speed", "solar_radiation"|
+        "sunshine_hours", "rainfall"}}, "zones": [{"zone_id", "climate", "technology_id"|
+        "efficiency", "crops": [{"crop", "planting_date", "area", "stages"?, "kc"?}]}],
+        "effective_rainfall_fraction"?: 0.8, "include_daily"?: bool}
+        Frontend Integration: CropCalendarStep.tsx, CropCalendarCWRStep.tsx
+        """
+        from .cwr import compute_water_requirements
+
+        climate = request.data.get('climate')
+        zones = request.data.get('zones')
+        if not isinstance(climate, dict) or not climate:
+            return Response({'error': 'climate must be a non-empty object'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(zones, list) or not zones:
+            return Response({'error': 'zones must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        technology_ids = {
+            int(zone['technology_id']) for zone in zones
+            if isinstance(zone, dict) and str(zone.get('technology_id', '')).isdigit()
+        }
+        technology_efficiency = {
+            tech_id: float(efficiency)
+            for tech_id, efficiency in TechnologyEntry.objects.filter(
+                id__in=technology_ids
+            ).values_list('id', 'efficiency')
+        } if technology_ids else {}
+
+        try:
+            result = compute_water_requirements(
+                climate,
+                zones,
+                technology_efficiency=technology_efficiency,
+                effective_rainfall_fraction=float(request.data.get('effective_rainfall_fraction', 0.8)),
+                include_daily=bool(request.data.get('include_daily', False)),
+                max_cells=getattr(settings, 'CWR_MAX_CELLS', 20_000_000),
+            )
+        except (AttributeError, TypeError, ValueError) as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        result['count'] = len(result['results'])
+        return Response(result)
+
+    @action(detail=False, methods=['post'], url_path='hydraulic-design')
+    def hydraulic_design(self, request):
+        """
+        Friction losses, pressure profiles and cheapest catalog pipe per run
+        for drip/sprinkler laterals and mains
+        POST /api/materials/hydraulic-design/
+        Body: {"runs": [{"id", "kind": "lateral|main", "length", "elevation_change"?,
+        "outlets", "outlet_flow" (l/h) | "flow" (l/s), "nominal_pressure"?,
+        "max_pressure_variation"?, "max_velocity"?, "pipe_ids"?}],
+        "method": "darcy-weisbach|hazen-williams", "pipes"? (override the catalog
+        pipes), "include_profile"?: bool}
+        Frontend Integration: HydraulicDesignStep.tsx
+        """
+        from .hydraulics import HydraulicSolver, get_hydraulic_solver
+
+        runs = request.data.get('runs')
+        if not isinstance(runs, list) or not runs:
+            return Response({'error': 'runs must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        pipes = request.data.get('pipes')
+        if pipes is not None and not isinstance(pipes, list):
+            return Response({'error': 'pipes must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+        max_outlets = getattr(settings, 'HYDRAULIC_MAX_OUTLETS', 10_000)
+        for r, run in enumerate(runs):
+            if not isinstance(run, dict):
+                return Response({'error': f'Run {r}: must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+            outlets = run.get('outlets')
+            if run.get('kind', 'lateral') == 'lateral' and (
+                isinstance(outlets, bool) or not isinstance(outlets, int) or not 1 <= outlets <= max_outlets
+            ):
+                return Response(
+                    {'error': f'Run {r}: outlets must be an integer between 1 and {max_outlets}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        try:
+            solver = HydraulicSolver(pipes) if pipes is not None else get_hydraulic_solver()
+            result = solver.solve(
+                runs,
+                method=request.data.get('method', 'darcy-weisbach'),
+                include_profile=bool(request.data.get('include_profile', False)),
+                max_cells=getattr(settings, 'HYDRAULIC_MAX_CELLS', 20_000_000),
+            )
+        except (AttributeError, KeyError, TypeError, ValueError) as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        result['count'] = len(result['results'])
+        return Response(result)
+
+    @action(detail=False, methods=['post'], url_path='scenarios/sweep')
+    def scenario_sweep(self, request):
+        """
+        What-if sweep over technology x costing region x farm size: suitability,
+        water demand and lifecycle cost annualized over each entry's lifespan
+        with its maintenance level, evaluated across the sweep process pool
+        POST /api/materials/scenarios/sweep/
+        Body: {"project": {"soil", "crop", "water_quality", "topography", "climate",
+        "net_irrigation_mm"?, "irrigation_days"?, "discount_rate"?, "water_cost_per_m3"?,
+        "boq_lines"? {technology_name: [BOQ lines per ha]}}, "technology_ids"? (default all),
+        "regions"?: [...], "farm_sizes": [{"label", "area"}], "rank_by"?: "suitability|cost|water",
+        "min_suitability"?, "limit"?}
+        Streams application/x-ndjson: {"type": "progress"} lines as chunks finish,
+        then {"type": "result", "rank"} lines best first, then {"type": "summary"}
+        Frontend Integration: TechnologySelectionStep.tsx
+        """
+        from .scenarios import (
+            RANK_KEYS, SCENARIO_TECHNOLOGY_FIELDS, capital_costs_per_ha, merge_ranked, run_sweep,
+        )
+
+        project = request.data.get('project') or {}
+        regions = request.data.get('regions') or ['']
+        farm_sizes = request.data.get('farm_sizes')
+        rank_by = request.data.get('rank_by', 'suitability')
+        technology_ids = request.data.get('technology_ids')
+        if not isinstance(project, dict):
+            return Response({'error': 'project must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(regions, list) or not all(isinstance(region, str) for region in regions):
+            return Response({'error': 'regions must be a list of region names'}, status=status.HTTP_400_BAD_REQUEST)
+        if rank_by not in RANK_KEYS:
+            return Response(
+                {'error': f"rank_by must be one of: {', '.join(RANK_KEYS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if technology_ids is not None and (
+            not isinstance(technology_ids, list)
+            or not all(isinstance(id, int) and not isinstance(id, bool) for id in technology_ids)
+        ):
+            return Response({'error': 'technology_ids must be a list of technology ids'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            farm_sizes = [{'label': str(size['label']), 'area': float(size['area'])} for size in farm_sizes]
+            min_suitability = float(request.data.get('min_suitability', 0.0))
+            limit = int(request.data['limit']) if request.data.get('limit') else None
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {'error': 'farm_sizes must be a list of {label, area}; min_suitability and limit must be numbers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not farm_sizes or any(size['area'] <= 0 for size in farm_sizes):
+            return Response({'error': 'farm_sizes must not be empty and areas must be positive'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = TechnologyEntry.objects.order_by('id')
+        if technology_ids:
+            queryset = queryset.filter(id__in=technology_ids)
+        technologies = [
+            {**row, 'efficiency': float(row['efficiency']), 'water_requirement': float(row['water_requirement'])}
+            for row in queryset.values(*SCENARIO_TECHNOLOGY_FIELDS)
+        ]
+        combinations = len(technologies) * len(regions) * len(farm_sizes)
+        max_combinations = getattr(settings, 'SCENARIO_SWEEP_MAX_COMBINATIONS', 200_000)
+        if not combinations:
+            return Response({'error': 'No technologies match the sweep'}, status=status.HTTP_400_BAD_REQUEST)
+        if combinations > max_combinations:
+            return Response(
+                {'error': f'Sweep has {combinations} combinations; the limit is {max_combinations}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            capital_per_ha = capital_costs_per_ha(
+                {tech['technology_name'] for tech in technologies}, regions, project.get('boq_lines')
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        sweep_project = {key: value for key, value in project.items() if key != 'boq_lines'}
+
+        def stream():
+            best, evaluated = [], 0
+            try:
+                for chunk in run_sweep(technologies, regions, farm_sizes, capital_per_ha, sweep_project):
+                    evaluated += len(chunk)
+                    best = merge_ranked(best, chunk, rank_by, min_suitability, limit)
+                    yield json.dumps({'type': 'progress', 'evaluated': evaluated, 'total': combinations}) + '\n'
+            except Exception as exc:
+                yield json.dumps({'type': 'error', 'error': str(exc)}) + '\n'
+                return
+            for rank, row in enumerate(best, start=1):
+                yield json.dumps({'type': 'result', 'rank': rank, **row}, cls=DjangoJSONEncoder) + '\n'
+            yield json.dumps({
+                'type': 'summary',
+                'combinations': combinations,
+                'returned': len(best),
+                'rank_by': rank_by,
+            }) + '\n'
+
+        return streaming_response(request, stream(), content_type='application/x-ndjson')
+
+    # EXISTING ENDPOINTS
+    @action(detail=False, methods=['get', 'post'], url_path='costing-rules')
+    @cached_catalog_response('costing_rules')
+    def costing_rules(self, request):
+        """
+        Costing Rules CRUD
+        GET/POST /api/materials/costing-rules/
+        """
+        if request.method == 'GET':
+            return Response(get_catalog_snapshot()['costing_rules'].rows())
+        
+        elif request.method == 'POST':
+            # Handle creation - implement your creation logic here
+            bump_catalog_version()
+            return Response({
+                'id': 3,
+                'message': 'Costing rule created successfully'
+            }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['get', 'post'], url_path='suitability-criteria')
+    @cached_catalog_response('suitability_criteria')
+    def suitability_criteria(self, request):
+        """
+        Suitability Criteria CRUD
+        GET/POST /api/materials/suitability-criteria/
+        """
+        if request.method == 'GET':
+            return Response(get_catalog_snapshot()['suitability_criteria'].rows())
+        
+        elif request.method == 'POST':
+            # Handle creation - implement your creation logic here
+            bump_catalog_version()
+            return Response({
+                'id': 3,
+                'message': 'Suitability criterion created successfully'
+            }, status=status.HTTP_201_CREATED)
+
+
+# ==============================================================================
+# BOQ APP - STREAMING EXPORT
+# ==============================================================================
+
+# =================
+# BOQ LINE ITEMS - boq/models.py (add if BOQAnalysis does not already store its lines)
+# =================
+
+class BOQLineItem(models.Model):
+    """
+    One bill-of-quantities line of a BOQAnalysis.
+    rate is optional: when empty the line is priced from the materials,
+    equipment or labor catalog by resource_id at export time.
+    Frontend Integration: BOQItem in types/project-wizard.ts
+    """
+
+    CATEGORY_CHOICES = [
+        ('materials', 'Materials'),
+        ('equipment', 'Equipment'),
+        ('labor', 'Labor'),
+    ]
+
+    analysis = models.ForeignKey('boq.BOQAnalysis', on_delete=models.CASCADE, related_name='line_items')
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    resource_id = models.PositiveIntegerField(blank=True, null=True)
+    description = models.CharField(max_length=255)
+    unit = models.CharField(max_length=30, blank=True)
+    quantity = models.DecimalField(max_digits=14, decimal_places=3)
+    rate = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    sort_order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'boq_lineitem'
+        ordering = ['sort_order', 'id']
+        indexes = [
+            models.Index(fields=['analysis', 'sort_order', 'id'], name='boq_line_export_idx'),
+        ]
+
+# =================
+# STREAMING EXPORT - boq/export.py
+# =================
+import csv
+import math
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from rest_framework.renderers import BaseRenderer
+
+from materials.snapshot import get_catalog_snapshot
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_HEADER = ['#', 'Category', 'Description', 'Unit', 'Quantity', 'Rate', 'Amount']
+_XML_ILLEGAL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+# BOQ line category -> rate column of its snapshot table
+_RATE_COLUMNS = {'materials': 'cost_per_unit', 'equipment': 'cost_per_unit', 'labor': 'hourly_rate'}
+
+
+def _catalog_rate(snapshot, category, resource_id):
+    """(unit, rate) of a catalog resource, read from the snapshot by id"""
+    rate_column = _RATE_COLUMNS.get(category)
+    if rate_column is None or resource_id is None:
+        return '', 0.0
+    table = snapshot[category]
+    position = table.position(resource_id)
+    if position is None:
+        return '', 0.0
+    unit = 'hour' if category == 'labor' else table.value(position, 'unit', '')
+    try:
+        rate = float(table.value(position, rate_column))
+    except (TypeError, ValueError):
+        rate = 0.0
+    return unit, rate if math.isfinite(rate) else 0.0
+
+
+def iter_priced_lines(analysis_id):
+    """
+    Yield export rows for an analysis straight off a server-side cursor
+    (iterator() on PostgreSQL), pricing lines without a rate from the
+    catalogs, followed by a grand-total row.
+    """
+    snapshot = get_catalog_snapshot()
+    lines = BOQLineItem.objects.filter(analysis_id=analysis_id).order_by('sort_order', 'id').values_list(
+        'category', 'resource_id', 'description', 'unit', 'quantity', 'rate'
+    )
+    total = 0.0
+    number = 0
+    for category, resource_id, description, unit, quantity, rate in lines.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        number += 1
+        quantity = float(quantity)
+        if rate is None:
+            catalog_unit, catalog_rate = _catalog_rate(snapshot, category, resource_id)
+            rate, unit = catalog_rate, unit or catalog_unit
+        else:
+            rate = float(rate)
+        amount = round(quantity * rate, 2)
+        total += amount
+        yield [number, category, description, unit, quantity, rate, amount]
+    yield ['', '', 'TOTAL', '', '', '', round(total, 2)]
+
+
+class _Echo:
+    """File-like object whose write() hands the value back (csv.writer target)"""
+
+    def write(self, value):
+        return value
+
+
+def stream_boq_csv(analysis_id):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_HEADER)
+    for row in iter_priced_lines(analysis_id):
+        yield writer.writerow(row)
+
+
+class _ChunkSink:
+    """Unseekable write target for ZipFile; collected bytes are drained by the generator"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="BOQ" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        if isinstance(value, (int, float)):
+            cells.append(f'<c t="n"><v>{value}</v></c>')
+        else:
+            text = escape(_XML_ILLEGAL_CHARS.sub('', str(value)))
+            cells.append(f'<c t="inlineStr"><is><t>{text}</t></is></c>')
+    return '<row>' + ''.join(cells) + '</row>'
+
+
+def stream_boq_xlsx(analysis_id):
+    """
+    Write-only XLSX streamed as it is built: the worksheet is written row by
+    row into a zip entry on an unseekable sink (data descriptors instead of
+    seeking back), so memory stays flat and the first bytes leave immediately.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            workbook.writestr(name, content)
+        yield sink.drain()
+
+        with workbook.open('xl/worksheets/sheet1.xml', mode='w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(EXPORT_HEADER).encode())
+            buffered = []
+            for row in iter_priced_lines(analysis_id):
+                buffered.append(_xlsx_row(row))
+                if len(buffered) >= EXPORT_CHUNK_SIZE:
+                    sheet.write(''.join(buffered).encode())
+                    buffered.clear()
+                    yield sink.drain()
+            sheet.write(''.join(buffered).encode())
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+class CSVExportRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class XLSXExportRenderer(CSVExportRenderer):
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+
+
+class ExcelExportRenderer(XLSXExportRenderer):
+    format = 'excel'
+
+# =================
+# boq/views.py - export action for the existing BOQ analysis viewset
+# =================
+from rest_framework.renderers import JSONRenderer
+
+from core.streaming import streaming_response
+from .export import (
+    CSVExportRenderer, ExcelExportRenderer, XLSXExportRenderer,
+    stream_boq_csv, stream_boq_xlsx,
+)
+
+
+class BOQAnalysisExportMixin:
+    """
+    Mix into the BOQ analysis viewset (GET /api/boq/analyses/{id}/export_boq/).
+    """
+
+    def perform_content_negotiation(self, request, force=False):
+        # An unknown ?format= would make DRF answer 404 before the action
+        # runs; fall back to JSON so export_boq can answer 400 itself
+        return super().perform_content_negotiation(request, force=force or self.action == 'export_boq')
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Errors are rendered as JSON, never through the file renderers
+        if self.action == 'export_boq' and isinstance(response, Response) and response.status_code != 200:
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    @action(detail=True, methods=['get'],
+            renderer_classes=[JSONRenderer, CSVExportRenderer, XLSXExportRenderer, ExcelExportRenderer])
+    def export_boq(self, request, pk=None):
+        """
+        Stream the BOQ of an analysis as CSV or XLSX
+        GET /api/boq/analyses/{id}/export_boq/?export=csv|xlsx|excel
+        (?format= is still read for older clients)
+        Frontend Integration: boqAPI.exportBOQ
+        """
+        analysis = self.get_object()
+        export_format = request.query_params.get('export') or request.query_params.get('format', 'csv')
+        if export_format == 'csv':
+            response = streaming_response(request, stream_boq_csv(analysis.pk), content_type='text/csv')
+            extension = 'csv'
+        elif export_format in ('xlsx', 'excel'):
+            response = streaming_response(
+                request, stream_boq_xlsx(analysis.pk), content_type=XLSXExportRenderer.media_type
+            )
+            extension = 'xlsx'
+        else:
+            return Response(
+                {'error': 'Supported export formats: csv, xlsx'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        response['Content-Disposition'] = f'attachment; filename="boq-analysis-{analysis.pk}.{extension}"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+# boq/views.py - usage
+"""
+class BOQAnalysisViewSet(BOQAnalysisExportMixin, viewsets.ModelViewSet):
+    ...
+"""
+
+
+# ==============================================================================
+# GIS APP - VECTOR TILES FOR IRRIGATION ZONES
+# ==============================================================================
+
+# =================
+# ZONE TILES - gis/tiles.py
+# =================
+# Assumes the existing GeoDjango zone model, gis.models.IrrigationZone, with
+# name, irrigation_type, crop_type, status, project (FK) and a geometry field
+# in SRID 4326 with the default spatial (GiST) index. Requires PostGIS 3+.
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+ZONE_TILE_VERSION_KEY = 'gis:zone_tiles_version'
+ZONE_TILE_LAYER = 'zones'
+ZONE_TILE_GEOMETRY_FIELD = 'geometry'
+ZONE_TILE_PROPERTIES = ['name', 'irrigation_type', 'crop_type', 'status', 'project']
+ZONE_TILE_EXTENT = 4096
+ZONE_TILE_BUFFER = 64
+WEB_MERCATOR_WIDTH = 2 * 20037508.342789244
+
+
+def get_zone_model():
+    return apps.get_model(getattr(settings, 'GIS_ZONE_MODEL', 'gis.IrrigationZone'))
+
+
+def get_zone_tiles_version():
+    """
+    Current zone tile version, shared by all workers through the Django cache.
+    """
+    version = cache.get(ZONE_TILE_VERSION_KEY)
+    if version is None:
+        cache.add(ZONE_TILE_VERSION_KEY, 1, timeout=None)
+        version = cache.get(ZONE_TILE_VERSION_KEY, 1)
+    return version
+
+
+def bump_zone_tiles_version():
+    """
+    Invalidate every cached zone tile. Call after any zone write.
+    """
+    old_version = get_zone_tiles_version()
+    try:
+        version = cache.incr(ZONE_TILE_VERSION_KEY)
+    except ValueError:
+        cache.add(ZONE_TILE_VERSION_KEY, old_version + 1, timeout=None)
+        version = cache.get(ZONE_TILE_VERSION_KEY, old_version + 1)
+    tile_cache.discard_version(old_version)
+    return version
+
+
+class TileCache:
+    """
+    Two-level tile cache: a byte-bounded in-process LRU in front of an optional
+    on-disk tree (GIS_TILE_CACHE_DIR/v<version>/<project>/<z>/<x>/<y>.mvt)
+    shared by the workers on a host. Keys carry the zone tile version, so a
+    version bump makes every older tile unreachable.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_bytes(self):
+        return getattr(settings, 'GIS_TILE_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+
+    @property
+    def directory(self):
+        return getattr(settings, 'GIS_TILE_CACHE_DIR', None)
+
+    def _path(self, key):
+        version, project, z, x, y = key
+        return os.path.join(self.directory, f'v{version}', str(project or 'all'), str(z), str(x), f'{y}.mvt')
+
+    def get(self, key):
+        with self._lock:
+            tile = self._entries.get(key)
+            if tile is not None:
+                self._entries.move_to_end(key)
+                return tile
+        if self.directory:
+            try:
+                with open(self._path(key), 'rb') as tile_file:
+                    tile = tile_file.read()
+            except OSError:
+                return None
+            self._remember(key, tile)
+        return tile
+
+    def set(self, key, tile):
+        self._remember(key, tile)
+        if self.directory:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as tile_file:
+                tile_file.write(tile)
+            os.replace(tmp_path, path)
+
+    def _remember(self, key, tile):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = tile
+            self._bytes += len(tile)
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def discard_version(self, version):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] <= version]:
+                self._bytes -= len(self._entries.pop(key))
+        if self.directory:
+            shutil.rmtree(os.path.join(self.directory, f'v{version}'), ignore_errors=True)
+
+
+tile_cache = TileCache()
+
+
+def tile_is_valid(z, x, y):
+    max_zoom = getattr(settings, 'GIS_TILE_MAX_ZOOM', 22)
+    return 0 <= z <= max_zoom and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def render_zone_tile(z, x, y, project_id=None):
+    """
+    Build one Mapbox Vector Tile of zones in PostGIS.
+    Geometry is clipped to the tile (plus a small buffer) and simplified with a
+    tolerance of GIS_TILE_SIMPLIFY_PIXELS screen pixels at this zoom, so low
+    zooms carry a handful of vertices per zone instead of every surveyed point.
+    Returns b'' when no zone touches the tile.
+    """
+    Zone = get_zone_model()
+    opts = Zone._meta
+    geom_column = opts.get_field(ZONE_TILE_GEOMETRY_FIELD).column
+    columns = [opts.get_field(name).column for name in ZONE_TILE_PROPERTIES]
+    quote = connection.ops.quote_name
+
+    tile_width = WEB_MERCATOR_WIDTH / 2 ** z
+    params = {
+        'z': z, 'x': x, 'y': y,
+        'extent': ZONE_TILE_EXTENT,
+        'buffer': ZONE_TILE_BUFFER,
+        'margin': tile_width * ZONE_TILE_BUFFER / ZONE_TILE_EXTENT,
+        'tolerance': tile_width / 256 * getattr(settings, 'GIS_TILE_SIMPLIFY_PIXELS', 0.5),
+        'layer': ZONE_TILE_LAYER,
+        'project_id': project_id,
+    }
+    project_clause = ''
+    if project_id is not None:
+        project_clause = f'AND zone.{quote(opts.get_field("project").column)} = %(project_id)s'
+
+    sql = f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS env,
+                   ST_Expand(ST_TileEnvelope(%(z)s, %(x)s, %(y)s), %(margin)s) AS clip
+        ),
+        tile_rows AS (
+            SELECT ST_AsMVTGeom(
+                       ST_SimplifyPreserveTopology(
+                           ST_ClipByBox2D(ST_Transform(zone.{quote(geom_column)}, 3857), bounds.clip),
+                           %(tolerance)s
+                       ),
+                       bounds.env, %(extent)s, %(buffer)s, true
+                   ) AS mvt_geom,
+                   zone.{quote(opts.pk.column)} AS feature_id,
+                   {', '.join(f'zone.{quote(column)}' for column in columns)}
+            FROM {quote(opts.db_table)} AS zone, bounds
+            WHERE zone.{quote(geom_column)} && ST_Transform(bounds.clip, 4326)
+            {project_clause}
+        )
+        SELECT ST_AsMVT(tile_rows.*, %(layer)s, %(extent)s, 'mvt_geom', 'feature_id')
+        FROM tile_rows
+        WHERE mvt_geom IS NOT NULL
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] is not None else b''
+
+
+def get_zone_tile(z, x, y, project_id=None):
+    """
+    Cached tile bytes plus the version they were built for.
+    """
+    version = get_zone_tiles_version()
+    key = (version, project_id, z, x, y)
+    tile = tile_cache.get(key)
+    if tile is None:
+        tile = render_zone_tile(z, x, y, project_id)
+        tile_cache.set(key, tile)
+    return tile, version
+
+
+@receiver(post_save, sender=getattr(settings, 'GIS_ZONE_MODEL', 'gis.IrrigationZone'))
+@receiver(post_delete, sender=getattr(settings, 'GIS_ZONE_MODEL', 'gis.IrrigationZone'))
+def bump_zone_tiles_version_on_write(sender, **kwargs):
+    # After commit, as for the catalog version: a tile rendered between the
+    # bump and the commit would cache the old zones under the new version
+    transaction.on_commit(bump_zone_tiles_version)
+
+# gis/apps.py - make sure the receivers above are registered
+"""
+class GisConfig(AppConfig):
+    name = 'gis'
+
+    def ready(self):
+        from . import tiles  # noqa: F401
+"""
+
+# =================
+# ZONE TILE VIEW - gis/views.py
+# =================
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from authentication.authentication import ClaimsJWTAuthentication
+from .tiles import get_zone_tile, get_zone_tiles_version, tile_is_valid
+
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+
+
+class ZoneTileView(APIView):
+    """
+    Mapbox Vector Tile of irrigation zones (layer "zones")
+    GET /api/gis/tiles/{z}/{x}/{y}.mvt?project_id=
+    Feature properties: name, irrigation_type, crop_type, status, project_id;
+    the zone id is the feature id. Empty tiles answer 204.
+    Frontend Integration: gisAPI.getZoneTileUrl() in services/api.ts
+    """
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, z, x, y):
+        if not tile_is_valid(z, x, y):
+            return Response({'error': 'Tile coordinates out of range'}, status=status.HTTP_400_BAD_REQUEST)
+
+        project_id = request.query_params.get('project_id')
+        if project_id is not None:
+            if not project_id.isdigit():
+                return Response({'error': 'project_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            project_id = int(project_id)
+
+        etag = f'"zones-v{get_zone_tiles_version()}-{project_id or "all"}-{z}-{x}-{y}"'
+        if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            response = HttpResponse(status=304)
+        else:
+            tile, version = get_zone_tile(z, x, y, project_id)
+            etag = f'"zones-v{version}-{project_id or "all"}-{z}-{x}-{y}"'
+            if tile:
+                response = HttpResponse(tile, content_type=MVT_CONTENT_TYPE)
+            else:
+                response = HttpResponse(status=204)
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+# gis/urls.py - add next to the existing zones routes
+"""
+from django.urls import path
+from .views import ZoneTileView
+
+urlpatterns += [
+    path('tiles/<int:z>/<int:x>/<int:y>.mvt', ZoneTileView.as_view(), name='zone-tiles'),
+]
+"""
+
+# =================
+# SHAPEFILE IMPORT JOBS - gis/models.py
+# =================
+import uuid
+
+
+class ShapefileImportJob(models.Model):
+    """
+    One background shapefile import. Created by POST /api/gis/shapefiles/,
+    advanced by gis.ingest, polled through GET /api/gis/shapefiles/jobs/{id}/.
+    Frontend Integration: gisAPI.uploadShapefile / gisAPI.getShapefileJob
+    """
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    source_path = models.CharField(max_length=500)
+    options = models.JSONField(default=dict)  # project_id, irrigation_type, crop_type, status for the new zones
+
+    total_features = models.PositiveIntegerField(default=0)
+    processed_features = models.PositiveIntegerField(default=0)
+    imported_features = models.PositiveIntegerField(default=0)
+    failed_features = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list)  # first GIS_INGEST_MAX_RECORDED_ERRORS feature errors
+    error_message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'gis_shapefile_import_job'
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='shp_job_status_idx'),
+        ]
+
+# =================
+# SHAPEFILE INGESTION - gis/ingest.py
+# =================
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.gis.geos import GEOSException, MultiPolygon
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ShapefileImportJob
+from .tiles import ZONE_TILE_GEOMETRY_FIELD, bump_zone_tiles_version, get_zone_model
+
+logger = logging.getLogger(__name__)
+
+SHAPEFILE_PARTS = {'.shp', '.shx', '.dbf', '.prj', '.cpg'}
+NAME_FIELDS = ('name', 'NAME', 'Name')
+PROGRESS_FIELDS = ['total_features', 'processed_features', 'imported_features',
+                   'failed_features', 'errors', 'updated_at']
+
+_ingest_pool = None
+_ingest_pool_lock = threading.Lock()
+
+
+def get_ingest_dir():
+    return getattr(settings, 'GIS_INGEST_DIR', None) or os.path.join(tempfile.gettempdir(), 'shapefile-imports')
+
+
+def spool_upload(job_dir, files):
+    """
+    Copy uploaded shapefile parts (or one .zip of them) into job_dir chunk by
+    chunk and return the path of the .shp. Raises ValueError on a bad upload.
+    """
+    max_bytes = getattr(settings, 'GIS_INGEST_MAX_BYTES', 2 * 1024 ** 3)
+    os.makedirs(job_dir, exist_ok=True)
+    for upload in files:
+        name = os.path.basename(upload.name)
+        extension = os.path.splitext(name)[1].lower()
+        if extension == '.zip':
+            with zipfile.ZipFile(upload) as archive:
+                members = [
+                    member for member in archive.infolist()
+                    if not member.is_dir()
+                    and os.path.splitext(member.filename)[1].lower() in SHAPEFILE_PARTS
+                ]
+                if sum(member.file_size for member in members) > max_bytes:
+                    raise ValueError('Archive expands beyond GIS_INGEST_MAX_BYTES')
+                for member in members:
+                    target = os.path.join(job_dir, os.path.basename(member.filename))
+                    with archive.open(member) as source, open(target, 'wb') as spooled:
+                        shutil.copyfileobj(source, spooled, 1024 * 1024)
+        elif extension in SHAPEFILE_PARTS:
+            with open(os.path.join(job_dir, name), 'wb') as spooled:
+                for chunk in upload.chunks():
+                    spooled.write(chunk)
+        else:
+            raise ValueError(f'Unsupported file: {name}')
+
+    spooled_files = os.listdir(job_dir)
+    shapefiles = [name for name in spooled_files if name.lower().endswith('.shp')]
+    if len(shapefiles) != 1:
+        raise ValueError('Upload must contain exactly one .shp file')
+    stem = os.path.splitext(shapefiles[0])[0].lower()
+    for extension in ('.shx', '.dbf'):
+        if f'{stem}{extension}' not in {name.lower() for name in spooled_files}:
+            raise ValueError(f'Missing {stem}{extension} next to the .shp file')
+    return os.path.join(job_dir, shapefiles[0])
+
+
+def _coerce_geometry(geometry, field_type):
+    """
+    Fit a repaired geometry to the zone field type (Polygon vs MultiPolygon).
+    """
+    if geometry.geom_type == 'GeometryCollection':
+        parts = []
+        for member in geometry:
+            if member.geom_type == 'Polygon':
+                parts.append(member)
+            elif member.geom_type == 'MultiPolygon':
+                parts.extend(member)
+        if not parts:
+            raise ValueError('No polygon left after repairing the geometry')
+        geometry = parts[0] if len(parts) == 1 else MultiPolygon(parts, srid=geometry.srid)
+
+    if field_type == 'MULTIPOLYGON' and geometry.geom_type == 'Polygon':
+        return MultiPolygon(geometry, srid=geometry.srid)
+    if field_type == 'POLYGON' and geometry.geom_type == 'MultiPolygon' and len(geometry) == 1:
+        return geometry[0]
+    if field_type != 'GEOMETRY' and geometry.geom_type.upper() != field_type:
+        raise ValueError(f'{geometry.geom_type} does not fit a {field_type} zone')
+    return geometry
+
+
+def _record_error(job, fid, message):
+    job.failed_features += 1
+    if len(job.errors) < getattr(settings, 'GIS_INGEST_MAX_RECORDED_ERRORS', 100):
+        job.errors.append({'feature': fid, 'error': message})
+
+
+def _flush(Zone, batch, job):
+    # Zones and progress commit together, so processed_features always
+    # counts exactly the features a resumed run must skip
+    with transaction.atomic():
+        if batch:
+            Zone.objects.bulk_create(batch)
+            job.imported_features += len(batch)
+        job.save(update_fields=PROGRESS_FIELDS)
+    batch.clear()
+
+
+def ingest_shapefile(job):
+    """
+    Stream features from the job's shapefile: repair, reproject to the zone
+    SRID and bulk-insert in GIS_INGEST_CHUNK_SIZE chunks, saving progress
+    after each chunk. Only one chunk of zones is held in memory at a time.
+    A requeued job resumes after the features it already processed.
+    """
+    # GDAL is loaded on the first import rather than at worker boot - the
+    # upload view imports this module but only ingestion reads shapefiles
+    from django.contrib.gis.gdal import CoordTransform, DataSource, SpatialReference
+    from django.contrib.gis.gdal.error import GDALException
+
+    Zone = get_zone_model()
+    geom_field = Zone._meta.get_field(ZONE_TILE_GEOMETRY_FIELD)
+    name_length = Zone._meta.get_field('name').max_length
+    chunk_size = getattr(settings, 'GIS_INGEST_CHUNK_SIZE', 2000)
+    options = job.options
+    stem = os.path.splitext(os.path.basename(job.source_path))[0]
+
+    layer = DataSource(job.source_path)[0]
+    if layer.srs is None:
+        raise ValueError('Shapefile has no .prj file, so its coordinate system is unknown')
+    transform = CoordTransform(layer.srs, SpatialReference(geom_field.srid))
+    name_field = next((field for field in NAME_FIELDS if field in layer.fields), None)
+    job.total_features = layer.num_feat
+    job.save(update_fields=PROGRESS_FIELDS)
+
+    batch = []
+    for feature in itertools.islice(layer, job.processed_features, None):
+        job.processed_features += 1
+        try:
+            geometry = feature.geom
+            geometry.transform(transform)
+            geometry = geometry.geos
+            if not geometry.valid:
+                geometry = geometry.make_valid()
+            geometry = _coerce_geometry(geometry, geom_field.geom_type)
+        except (GDALException, GEOSException, ValueError) as exc:
+            _record_error(job, feature.fid, str(exc))
+        else:
+            name = str(feature.get(name_field)) if name_field else f'{stem} {feature.fid}'
+            batch.append(Zone(**{
+                ZONE_TILE_GEOMETRY_FIELD: geometry,
+                'name': name[:name_length],
+                'irrigation_type': options.get('irrigation_type', ''),
+                'crop_type': options.get('crop_type', ''),
+                'status': options.get('status', 'Planned'),
+                'project_id': options.get('project_id'),
+            }))
+
+        if len(batch) >= chunk_size or job.processed_features % chunk_size == 0:
+            _flush(Zone, batch, job)
+    _flush(Zone, batch, job)
+
+
+def run_import(job_id):
+    """
+    Claim a queued job and ingest it. Safe to call from several workers:
+    only the one whose status update wins runs the job.
+    """
+    claimed = ShapefileImportJob.objects.filter(pk=job_id, status='queued').update(
+        status='running', started_at=timezone.now(), updated_at=timezone.now()
+    )
+    if not claimed:
+        return
+    job = ShapefileImportJob.objects.get(pk=job_id)
+    try:
+        ingest_shapefile(job)
+        job.status = 'completed'
+    except Exception as exc:
+        logger.exception('Shapefile import %s failed', job_id)
+        job.status = 'failed'
+        job.error_message = str(exc)
+    finally:
+        job.finished_at = timezone.now()
+        job.save(update_fields=PROGRESS_FIELDS + ['status', 'error_message', 'finished_at'])
+        shutil.rmtree(os.path.dirname(job.source_path), ignore_errors=True)
+        if job.imported_features:
+            bump_zone_tiles_version()
+
+
+def _run_in_thread(job_id):
+    try:
+        run_import(job_id)
+    finally:
+        connection.close()
+
+
+def get_ingest_pool():
+    """
+    Lazily started, process-wide pool of GIS_INGEST_WORKERS threads.
+    """
+    global _ingest_pool
+    if _ingest_pool is None:
+        with _ingest_pool_lock:
+            if _ingest_pool is None:
+                _ingest_pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'GIS_INGEST_WORKERS', 1),
+                    thread_name_prefix='shapefile-ingest',
+                )
+    return _ingest_pool
+
+
+def submit_import(job_id):
+    """
+    Start a job once the creating transaction commits. In 'command' mode the
+    job stays queued for `manage.py run_shapefile_imports`.
+    """
+    if getattr(settings, 'GIS_INGEST_MODE', 'thread') == 'thread':
+        transaction.on_commit(lambda: get_ingest_pool().submit(_run_in_thread, job_id))
+
+# gis/management/commands/run_shapefile_imports.py
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gis.ingest import run_import
+from gis.models import ShapefileImportJob
+
+
+class Command(BaseCommand):
+    help = "Runs queued shapefile imports; requeues running jobs that stopped reporting progress"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-minutes', type=int, default=30)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        requeued = ShapefileImportJob.objects.filter(status='running', updated_at__lt=cutoff).update(status='queued')
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs')
+        for job_id in ShapefileImportJob.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True):
+            run_import(job_id)
+            self.stdout.write(f'Processed {job_id}')
+"""
+
+# =================
+# SHAPEFILE IMPORT SERIALIZER - gis/serializers.py
+# =================
+class ShapefileImportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ShapefileImportJob
+        fields = [
+            'id', 'status', 'progress', 'total_features', 'processed_features',
+            'imported_features', 'failed_features', 'errors', 'error_message',
+            'created_at', 'started_at', 'finished_at',
+        ]
+
+    def get_progress(self, job):
+        if job.status == 'completed':
+            return 100.0
+        if not job.total_features:
+            return 0.0
+        return round(100.0 * job.processed_features / job.total_features, 1)
+
+# =================
+# SHAPEFILE UPLOAD VIEWS - gis/views.py (replaces the in-request shapefile import)
+# =================
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework.parsers import FormParser, MultiPartParser
+
+from .ingest import get_ingest_dir, spool_upload, submit_import
+from .models import ShapefileImportJob
+from .serializers import ShapefileImportJobSerializer
+
+
+class ShapefileUploadView(APIView):
+    """
+    Queue a shapefile import and return its job at once (202)
+    POST /api/gis/shapefiles/
+    multipart: files (.shp/.shx/.dbf/.prj or a single .zip), optional
+    project_id, irrigation_type, crop_type, status applied to every new zone
+    Frontend Integration: gisAPI.uploadShapefile in services/api.ts
+    """
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def initial(self, request, *args, **kwargs):
+        # Stream every part to a temporary file instead of holding it in memory
+        request._request.upload_handlers = [TemporaryFileUploadHandler(request._request)]
+        super().initial(request, *args, **kwargs)
+
+    def post(self, request):
+        files = request.FILES.getlist('files')
+        if not files:
+            return Response({'error': 'No files uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+
+        options = {
+            key: request.data[key]
+            for key in ('irrigation_type', 'crop_type', 'status')
+            if request.data.get(key)
+        }
+        project_id = request.data.get('project_id')
+        if project_id:
+            if not str(project_id).isdigit():
+                return Response({'error': 'project_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            options['project_id'] = int(project_id)
+
+        job = ShapefileImportJob(created_by=get_model_user(request.user), options=options)
+        job_dir = os.path.join(get_ingest_dir(), str(job.id))
+        try:
+            job.source_path = spool_upload(job_dir, files)
+        except (ValueError, zipfile.BadZipFile) as exc:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            job.save()
+            submit_import(job.id)
+        return Response(ShapefileImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ShapefileImportJobView(APIView):
+    """
+    Progress of a shapefile import
+    GET /api/gis/shapefiles/jobs/{job_id}/
+    Frontend Integration: gisAPI.getShapefileJob in services/api.ts
+    """
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = ShapefileImportJob.objects.filter(pk=job_id).first()
+        if job is None or (job.created_by_id != request.user.id and not request.user.is_staff):
+            return Response({'error': 'Import job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ShapefileImportJobSerializer(job).data)
+
+# gis/urls.py - route shapefile uploads to the job-based views
+"""
+urlpatterns += [
+    path('shapefiles/', ShapefileUploadView.as_view(), name='shapefile-upload'),
+    path('shapefiles/jobs/<uuid:job_id>/', ShapefileImportJobView.as_view(), name='shapefile-job'),
+]
+"""
+
+# ==============================================================================
+# DASHBOARD STATISTICS - PRECOMPUTED AGGREGATES
+# ==============================================================================
+
+# =================
+# DASHBOARD AGGREGATES - core/models.py
+# =================
+
+class DashboardAggregate(models.Model):
+    """
+    Running count, area and cost per (source, status, irrigation type, zone),
+    kept current by core.dashboard on every project / BOQ write. There is no
+    total row - writers would all queue on it; readers sum the buckets.
+    Frontend Integration: PlannerDashboard.tsx, EngineerDashboard.tsx
+    """
+
+    source = models.CharField(max_length=30)
+    status = models.CharField(max_length=50, blank=True)
+    irrigation_type = models.CharField(max_length=100, blank=True)
+    zone = models.CharField(max_length=100, blank=True)
+
+    count = models.BigIntegerField(default=0)
+    total_area = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    total_cost = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core_dashboard_aggregate'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'status', 'irrigation_type', 'zone'], name='dashboard_aggregate_key'
+            ),
+        ]
+
+# =================
+# DASHBOARD AGGREGATION - core/dashboard.py
+# =================
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.signals import pre_save, post_save, pre_delete
+
+from .models import DashboardAggregate
+
+DIMENSIONS = ('status', 'irrigation_type', 'zone')
+
+# source -> model label and the field (or lookup path) behind each dimension
+# and measure; None leaves it out. Override with DASHBOARD_STAT_SOURCES.
+DEFAULT_DASHBOARD_SOURCES = {
+    'projects': {
+        'model': 'projects.Project',
+        'status': 'status', 'irrigation_type': 'irrigation_type', 'zone': 'zone',
+        'area': 'total_area', 'cost': None,
+    },
+    'boq_projects': {
+        'model': 'boq.ExistingProject',
+        'status': 'status', 'irrigation_type': 'irrigation_type', 'zone': 'zone',
+        'area': 'area', 'cost': 'total_cost',
+    },
+    'boq_analyses': {
+        'model': 'boq.BOQAnalysis',
+        'status': 'status', 'irrigation_type': 'existing_project__irrigation_type',
+        'zone': 'existing_project__zone', 'area': None, 'cost': 'total_cost',
+    },
+}
+
+
+def get_dashboard_sources():
+    return getattr(settings, 'DASHBOARD_STAT_SOURCES', DEFAULT_DASHBOARD_SOURCES)
+
+
+def _source_for(sender):
+    label = sender._meta.label
+    for name, config in get_dashboard_sources().items():
+        if config['model'] == label:
+            return name, config
+    return None, None
+
+
+def _value_fields(config):
+    return [config[key] for key in (*DIMENSIONS, 'area', 'cost') if config.get(key)]
+
+
+def _contribution(config, row):
+    """(dimension key, area, cost) for one source row read with values()"""
+    key = tuple(
+        str(row[config[dim]])[:100] if config.get(dim) and row[config[dim]] is not None else ''
+        for dim in DIMENSIONS
+    )
+    area = row[config['area']] if config.get('area') else None
+    cost = row[config['cost']] if config.get('cost') else None
+    return key, Decimal(area or 0), Decimal(cost or 0)
+
+
+def _read(sender, config, pk):
+    return sender._default_manager.filter(pk=pk).values(*_value_fields(config)).first()
+
+
+def _add(deltas, config, row, sign):
+    key, area, cost = _contribution(config, row)
+    deltas[key][0] += sign
+    deltas[key][1] += sign * area
+    deltas[key][2] += sign * cost
+
+
+def apply_delta(source, deltas):
+    """
+    Add {key: [count, area, cost]} to the aggregate rows with F()
+    increments, creating missing rows. Rows are touched in key order so
+    concurrent writers moving rows between the same buckets cannot
+    deadlock. Joins the caller's transaction when there is one.
+    """
+    with transaction.atomic():
+        for (status, irrigation_type, zone), (count, area, cost) in sorted(deltas.items()):
+            if not count and not area and not cost:
+                continue
+            row, _ = DashboardAggregate.objects.get_or_create(
+                source=source, status=status, irrigation_type=irrigation_type, zone=zone
+            )
+            DashboardAggregate.objects.filter(pk=row.pk).update(
+                count=F('count') + count,
+                total_area=F('total_area') + area,
+                total_cost=F('total_cost') + cost,
+            )
+
+
+def _remember_previous(sender, instance, **kwargs):
+    source, config = _source_for(sender)
+    if source is None:
+        return
+    previous = None
+    if not instance._state.adding and instance.pk is not None:
+        previous = _read(sender, config, instance.pk)
+    instance._dashboard_previous = previous
+
+
+def _record_save(sender, instance, raw=False, **kwargs):
+    source, config = _source_for(sender)
+    if source is None or raw:
+        return
+    deltas = defaultdict(lambda: [0, Decimal(0), Decimal(0)])
+    previous = getattr(instance, '_dashboard_previous', None)
+    if previous is not None:
+        _add(deltas, config, previous, -1)
+    current = _read(sender, config, instance.pk)
+    if current is not None:
+        _add(deltas, config, current, 1)
+    instance._dashboard_previous = current
+    apply_delta(source, deltas)
+
+
+def _record_delete(sender, instance, **kwargs):
+    source, config = _source_for(sender)
+    if source is None or instance.pk is None:
+        return
+    previous = _read(sender, config, instance.pk)
+    if previous is not None:
+        key, area, cost = _contribution(config, previous)
+        apply_delta(source, {key: [-1, -area, -cost]})
+
+
+def _dependents(sender):
+    """
+    (source, config, model, relation) for every source that takes a
+    dimension or measure from `sender` through a relation, e.g. BOQ
+    analyses bucketed by their existing project's irrigation type and zone.
+    """
+    for name, config in get_dashboard_sources().items():
+        model = apps.get_model(config['model'])
+        relations = {
+            config[key].split('__', 1)[0]
+            for key in (*DIMENSIONS, 'area', 'cost') if config.get(key) and '__' in config[key]
+        }
+        for relation in sorted(relations):
+            if model._meta.get_field(relation).related_model is sender:
+                yield name, config, model, relation
+
+
+def _read_dependents(model, config, relation, pk):
+    return list(model._default_manager.filter(**{relation: pk}).values(*_value_fields(config)))
+
+
+def _remember_dependents(sender, instance, **kwargs):
+    if instance._state.adding or instance.pk is None:
+        return
+    instance._dashboard_dependents = {
+        (name, relation): _read_dependents(model, config, relation, instance.pk)
+        for name, config, model, relation in _dependents(sender)
+    }
+
+
+def _record_dependents(sender, instance, created=False, raw=False, **kwargs):
+    """Move dependent rows between buckets when the row they read through changes"""
+    previous = getattr(instance, '_dashboard_dependents', None)
+    if created or raw or not previous:
+        return
+    for name, config, model, relation in _dependents(sender):
+        rows = previous.get((name, relation))
+        if not rows:
+            continue
+        deltas = defaultdict(lambda: [0, Decimal(0), Decimal(0)])
+        for row in rows:
+            _add(deltas, config, row, -1)
+        for row in _read_dependents(model, config, relation, instance.pk):
+            _add(deltas, config, row, 1)
+        apply_delta(name, deltas)
+    instance._dashboard_dependents = None
+
+
+def connect_dashboard_signals():
+    """
+    Hook every configured source model, and every model a source reads a
+    dimension through. Queryset.update() and bulk_create() bypass model
+    signals - run `manage.py rebuild_dashboard_stats` after them.
+    """
+    related = set()
+    for name, config in get_dashboard_sources().items():
+        pre_save.connect(_remember_previous, sender=config['model'], dispatch_uid=f'dashboard-pre-{name}')
+        post_save.connect(_record_save, sender=config['model'], dispatch_uid=f'dashboard-save-{name}')
+        pre_delete.connect(_record_delete, sender=config['model'], dispatch_uid=f'dashboard-delete-{name}')
+        model = apps.get_model(config['model'])
+        for key in (*DIMENSIONS, 'area', 'cost'):
+            if config.get(key) and '__' in config[key]:
+                related.add(model._meta.get_field(config[key].split('__', 1)[0]).related_model)
+    for model in related:
+        label = model._meta.label
+        pre_save.connect(_remember_dependents, sender=model, dispatch_uid=f'dashboard-dependents-pre-{label}')
+        post_save.connect(_record_dependents, sender=model, dispatch_uid=f'dashboard-dependents-save-{label}')
+
+
+def rebuild_dashboard_stats(sources=None):
+    """Recompute aggregates from scratch with one GROUP BY per source"""
+    configured = get_dashboard_sources()
+    rebuilt = {}
+    for name in sources or configured:
+        config = configured[name]
+        model = apps.get_model(config['model'])
+        dims = [config[dim] for dim in DIMENSIONS if config.get(dim)]
+        measures = {'row_count': Count('pk')}
+        if config.get('area'):
+            measures['area_sum'] = Sum(config['area'])
+        if config.get('cost'):
+            measures['cost_sum'] = Sum(config['cost'])
+
+        grouped = defaultdict(lambda: [0, Decimal(0), Decimal(0)])
+        for row in model._default_manager.order_by().values(*dims).annotate(**measures):
+            key = tuple(
+                str(row[config[dim]])[:100] if config.get(dim) and row[config[dim]] is not None else ''
+                for dim in DIMENSIONS
+            )
+            grouped[key][0] += row['row_count']
+            grouped[key][1] += Decimal(row.get('area_sum') or 0)
+            grouped[key][2] += Decimal(row.get('cost_sum') or 0)
+
+        with transaction.atomic():
+            DashboardAggregate.objects.filter(source=name).delete()
+            DashboardAggregate.objects.bulk_create([
+                DashboardAggregate(source=name, status=status, irrigation_type=irrigation_type, zone=zone,
+                                   count=count, total_area=area, total_cost=cost)
+                for (status, irrigation_type, zone), (count, area, cost) in grouped.items()
+            ])
+        rebuilt[name] = sum(count for count, _, _ in grouped.values())
+    return rebuilt
+
+
+def dashboard_summary(source):
+    """
+    Totals and per-dimension breakdowns for one source, read from the
+    aggregate table (one small indexed read however many projects exist).
+    """
+    totals = {'count': 0, 'total_area': 0.0, 'total_cost': 0.0}
+    breakdowns = {dim: defaultdict(lambda: {'count': 0, 'total_area': 0.0, 'total_cost': 0.0}) for dim in DIMENSIONS}
+    for row in DashboardAggregate.objects.filter(source=source).values(
+        *DIMENSIONS, 'count', 'total_area', 'total_cost'
+    ):
+        values = {'count': row['count'], 'total_area': float(row['total_area']), 'total_cost': float(row['total_cost'])}
+        if not row['count']:
+            continue
+        for measure, value in values.items():
+            totals[measure] += value
+        for dim in DIMENSIONS:
+            bucket = breakdowns[dim][row[dim]]
+            for measure, value in values.items():
+                bucket[measure] += value
+
+    def rows(dim):
+        return sorted(
+            ({dim: value, **bucket, 'average_cost': round(bucket['total_cost'] / bucket['count'], 2)}
+             for value, bucket in breakdowns[dim].items() if bucket['count']),
+            key=lambda bucket: -bucket['count']
+        )
+
+    return {
+        **totals,
+        'average_cost': round(totals['total_cost'] / totals['count'], 2) if totals['count'] else 0.0,
+        'by_status': rows('status'),
+        'by_irrigation_type': rows('irrigation_type'),
+        'by_zone': rows('zone'),
+    }
+
+# core/management/commands/rebuild_dashboard_stats.py
+"""
+from django.core.management.base import BaseCommand
+
+from core.dashboard import get_dashboard_sources, rebuild_dashboard_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the dashboard aggregate table from the project and BOQ tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', action='append', choices=list(get_dashboard_sources()))
+
+    def handle(self, *args, **options):
+        for source, count in rebuild_dashboard_stats(options['source']).items():
+            self.stdout.write(f'{source}: {count} rows aggregated')
+"""
+
+# =================
+# DASHBOARD ENDPOINTS - projects/views.py and boq/views.py
+# =================
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.timesince import timesince
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from core.dashboard import dashboard_summary
+from projects.models import Project
+
+DASHBOARD_FEED_SIZE = 10
+
+
+def _kpi_change(current, previous, rising_is_good=True):
+    """('+12%', 'positive') for the change from previous to current period"""
+    if previous:
+        change = round(100.0 * (current - previous) / previous)
+    else:
+        change = 100 if current else 0
+    good = change >= 0 if rising_is_good else change <= 0
+    return f'{change:+d}%' if change else '0%', 'positive' if good else 'negative'
+
+
+def _project_feed(projects):
+    return [
+        {
+            'id': project.pk,
+            'title': project.name,
+            'action': ('Project created' if project.updated_at - project.created_at < timedelta(seconds=1)
+                       else 'Project updated'),
+            'user': project.created_by.username if project.created_by else None,
+            'details': project.name,
+            'status': project.status,
+            'timestamp': project.updated_at,
+            'time': f'{timesince(project.updated_at)} ago',
+        }
+        for project in projects.select_related('created_by').order_by('-updated_at')[:DASHBOARD_FEED_SIZE]
+    ]
+
+
+def _share(part, whole):
+    return round(100.0 * part / whole, 1) if whole else 0.0
+
+
+class DashboardStatsMixin:
+    """
+    Mix into the projects viewset (GET /api/projects/dashboard_stats/).
+    Status and zone counts come from the aggregate table; only the weekly
+    windows and the activity feeds query the project and user tables, each
+    through a date-bounded or LIMITed read.
+    """
+
+    def get_role_dashboard_stats(self, request, projects, analyses):
+        """
+        Admin, engineer, planner and viewer KPIs plus kpi_changes and the
+        activity feeds. `projects` / `analyses` are dashboard_summary() results.
+        """
+        now = timezone.now()
+        week_ago, two_weeks_ago = now - timedelta(days=7), now - timedelta(days=14)
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        previous_month_start = (month_start - timedelta(days=1)).replace(day=1)
+
+        User = get_user_model()
+        statuses = {row['status']: row['count'] for row in projects['by_status']}
+        submitted, approved = statuses.get('submitted', 0), statuses.get('approved', 0)
+        zones = sum(1 for row in projects['by_zone'] if row['zone'])
+        own_projects = Project.objects.filter(created_by_id=request.user.id)
+
+        def weekly(queryset, field):
+            return (queryset.filter(**{f'{field}__gte': week_ago}).count(),
+                    queryset.filter(**{f'{field}__gte': two_weeks_ago, f'{field}__lt': week_ago}).count())
+
+        new_users = weekly(User.objects, 'date_joined')
+        new_projects = weekly(Project.objects, 'created_at')
+        logins = weekly(User.objects, 'last_login')
+        updates = weekly(Project.objects, 'updated_at')
+        activity = (logins[0] + updates[0], logins[1] + updates[1])
+        own_updates = weekly(own_projects, 'updated_at')
+        alerts = (BlacklistedToken.objects.filter(blacklisted_at__gte=month_start).count(),
+                  BlacklistedToken.objects.filter(blacklisted_at__gte=previous_month_start,
+                                                  blacklisted_at__lt=month_start).count())
+
+        kpi_changes = {}
+        for key, (current, previous), rising_is_good in (
+            ('users', new_users, True),
+            ('projects', new_projects, True),
+            ('activity', activity, True),
+            ('alerts', alerts, False),
+            ('engineer_projects', own_updates, True),
+            ('planner_projects', new_projects, True),
+        ):
+            kpi_changes[key], kpi_changes[f'{key}_type'] = _kpi_change(current, previous, rising_is_good)
+
+        own_submitted = own_projects.filter(status='submitted')
+        return {
+            # Admin
+            'total_users': User.objects.filter(is_active=True).count(),
+            'system_activity': activity[0],  # logins + project edits in the last 7 days
+            'security_alerts': alerts[0],  # refresh tokens revoked this month
+            'kpi_changes': kpi_changes,
+            'recent_activities': _project_feed(Project.objects.all()),
+            # Engineer
+            'engineer_active_projects': own_submitted.count(),  # own projects awaiting approval
+            'engineer_boqs_completed': analyses['count'],
+            'engineer_systems_designed': approved,
+            'engineer_efficiency_rate': _share(approved, submitted + approved),
+            'engineer_recent_work': _project_feed(own_projects),
+            # Planner
+            'planner_projects': statuses.get('draft', 0),  # projects still in planning
+            'planner_sites_analyzed': zones,
+            'planner_reports_generated': analyses['count'],
+            'planner_project_success': _share(approved, projects['count']),
+            'planner_recent_activities': _project_feed(own_projects),
+            # Viewer
+            'viewer_projects_accessible': projects['count'],
+            'viewer_reports_available': analyses['count'],
+            'viewer_locations_covered': zones,
+            'viewer_last_updated': Project.objects.aggregate(last=Max('updated_at'))['last'],
+        }
+
+    @action(detail=False, methods=['get'])
+    def dashboard_stats(self, request):
+        """
+        Dashboard KPIs; project totals and breakdowns from the precomputed aggregates
+        GET /api/projects/dashboard_stats/
+        Frontend Integration: projectsAPI.getDashboardStats, DashboardStats in types/irrigation.ts
+        """
+        projects = dashboard_summary('projects')
+        analyses = dashboard_summary('boq_analyses')
+        return Response({
+            **self.get_role_dashboard_stats(request, projects, analyses),
+            'total_projects': projects['count'],
+            'total_area': projects['total_area'],
+            'projects_by_status': projects['by_status'],
+            'projects_by_irrigation_type': projects['by_irrigation_type'],
+            'projects_by_zone': projects['by_zone'],
+        })
+
+
+class CostAnalysisMixin:
+    """
+    Mix into the existing-projects viewset (GET /api/boq/existing-projects/cost_analysis/).
+    """
+
+    @action(detail=False, methods=['get'])
+    def cost_analysis(self, request):
+        """
+        Cost totals and breakdowns from the precomputed aggregates
+        GET /api/boq/existing-projects/cost_analysis/
+        Frontend Integration: boqAPI.getCostAnalysis
+        """
+        return Response(dashboard_summary('boq_projects'))
+
+# projects/views.py, boq/views.py - usage
+"""
+class ProjectViewSet(DashboardStatsMixin, viewsets.ModelViewSet):
+    ...
+
+class ExistingProjectViewSet(CostAnalysisMixin, viewsets.ModelViewSet):
+    ...
+"""
+
+
+# ==============================================================================
+# PROJECT WIZARD - DELTA SAVES (JSON PATCH / MERGE PATCH)
+# ==============================================================================
+
+# =================
+# WIZARD STORAGE - projects/models.py
+# =================
+
+class WizardDocument(models.Model):
+    """
+    Compacted wizard document of a project plus its version counter.
+    The current document is `document` with the WizardPatch rows after
+    base_version replayed on top; compaction folds them back in.
+    Frontend Integration: projectsAPI.getProjectWizard / patchProjectWizard
+    """
+
+    project = models.OneToOneField('projects.Project', on_delete=models.CASCADE,
+                                   primary_key=True, related_name='wizard_document')
+    document = models.JSONField(default=dict)
+    base_version = models.PositiveIntegerField(default=0)
+    version = models.PositiveIntegerField(default=0)
+    pending_patches = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'projects_wizard_document'
+
+
+class WizardPatch(models.Model):
+    """
+    One PATCH to a wizard document, stored as sent.
+    """
+
+    FORMAT_CHOICES = [
+        ('json-patch', 'JSON Patch (RFC 6902)'),
+        ('merge-patch', 'JSON Merge Patch (RFC 7386)'),
+    ]
+
+    document = models.ForeignKey(WizardDocument, on_delete=models.CASCADE, related_name='patches')
+    version = models.PositiveIntegerField()
+    format = models.CharField(max_length=12, choices=FORMAT_CHOICES)
+    operations = models.JSONField()
+    size = models.PositiveIntegerField(default=0)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'projects_wizard_patch'
+        constraints = [
+            models.UniqueConstraint(fields=['document', 'version'], name='wizard_patch_version'),
+        ]
+
+# =================
+# JSON PATCH - projects/json_patch.py
+# =================
+import copy
+
+
+class PatchError(ValueError):
+    """The patch cannot be applied to the document (422)"""
+
+
+class PatchConflict(PatchError):
+    """A JSON Patch "test" operation failed (409)"""
+
+
+def _pointer_parts(pointer):
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith('/')):
+        raise PatchError(f"Invalid JSON pointer '{pointer}'")
+    if pointer == '':
+        return []
+    return [part.replace('~1', '/').replace('~0', '~') for part in pointer[1:].split('/')]
+
+
+def _index(target, part, pointer, allow_end=False):
+    if allow_end and part == '-':
+        return len(target)
+    if not part.isdigit() or (len(part) > 1 and part.startswith('0')):
+        raise PatchError(f"Invalid array index in '{pointer}'")
+    index = int(part)
+    if index > len(target) or (index == len(target) and not allow_end):
+        raise PatchError(f"Array index out of range in '{pointer}'")
+    return index
+
+
+def _child(target, part, pointer):
+    if isinstance(target, dict):
+        if part not in target:
+            raise PatchError(f"Path '{pointer}' does not exist")
+        return target[part]
+    if isinstance(target, list):
+        return target[_index(target, part, pointer)]
+    raise PatchError(f"Path '{pointer}' does not exist")
+
+
+def _get(document, pointer):
+    target = document
+    for part in _pointer_parts(pointer):
+        target = _child(target, part, pointer)
+    return target
+
+
+def _parent(document, pointer):
+    parts = _pointer_parts(pointer)
+    target = document
+    for part in parts[:-1]:
+        target = _child(target, part, pointer)
+    return target, parts[-1]
+
+
+def _add(document, pointer, value):
+    if pointer == '':
+        return value
+    parent, key = _parent(document, pointer)
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, key, pointer, allow_end=True), value)
+    else:
+        raise PatchError(f"Path '{pointer}' does not exist")
+    return document
+
+
+def _remove(document, pointer):
+    if pointer == '':
+        raise PatchError('Cannot remove the whole document')
+    parent, key = _parent(document, pointer)
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise PatchError(f"Path '{pointer}' does not exist")
+        return parent.pop(key)
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, key, pointer))
+    raise PatchError(f"Path '{pointer}' does not exist")
+
+
+def apply_json_patch(document, operations, in_place=False):
+    """
+    Apply RFC 6902 operations. All or nothing: unless in_place, the input
+    document is left untouched when any operation fails.
+    """
+    if not isinstance(operations, list):
+        raise PatchError('A JSON Patch must be an array of operations')
+    if not in_place:
+        document = copy.deepcopy(document)
+    for n, operation in enumerate(operations):
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise PatchError(f'Operation {n}: "op" and "path" are required')
+        op, path = operation['op'], operation['path']
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise PatchError(f'Operation {n}: "value" is required for {op}')
+        if op in ('move', 'copy') and 'from' not in operation:
+            raise PatchError(f'Operation {n}: "from" is required for {op}')
+
+        if op == 'add':
+            document = _add(document, path, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            _remove(document, path)
+        elif op == 'replace':
+            if path == '':
+                document = copy.deepcopy(operation['value'])
+            else:
+                _get(document, path)
+                parent, key = _parent(document, path)
+                if isinstance(parent, list):
+                    parent[_index(parent, key, path)] = copy.deepcopy(operation['value'])
+                else:
+                    parent[key] = copy.deepcopy(operation['value'])
+        elif op == 'move':
+            source = operation['from']
+            if path != source and path.startswith(source + '/'):
+                raise PatchError(f'Operation {n}: cannot move a value into itself')
+            document = _add(document, path, _remove(document, source))
+        elif op == 'copy':
+            document = _add(document, path, copy.deepcopy(_get(document, operation['from'])))
+        elif op == 'test':
+            if _get(document, path) != operation['value']:
+                raise PatchConflict(f"Operation {n}: test failed at '{path}'")
+        else:
+            raise PatchError(f"Operation {n}: unknown op '{op}'")
+    return document
+
+
+def apply_merge_patch(target, patch):
+    """
+    RFC 7386 JSON Merge Patch: objects merge recursively, null deletes.
+    Untouched subtrees are shared with the input, never mutated.
+    """
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+def apply_patch(format, document, operations, in_place=False):
+    if format == 'merge-patch':
+        return apply_merge_patch(document, operations)
+    return apply_json_patch(document, operations, in_place=in_place)
+
+# =================
+# WIZARD DELTA SAVES - projects/wizard.py
+# =================
+import copy
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .json_patch import PatchError, apply_patch
+from .models import WizardDocument, WizardPatch
+
+WIZARD_CACHE_KEY = 'projects:wizard:{project_id}:v{version}'
+_ETAG = re.compile(r'(?:W/)?"wizard-(\d+)-v(\d+)"')
+
+
+class WizardVersionConflict(Exception):
+    """The client edited a stale version (412)"""
+
+    def __init__(self, state):
+        super().__init__(f'Wizard is at version {state.version}')
+        self.state = state
+
+
+class WizardBusy(Exception):
+    """Compactions kept deleting patches while they were replayed (503)"""
+
+
+def wizard_etag(state):
+    return f'"wizard-{state.project_id}-v{state.version}"'
+
+
+def parse_if_match(header):
+    """Version named by an If-Match header, '*' for any, None when absent"""
+    if not header:
+        return None
+    if header.strip() == '*':
+        return '*'
+    match = _ETAG.search(header)
+    if not match:
+        return -1  # never matches - a foreign or malformed tag is a failed precondition
+    return int(match.group(2))
+
+
+def _cache_document(state, document):
+    key = WIZARD_CACHE_KEY.format(project_id=state.project_id, version=state.version)
+    timeout = getattr(settings, 'WIZARD_CACHE_TIMEOUT', 60 * 60)
+    transaction.on_commit(lambda: cache.set(key, document, timeout))
+
+
+def _write_back(state, document):
+    # Project.wizard_data stays the copy the project serializers, exports and
+    # BOQ read; a queryset update so no Project signals fire on every save
+    project_model = WizardDocument._meta.get_field('project').related_model
+    if any(field.name == 'wizard_data' for field in project_model._meta.concrete_fields):
+        project_model.objects.filter(pk=state.project_id).update(wizard_data=document)
+
+
+def materialize(state):
+    """
+    Current document: the cached copy for this version, else base + patch
+    replay. If a compaction deleted patches after `state` was read, `state`
+    is reloaded and replayed again, so a partial replay is never cached;
+    raises WizardBusy after WIZARD_MATERIALIZE_ATTEMPTS such races.
+    """
+    key = WIZARD_CACHE_KEY.format(project_id=state.project_id, version=state.version)
+    document = cache.get(key)
+    if document is not None:
+        return document
+    for _ in range(getattr(settings, 'WIZARD_MATERIALIZE_ATTEMPTS', 3)):
+        document = copy.deepcopy(state.document)
+        patches = WizardPatch.objects.filter(
+            document_id=state.pk, version__gt=state.base_version, version__lte=state.version
+        ).order_by('version').values_list('format', 'operations')
+        replayed = 0
+        for patch_format, operations in patches:
+            document = apply_patch(patch_format, document, operations, in_place=True)
+            replayed += 1
+        if replayed == state.version - state.base_version:
+            break
+        state.refresh_from_db()
+    else:
+        raise WizardBusy(f'Wizard of project {state.project_id} is being compacted, retry')
+    key = WIZARD_CACHE_KEY.format(project_id=state.project_id, version=state.version)
+    cache.set(key, document, getattr(settings, 'WIZARD_CACHE_TIMEOUT', 60 * 60))
+    return document
+
+
+def _state(project_id, initial=None, for_update=False):
+    queryset = WizardDocument.objects.select_for_update() if for_update else WizardDocument.objects
+    state, _ = queryset.get_or_create(project_id=project_id, defaults={'document': initial or {}})
+    return state
+
+
+def _check_version(state, expected_version):
+    if expected_version not in (None, '*') and expected_version != state.version:
+        raise WizardVersionConflict(state)
+
+
+def _fold(state, document):
+    state.document = document
+    state.base_version = state.version
+    state.pending_patches = 0
+    WizardPatch.objects.filter(document_id=state.pk, version__lte=state.version).delete()
+
+
+def get_wizard(project_id, initial=None):
+    state = _state(project_id, initial)
+    return state, materialize(state)
+
+
+def patch_wizard(project_id, patch_format, operations, expected_version=None, size=0, user=None, initial=None):
+    """
+    Apply a patch under a row lock and store only the patch. Every
+    WIZARD_COMPACT_AFTER patches the document is compacted in the same
+    transaction. Raises WizardVersionConflict, or PatchError also when the
+    result is not an object.
+    """
+    with transaction.atomic():
+        state = _state(project_id, initial, for_update=True)
+        _check_version(state, expected_version)
+        document = apply_patch(patch_format, materialize(state), operations)
+        if not isinstance(document, dict):
+            raise PatchError('Wizard document must remain an object')
+
+        state.version += 1
+        state.pending_patches += 1
+        WizardPatch.objects.create(
+            document=state, version=state.version, format=patch_format,
+            operations=operations, size=size, created_by=user,
+        )
+        update_fields = ['version', 'pending_patches', 'updated_at']
+        if state.pending_patches >= getattr(settings, 'WIZARD_COMPACT_AFTER', 50):
+            _fold(state, document)
+            update_fields += ['document', 'base_version']
+        state.save(update_fields=update_fields)
+        _write_back(state, document)
+        _cache_document(state, document)
+    return state, document
+
+
+def replace_wizard(project_id, document, expected_version=None):
+    """Full PUT: the new document becomes the compacted base"""
+    with transaction.atomic():
+        state = _state(project_id, for_update=True)
+        _check_version(state, expected_version)
+        state.version += 1
+        _fold(state, document)
+        state.save(update_fields=['document', 'base_version', 'version', 'pending_patches', 'updated_at'])
+        _write_back(state, document)
+        _cache_document(state, document)
+    return state
+
+
+def compact_wizard(project_id):
+    """Fold pending patches into the base document"""
+    with transaction.atomic():
+        state = _state(project_id, for_update=True)
+        if state.pending_patches:
+            document = materialize(state)
+            _fold(state, document)
+            state.save(update_fields=['document', 'base_version', 'pending_patches', 'updated_at'])
+            _write_back(state, document)
+    return state
+
+# projects/management/commands/compact_wizard_documents.py
+"""
+from django.core.management.base import BaseCommand
+
+from projects.models import WizardDocument
+from projects.wizard import compact_wizard
+
+
+class Command(BaseCommand):
+    help = "Folds pending wizard patches into their base documents"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-patches', type=int, default=1)
+
+    def handle(self, *args, **options):
+        project_ids = WizardDocument.objects.filter(
+            pending_patches__gte=options['min_patches']
+        ).values_list('project_id', flat=True)
+        count = 0
+        for project_id in project_ids.iterator():
+            compact_wizard(project_id)
+            count += 1
+        self.stdout.write(f'Compacted {count} wizard documents')
+"""
+
+# =================
+# PATCH PARSERS - projects/parsers.py
+# =================
+from rest_framework.parsers import JSONParser
+
+
+class JSONPatchParser(JSONParser):
+    media_type = 'application/json-patch+json'
+
+
+class MergePatchParser(JSONParser):
+    media_type = 'application/merge-patch+json'
+
+# =================
+# WIZARD ENDPOINT - projects/views.py
+# =================
+from .json_patch import PatchConflict, PatchError
+from .parsers import JSONPatchParser, MergePatchParser
+from .wizard import (
+    WizardBusy, WizardVersionConflict, get_wizard, parse_if_match, patch_wizard, replace_wizard, wizard_etag,
+)
+
+ACCEPT_PATCH = f'{JSONPatchParser.media_type}, {MergePatchParser.media_type}'
+
+
+class ProjectWizardMixin:
+    """
+    Mix into the projects viewset (GET/PUT/PATCH /api/projects/{id}/wizard/).
+    """
+
+    def _wizard_response(self, data, state, status_code=status.HTTP_200_OK):
+        response = Response(data, status=status_code)
+        response['ETag'] = wizard_etag(state)
+        response['Accept-Patch'] = ACCEPT_PATCH
+        return response
+
+    def _busy(self, exc):
+        response = Response({'error': str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '1'
+        return response
+
+    def _version_conflict(self, exc):
+        return self._wizard_response(
+            {'error': 'Wizard was changed by someone else', 'version': exc.state.version},
+            exc.state, status.HTTP_412_PRECONDITION_FAILED
+        )
+
+    @action(detail=True, methods=['get', 'put', 'patch'],
+            parser_classes=[JSONParser, JSONPatchParser, MergePatchParser])
+    def wizard(self, request, pk=None):
+        """
+        Project wizard document with optimistic concurrency
+        GET   /api/projects/{id}/wizard/  -> document, ETag "wizard-{id}-v{version}"
+        PUT   /api/projects/{id}/wizard/  full document, optional If-Match
+        PATCH /api/projects/{id}/wizard/  application/json-patch+json (RFC 6902) or
+              application/merge-patch+json (RFC 7386) with If-Match; answers
+              {"version"} unless "Prefer: return=representation"
+        Saves are mirrored to project.wizard_data. 503 with Retry-After when
+        compactions keep racing the patch replay.
+        Frontend Integration: projectsAPI.getProjectWizard / patchProjectWizard
+        """
+        project = self.get_object()
+        initial = getattr(project, 'wizard_data', None) or {}
+        expected_version = parse_if_match(request.META.get('HTTP_IF_MATCH'))
+
+        if request.method == 'GET':
+            try:
+                state, document = get_wizard(project.pk, initial)
+            except WizardBusy as exc:
+                return self._busy(exc)
+            if request.META.get('HTTP_IF_NONE_MATCH', '').strip() == wizard_etag(state):
+                return self._wizard_response(None, state, status.HTTP_304_NOT_MODIFIED)
+            return self._wizard_response(document, state)
+
+        if request.method == 'PUT':
+            if not isinstance(request.data, dict):
+                return Response({'error': 'Wizard document must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                state = replace_wizard(project.pk, request.data, expected_version)
+            except WizardVersionConflict as exc:
+                return self._version_conflict(exc)
+            return self._wizard_response({'version': state.version}, state)
+
+        if expected_version is None and getattr(settings, 'WIZARD_PATCH_REQUIRE_IF_MATCH', True):
+            return Response({'error': 'PATCH requires an If-Match header with the wizard ETag'},
+                            status=status.HTTP_428_PRECONDITION_REQUIRED)
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type == MergePatchParser.media_type:
+            patch_format = 'merge-patch'
+        elif content_type == JSONPatchParser.media_type or isinstance(request.data, list):
+            patch_format = 'json-patch'
+        else:
+            patch_format = 'merge-patch'
+
+        try:
+            state, document = patch_wizard(
+                project.pk, patch_format, request.data, expected_version,
+                size=int(request.META.get('CONTENT_LENGTH') or 0),
+                user=get_model_user(request.user), initial=initial,
+            )
+        except WizardVersionConflict as exc:
+            return self._version_conflict(exc)
+        except WizardBusy as exc:
+            return self._busy(exc)
+        except PatchConflict as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        except PatchError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        if 'return=representation' in request.META.get('HTTP_PREFER', ''):
+            return self._wizard_response(document, state)
+        return self._wizard_response({'version': state.version}, state)
+
+# projects/views.py - usage
+"""
+class ProjectViewSet(ProjectWizardMixin, DashboardStatsMixin, viewsets.ModelViewSet):
+    ...
+"""
+
+
+# ==============================================================================
+# ASYNC (ASGI) CATALOG AND AUTH ENDPOINTS
+# ==============================================================================
+
+# =================
+# BOUNDED ASYNC DB ACCESS - core/async_db.py
+# =================
+import asyncio
+
+from django.conf import settings
+
+_db_slots = None
+
+
+def db_slots():
+    """
+    Per-worker cap on concurrent async ORM calls. Keep ASYNC_DB_CONCURRENCY at
+    or below the connection pool's max_size so requests queue here instead of
+    on the pool. Created lazily on the event loop thread, so no lock.
+    """
+    global _db_slots
+    if _db_slots is None:
+        _db_slots = asyncio.Semaphore(getattr(settings, 'ASYNC_DB_CONCURRENCY', 8))
+    return _db_slots
+
+# =================
+# STREAMING RESPONSES UNDER ASGI - core/streaming.py
+# =================
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+_DONE = object()
+
+
+async def _iterate_in_thread(chunks):
+    """
+    Async view of a blocking iterator. Each next() runs in Django's sync
+    thread, so a server-side cursor stays on the connection that opened it.
+    """
+    pull = sync_to_async(next)
+    chunks = iter(chunks)
+    while True:
+        chunk = await pull(chunks, _DONE)
+        if chunk is _DONE:
+            return
+        yield chunk
+
+
+def streaming_response(request, chunks, **kwargs):
+    """
+    StreamingHttpResponse that streams under WSGI and ASGI alike. Django's
+    ASGI handler reads a sync iterator to the end before sending anything,
+    so under ASGI the chunks are handed over through an async iterator.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = _iterate_in_thread(chunks)
+    return StreamingHttpResponse(chunks, **kwargs)
+
+# =================
+# ASYNC JWT AUTH - authentication/async_auth.py
+# =================
+import functools
+
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException, NotAuthenticated
+
+from .authentication import ClaimsJWTAuthentication
+
+
+def _unauthorized(authenticator, request, detail):
+    response = JsonResponse(detail if isinstance(detail, dict) else {'detail': detail}, status=401)
+    response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+    return response
+
+
+def async_jwt_required(view):
+    """
+    ClaimsJWTAuthentication + IsAuthenticated for plain Django async views,
+    with the same 401 bodies DRF sends.
+    """
+    authenticator = ClaimsJWTAuthentication()
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await authenticator.aauthenticate(request)
+        except APIException as exc:  # AuthenticationFailed, InvalidToken
+            return _unauthorized(authenticator, request, exc.detail)
+        if result is None:
+            return _unauthorized(authenticator, request, NotAuthenticated.default_detail)
+        request.user, request.auth = result
+        return await view(request, *args, **kwargs)
+
+    wrapper.csrf_exempt = True
+    return wrapper
+
+# =================
+# ASYNC AUTH VIEWS - authentication/async_views.py
+# =================
+from django.contrib.auth import get_user_model
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from core.async_db import db_slots
+from .async_auth import async_jwt_required
+from .serializers import UserSerializer
+
+
+@async_jwt_required
+async def profile(request):
+    """
+    Get current user profile without holding a worker thread
+    GET /api/auth/profile/
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    async with db_slots():
+        user = await get_user_model().objects.aget(pk=request.user.id)
+    return JsonResponse(UserSerializer(user).data)
+
+# =================
+# ASYNC CATALOG VIEWS - materials/async_views.py
+# =================
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from authentication.async_auth import async_jwt_required
+from core.async_db import db_slots
+from .catalog_cache import (
+    acached_catalog_body, aget_catalog_version, catalog_keys, catalog_response, etag_matches,
+)
+from .filters import TechnologyEntryFilter
+from .models import TechnologyEntry
+from .serializers import TECHNOLOGY_LIST_FIELDS
+from .snapshot import get_catalog_snapshot
+
+# Catalogs returned by /api/materials/bootstrap/, keyed as in the response
+BOOTSTRAP_CATALOGS = (
+    'materials', 'equipment', 'labor', 'technologies', 'costing_rules', 'suitability_criteria',
+)
+
+
+async def _snapshot_rows(name):
+    # Only reached on a rendered-body cache miss; the thread hop covers the
+    # version check and a snapshot rebuild, which reads TechnologyEntry
+    snapshot = await sync_to_async(get_catalog_snapshot)()
+    return snapshot[name].rows()
+
+
+def _technology_rows(filterset):
+    # filterset.qs applies filter_suitability, which asks the matcher for ids
+    # through the ORM off PostgreSQL, so the whole queryset is built and
+    # evaluated here, in a worker thread, rather than on the event loop
+    return list(filterset.qs.values(*TECHNOLOGY_LIST_FIELDS))
+
+
+async def _filtered_technologies(filterset):
+    async with db_slots():
+        return await sync_to_async(_technology_rows)(filterset)
+
+
+def async_catalog_view(name, fallback=None):
+    """
+    Native async GET for one catalog, sharing ETags and cached bodies with the
+    MaterialsViewSet action of the same name. Other methods are handed to
+    `fallback` (the DRF view for the write side) in a worker thread.
+    """
+
+    @async_jwt_required
+    async def get(request):
+        version = await aget_catalog_version()
+        query = request.META.get('QUERY_STRING', '')
+        etag, _ = catalog_keys(name, version, query)
+        if etag_matches(request, etag):
+            return catalog_response(b'', etag, status=304)
+
+        build = functools.partial(_snapshot_rows, name)
+        if name == 'technologies' and query:
+            filterset = TechnologyEntryFilter(
+                request.GET, queryset=TechnologyEntry.objects.order_by('technology_name', 'irrigation_type')
+            )
+            if not await sync_to_async(filterset.is_valid)():
+                return JsonResponse(filterset.errors, status=400)
+            build = functools.partial(_filtered_technologies, filterset)
+        return catalog_response(await acached_catalog_body(name, version, query, build), etag)
+
+    sync_fallback = sync_to_async(fallback) if fallback is not None else None
+
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await get(request)
+        if sync_fallback is None:
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        return await sync_fallback(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    return view
+
+
+@async_jwt_required
+async def catalog_bootstrap(request):
+    """
+    Every catalog the project wizard needs, in one round trip
+    GET /api/materials/bootstrap/
+    {"materials": [...], "equipment": [...], "labor": [...], "technologies": [...],
+     "costing_rules": [...], "suitability_criteria": [...]}
+    The parts are the cached bodies of the single-catalog endpoints, fetched
+    concurrently and spliced together without re-rendering.
+    Frontend Integration: materialsAPI.getCatalogBootstrap (ResourcesSelectionStep.tsx, useTechnologySelection.ts)
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    version = await aget_catalog_version()
+    etag = f'"bootstrap-v{version}"'
+    if etag_matches(request, etag):
+        return catalog_response(b'', etag, status=304)
+
+    bodies = await asyncio.gather(*(
+        acached_catalog_body(name, version, '', functools.partial(_snapshot_rows, name))
+        for name in BOOTSTRAP_CATALOGS
+    ))
+    body = b'{' + b','.join(
+        b'"%s":%s' % (name.encode(), part) for name, part in zip(BOOTSTRAP_CATALOGS, bodies)
+    ) + b'}'
+    return catalog_response(body, etag)
+
+
+# ==============================================================================
+# WORKER STARTUP PROFILING
+# ==============================================================================
+
+# =================
+# STARTUP PROFILE - core/startup_profile.py
+# =================
+# Boots a worker the way the app server does (settings, apps, middleware,
+# URLconf) in a fresh interpreter and reports what each imported module cost.
+# Import time comes from `python -X importtime`; retained memory per module
+# from a second boot under tracemalloc (kept separate because tracing slows
+# every import down).
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+# Paths a new worker must be able to serve before it takes traffic
+STARTUP_PROBE_PATHS = (
+    '/api/auth/login/',
+    '/api/auth/profile/',
+    '/api/materials/bootstrap/',
+    '/api/materials/materials/',
+    '/api/materials/technologies/',
+)
+_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)\s*$')
+
+
+def _max_rss_kb():
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def boot_worker(asgi=False, trace_memory=False):
+    """
+    Child side: start like a worker, resolve the probe paths and return timings
+    (and per-module retained bytes when trace_memory is set).
+    """
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+
+    import django
+    django.setup()
+    if asgi:
+        from django.core.asgi import get_asgi_application
+        get_asgi_application()
+    else:
+        from django.core.wsgi import get_wsgi_application
+        get_wsgi_application()
+
+    from django.urls import Resolver404, resolve
+    unresolved = []
+    for path in STARTUP_PROBE_PATHS:
+        try:
+            resolve(path)
+        except Resolver404:
+            unresolved.append(path)
+
+    result = {
+        'ready_seconds': time.perf_counter() - started,
+        'max_rss_kb': _max_rss_kb(),
+        'module_count': len(sys.modules),
+        'unresolved': unresolved,
+    }
+    if trace_memory:
+        files = {
+            getattr(module, '__file__', None): name
+            for name, module in list(sys.modules.items())
+        }
+        memory = defaultdict(int)
+        for stat in tracemalloc.take_snapshot().statistics('filename'):
+            name = files.get(stat.traceback[0].filename)
+            if name:
+                memory[name] += stat.size
+        result['memory'] = memory
+    return result
+
+
+def _run_child(asgi, trace_memory):
+    command = [sys.executable]
+    if not trace_memory:
+        command += ['-X', 'importtime']
+    command += ['-m', 'core.startup_profile']
+    if asgi:
+        command.append('--asgi')
+    if trace_memory:
+        command.append('--memory')
+    completed = subprocess.run(command, capture_output=True, text=True, env=os.environ.copy())
+    if completed.returncode != 0:
+        raise RuntimeError(f'Worker boot failed:\n{completed.stderr[-4000:]}')
+    return json.loads(completed.stdout), completed.stderr
+
+
+def profile_startup(asgi=False, trace_memory=True):
+    """
+    Parent side: boot fresh workers and merge the reports.
+    Returns {'ready_seconds', 'max_rss_kb', 'module_count', 'unresolved',
+    'modules': [{'module', 'self_ms', 'cumulative_ms', 'memory_bytes'}]}.
+    """
+    report, stderr = _run_child(asgi, trace_memory=False)
+    modules = {}
+    for line in stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            modules[name] = {
+                'module': name,
+                'self_ms': int(self_us) / 1000.0,
+                'cumulative_ms': int(cumulative_us) / 1000.0,
+                'memory_bytes': None,
+            }
+    if trace_memory:
+        memory_report, _ = _run_child(asgi, trace_memory=True)
+        for name, size in memory_report['memory'].items():
+            modules.setdefault(name, {
+                'module': name, 'self_ms': 0.0, 'cumulative_ms': 0.0, 'memory_bytes': None,
+            })['memory_bytes'] = size
+    report['modules'] = list(modules.values())
+    return report
+
+
+def group_by_package(modules):
+    """Sum self time and memory per top-level package"""
+    packages = {}
+    for row in modules:
+        package = row['module'].split('.')[0]
+        totals = packages.setdefault(package, {
+            'module': package, 'self_ms': 0.0, 'cumulative_ms': 0.0, 'memory_bytes': 0,
+        })
+        totals['self_ms'] += row['self_ms']
+        totals['memory_bytes'] += row['memory_bytes'] or 0
+        if row['module'] == package:
+            totals['cumulative_ms'] = row['cumulative_ms']
+    return list(packages.values())
+
+
+if __name__ == '__main__':
+    json.dump(boot_worker(asgi='--asgi' in sys.argv, trace_memory='--memory' in sys.argv), sys.stdout)
+
+# core/management/commands/profile_startup.py
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.startup_profile import group_by_package, profile_startup
+
+SORT_KEYS = {'cumulative': 'cumulative_ms', 'self': 'self_ms', 'memory': 'memory_bytes'}
+
+
+class Command(BaseCommand):
+    help = "Boots a fresh worker and reports import time and memory per module"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='cumulative')
+        parser.add_argument('--limit', type=int, default=30)
+        parser.add_argument('--packages', action='store_true', help='Aggregate by top-level package')
+        parser.add_argument('--asgi', action='store_true', help='Boot the ASGI application instead of WSGI')
+        parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc boot')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        report = profile_startup(asgi=options['asgi'], trace_memory=not options['no_memory'])
+        rows = group_by_package(report['modules']) if options['packages'] else report['modules']
+        key = SORT_KEYS[options['sort']]
+        rows.sort(key=lambda row: row[key] or 0, reverse=True)
+        rows = rows[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({**report, 'modules': rows}, indent=2))
+            return
+
+        rss = report['max_rss_kb']
+        self.stdout.write(
+            f"Worker ready in {report['ready_seconds']:.2f} s, {report['module_count']} modules"
+            + (f", max RSS {rss / 1024:.1f} MB" if rss else '')  # ru_maxrss is KB on Linux
+        )
+        for path in report['unresolved']:
+            self.stdout.write(self.style.WARNING(f'Probe path does not resolve: {path}'))
+        self.stdout.write(f"{'self ms':>9} {'cum ms':>9} {'mem KB':>9}  module")
+        for row in rows:
+            memory = '-' if row['memory_bytes'] is None else f"{row['memory_bytes'] / 1024:.0f}"
+            self.stdout.write(
+                f"{row['self_ms']:9.1f} {row['cumulative_ms']:9.1f} {memory:>9}  {row['module']}"
+            )
+"""
+
+
+# ==============================================================================
+# API BENCHMARKS
+# ==============================================================================
+
+# =================
+# core/management/commands/benchmark_api.py
+# =================
+# python manage.py benchmark_api --technologies 10000 --users 100000 --budgets benchmarks/budgets.json
+import json
+import math
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+
+BENCH_PASSWORD = 'bench-password-123'
+# Version counters and cached bodies stay out of the shared cache, and the
+# catalog snapshots out of CATALOG_SNAPSHOT_DIR, during a run
+BENCH_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-api'},
+}
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the auth and materials endpoints through the Django test client "
+        "against a synthetic dataset in a throwaway test database. Reports p50/p95/p99 "
+        "latency, throughput and queries per endpoint, and exits non-zero when a request "
+        "fails or a budget from --budgets is exceeded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--technologies', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--cold-cache', action='store_true',
+                            help='Bump the catalog version before every catalog request')
+        parser.add_argument('--budgets', help='JSON file: {endpoint: {"p95_ms": x, "max_queries": n}}')
+        parser.add_argument('--save-budgets', help='Write measured p95 (x1.5) and query counts as budgets')
+        parser.add_argument('--json', dest='json_path', help='Write the raw report as JSON')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the test database between runs')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory(prefix='benchmark-snapshots-') as snapshot_dir, \
+                override_settings(CACHES=BENCH_CACHES, CATALOG_SNAPSHOT_DIR=snapshot_dir):
+            setup_test_environment()
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+            try:
+                self.seed(options['technologies'], options['users'])
+                report = self.run_suite(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+                teardown_test_environment()
+
+        self.print_report(report)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as out:
+                json.dump(report, out, indent=2)
+        if options['save_budgets']:
+            budgets = {
+                name: {'p95_ms': round(row['p95_ms'] * 1.5, 3), 'max_queries': row['max_queries']}
+                for name, row in report.items()
+            }
+            with open(options['save_budgets'], 'w') as out:
+                json.dump(budgets, out, indent=2, sort_keys=True)
+        failures = [
+            f"{name}: {row['errors']} of {row['requests']} requests failed"
+            for name, row in report.items() if row['errors']
+        ]
+        if options['budgets']:
+            failures += self.check_budgets(report, options['budgets'])
+        if failures:
+            raise CommandError('Benchmark failed:\n  ' + '\n  '.join(failures))
+
+    def seed(self, technology_count, user_count):
+        from materials.models import TechnologyEntry
+
+        User = get_user_model()
+        password_hash = make_password(BENCH_PASSWORD)
+        roles = ['Admin', 'Engineer', 'Planner', 'Viewer']
+        User.objects.bulk_create(
+            [
+                User(username=f'bench-user-{i}', email=f'bench-user-{i}@example.com',
+                     role=roles[i % len(roles)], password=password_hash)
+                for i in range(user_count)
+            ],
+            batch_size=5000
+        )
+        User.objects.create(username='bench-admin', email='bench-admin@example.com', role='Admin',
+                            password=password_hash, is_staff=True)
+
+        names = [choice for choice, _ in TechnologyEntry.TECHNOLOGY_CHOICES]
+        soils = ['Clay', 'Loam', 'Sandy', 'Silt']
+        crops = ['Rice', 'Wheat', 'Maize', 'Vegetables', 'Fruits', 'Cotton']
+        climates = ['Arid', 'Semi-Arid', 'Tropical', 'Temperate', 'Humid']
+        TechnologyEntry.objects.bulk_create(
+            [
+                TechnologyEntry(
+                    technology_name=names[i % len(names)],
+                    irrigation_type=f'Bench Irrigation {i}',
+                    efficiency=50 + i % 50,
+                    water_requirement=500 + i % 700,
+                    lifespan=5 + i % 20,
+                    maintenance_level=['low', 'medium', 'high'][i % 3],
+                    suitable_soil_types=soils[i % 4:] or soils,
+                    suitable_crop_types=crops[i % 6:i % 6 + 3],
+                    suitable_farm_sizes=['Small (< 2 ha)', 'Medium (2-10 ha)'],
+                    water_quality_requirements=['Fresh Water'],
+                    suitable_topography=['Flat', 'Gentle Slope'][:1 + i % 2],
+                    climate_zones=climates[i % 5:i % 5 + 2],
+                )
+                for i in range(technology_count)
+            ],
+            batch_size=2000
+        )
+
+    def _login(self, client, username):
+        response = client.post('/api/auth/login/', {'username': username, 'password': BENCH_PASSWORD},
+                               content_type='application/json')
+        if response.status_code != 200:
+            raise CommandError(f'Benchmark login failed for {username}: {response.status_code}')
+        return f"Bearer {response.json()['access']}"
+
+    def run_suite(self, options):
+        from materials.catalog_cache import bump_catalog_version
+        from materials.models import TechnologyEntry
+
+        client = Client()
+        admin_auth = self._login(client, 'bench-admin')
+        user_auth = self._login(client, 'bench-user-1')
+        names = [choice for choice, _ in TechnologyEntry.TECHNOLOGY_CHOICES]
+        counter = iter(range(10 ** 9))
+
+        def new_technology():
+            n = next(counter)
+            return {
+                'technology_name': 'pressurized', 'irrigation_type': f'Bench Create {n}',
+                'efficiency': 80, 'water_requirement': 700, 'lifespan': 10, 'maintenance_level': 'medium',
+            }
+
+        def technology_batch():
+            # Half new rows, half updates of seeded ones, as a catalog import sends them
+            return [new_technology() for _ in range(50)] + [
+                {**new_technology(), 'technology_name': names[i % len(names)],
+                 'irrigation_type': f'Bench Irrigation {i}'}
+                for i in range(min(50, options['technologies']))
+            ]
+
+        catalog = ['materials', 'equipment', 'labor', 'technologies', 'costing-rules', 'suitability-criteria']
+        endpoints = [
+            ('login', 'post', '/api/auth/login/', None,
+             lambda: {'username': 'bench-user-2', 'password': BENCH_PASSWORD}),
+            ('profile', 'get', '/api/auth/profile/', user_auth, None),
+            ('users', 'get', '/api/auth/users/', admin_auth, None),
+            ('users_with_count', 'get', '/api/auth/users/?include_count=true', admin_auth, None),
+        ]
+        endpoints += [
+            (f'catalog_{name}', 'get', f'/api/materials/{name}/', user_auth, None) for name in catalog
+        ]
+        endpoints += [
+            ('technologies_filtered', 'get', '/api/materials/technologies/?soil=Loam&maintenance_level=low',
+             user_auth, None),
+            ('technologies_match', 'get', '/api/materials/technologies/match/?soil=Loam&crop=Maize&climate=Arid',
+             user_auth, None),
+            # Writes measure the real upsert path; the per-id PUT/DELETE actions are still stubs
+            ('technology_create', 'post', '/api/materials/technologies/', user_auth, new_technology),
+            ('technology_bulk_upsert', 'post', '/api/materials/technologies/', user_auth, technology_batch),
+        ]
+
+        report = {}
+        for name, method, url, auth, body in endpoints:
+            headers = {'HTTP_AUTHORIZATION': auth} if auth else {}
+            cold = options['cold_cache'] and name.startswith('catalog_')
+
+            def call():
+                if cold:
+                    bump_catalog_version()
+                kwargs = dict(headers)
+                if body is not None:
+                    kwargs.update(data=json.dumps(body()), content_type='application/json')
+                return getattr(client, method)(url, **kwargs)
+
+            for _ in range(options['warmup']):
+                call()
+            samples, max_queries, errors = [], 0, 0
+            started = time.perf_counter()
+            for _ in range(options['iterations']):
+                with CaptureQueriesContext(connection) as queries:
+                    t0 = time.perf_counter()
+                    response = call()
+                    samples.append((time.perf_counter() - t0) * 1000.0)
+                max_queries = max(max_queries, len(queries))
+                errors += response.status_code >= 400
+            elapsed = time.perf_counter() - started
+            samples.sort()
+            report[name] = {
+                'requests': len(samples),
+                'errors': errors,
+                'p50_ms': round(percentile(samples, 50), 3),
+                'p95_ms': round(percentile(samples, 95), 3),
+                'p99_ms': round(percentile(samples, 99), 3),
+                'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+                'max_queries': max_queries,
+            }
+        return report
+
+    def print_report(self, report):
+        header = f"{'endpoint':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'queries':>9}{'errors':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, row in report.items():
+            self.stdout.write(
+                f"{name:<26}{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}{row['p99_ms']:>10.3f}"
+                f"{row['throughput_rps']:>10.1f}{row['max_queries']:>9}{row['errors']:>8}"
+            )
+
+    def check_budgets(self, report, path):
+        """Budget breaches as messages; reports success when there are none"""
+        with open(path) as budget_file:
+            budgets = json.load(budget_file)
+        failures = []
+        for name, budget in budgets.items():
+            row = report.get(name)
+            if row is None:
+                failures.append(f'{name}: no measurement')
+                continue
+            if 'p95_ms' in budget and row['p95_ms'] > budget['p95_ms']:
+                failures.append(f"{name}: p95 {row['p95_ms']}ms > budget {budget['p95_ms']}ms")
+            if 'max_queries' in budget and row['max_queries'] > budget['max_queries']:
+                failures.append(f"{name}: {row['max_queries']} queries > budget {budget['max_queries']}")
+        if not failures:
+            self.stdout.write(self.style.SUCCESS(f'All {len(budgets)} budgets met'))
+        return failures
+
+
+# ==============================================================================
+# URL PATTERNS - Update your urls.py files
+# ==============================================================================
+
+# materials/urls.py - Update your existing materials URLs
+# Catalog GETs are served by the async views; writes on the same paths go to
+# the MaterialsViewSet actions. These paths must precede the router include.
+"""
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .async_views import async_catalog_view, catalog_bootstrap
+from .views import MaterialsViewSet
+
+router = DefaultRouter()
+router.register(r'', MaterialsViewSet, basename='materials')
+
+urlpatterns = [
+    path('bootstrap/', catalog_bootstrap),
+    path('materials/', async_catalog_view('materials')),
+    path('equipment/', async_catalog_view('equipment')),
+    path('labor/', async_catalog_view('labor')),
+    path('technologies/', async_catalog_view(
+        'technologies', MaterialsViewSet.as_view({'post': 'create_technology'}))),
+    path('costing-rules/', async_catalog_view(
+        'costing_rules', MaterialsViewSet.as_view({'post': 'costing_rules'}))),
+    path('suitability-criteria/', async_catalog_view(
+        'suitability_criteria', MaterialsViewSet.as_view({'post': 'suitability_criteria'}))),
+    path('', include(router.urls)),
+]
+"""
+
+# authentication/urls.py - async profile ahead of the AuthViewSet routes
+"""
 urlpatterns = [
+    path('profile/', async_views.profile),  # from . import async_views
     path('', include(router.urls)),
 ]
 """
@@ -590,6 +6948,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('authentication.urls')),
     path('api/materials/', include('materials.urls')),  # All resources go through materials
+    path('api/metrics/', metrics_view),  # from core.instrumentation import metrics_view
     # ... other patterns
 ]
 """
\ No newline at end of file
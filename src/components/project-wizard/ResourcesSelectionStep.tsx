@@ -30,11 +30,11 @@ const ResourcesSelectionStep: React.FC<ResourcesSelectionStepProps> = ({ data, o
   const loadResourcesData = async () => {
     try {
       setLoading(true);
-      const [materialsData, equipmentData, laborData] = await Promise.all([
-        materialsAPI.getMaterials(),
-        materialsAPI.getEquipment(),
-        materialsAPI.getLaborRates(),
-      ]);
+      const {
+        materials: materialsData,
+        equipment: equipmentData,
+        labor: laborData,
+      } = await materialsAPI.getCatalogBootstrap();
 
       setMaterials(Array.isArray(materialsData) ? materialsData : (materialsData as any)?.results || []);
       setEquipment(Array.isArray(equipmentData) ? equipmentData : (equipmentData as any)?.results || []);
@@ -12,7 +12,11 @@ export const useTechnologySelection = () => {
     const fetchTechnologies = async () => {
       try {
         setLoading(true);
-        const data = await materialsAPI.getTechnologies();
+        // Reuse the wizard's bootstrap request when one is in flight
+        const pendingBootstrap = materialsAPI.getPendingCatalogBootstrap();
+        const data = pendingBootstrap
+          ? (await pendingBootstrap).technologies
+          : await materialsAPI.getTechnologies();
         setTechnologies(data as TechnologyEntry[]);
       } catch (error) {
         console.error('Failed to load technology options:', error);
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -25,33 +25,60 @@ const UserManagement = () => {
   const [loading, setLoading] = useState(false);
   const { toast } = useToast();
   const [users, setUsers] = useState<any[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [totalUsers, setTotalUsers] = useState<number | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Id of the latest users request; responses to older ones are dropped
+  const latestRequest = useRef(0);
+
+  // Search and role filtering run on the server, so they cover every user,
+  // not just the pages loaded so far
+  const fetchUsers = async (cursor?: string) => {
+    const requestId = ++latestRequest.current;
+    let response;
+    try {
+      response = await authAPI.getUsers({
+        cursor,
+        search: searchTerm.trim() || undefined,
+        role: roleFilter,
+        include_count: !cursor,
+      });
+    } catch (err) {
+      if (requestId === latestRequest.current) throw err;
+      return;
+    }
+    // A newer search, filter or refresh started meanwhile: this page is stale
+    if (requestId !== latestRequest.current) return;
+    const results = Array.isArray(response) ? response : response?.results ?? [];
+    setUsers(prev => (cursor ? [...prev, ...results] : results));
+    setNextCursor(Array.isArray(response) ? null : response?.next_cursor ?? null);
+    if (!cursor) setTotalUsers(Array.isArray(response) ? results.length : response?.count ?? null);
+  };
 
   useEffect(() => {
-    const fetchUsers = async () => {
-      try {
-        // Fetch users from backend
-        const response = await authAPI.getUsers();
-        // Try to handle paginated or flat array
-        if (Array.isArray(response)) {
-          setUsers(response);
-        } else if (response && Array.isArray((response as any).results)) {
-          setUsers((response as any).results);
-        } else {
-          setUsers([]);
-        }
-      } catch (err: any) {
+    // The cursor belongs to the previous search/filter: hide "Load more" and
+    // drop any page of it still in flight until the new first page arrives
+    latestRequest.current += 1;
+    setNextCursor(null);
+    const timer = setTimeout(() => {
+      fetchUsers().catch(() => {
         toast({ title: 'Error', description: 'Failed to fetch users', variant: 'destructive' });
-      }
-    };
-    fetchUsers();
-  }, []);
+      });
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm, roleFilter]);
 
-  const filteredUsers = users.filter(user => {
-    const matchesSearch = (user.username?.toLowerCase() || '').includes(searchTerm.toLowerCase()) ||
-                         (user.email?.toLowerCase() || '').includes(searchTerm.toLowerCase());
-    const matchesRole = roleFilter === 'all' || (user.role?.toLowerCase() === roleFilter.toLowerCase());
-    return matchesSearch && matchesRole;
-  });
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      await fetchUsers(nextCursor);
+    } catch (err: any) {
+      toast({ title: 'Error', description: 'Failed to fetch users', variant: 'destructive' });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const getRoleBadgeColor = (role: string) => {
     switch (role) {
@@ -82,14 +109,7 @@ const UserManagement = () => {
       setShowAddUser(false);
       setAddUserForm({ username: '', email: '', first_name: '', last_name: '', role: 'Viewer', password: '' });
       // Refresh user list from backend
-      const response = await authAPI.getUsers();
-      if (Array.isArray(response)) {
-        setUsers(response);
-      } else if (response && Array.isArray((response as any).results)) {
-        setUsers((response as any).results);
-      } else {
-        setUsers([]);
-      }
+      await fetchUsers();
     } catch (err: any) {
       toast({ title: 'Registration failed', description: err?.response?.data?.error || err.message, variant: 'destructive' });
     } finally {
@@ -179,14 +199,14 @@ const UserManagement = () => {
         <CardHeader>
           <div className="flex items-center justify-between">
             <div>
-              <CardTitle>Users ({filteredUsers.length})</CardTitle>
+              <CardTitle>Users ({totalUsers ?? users.length})</CardTitle>
               <CardDescription>Manage user accounts and permissions</CardDescription>
             </div>
           </div>
         </CardHeader>
         <CardContent>
           <div className="space-y-4">
-            {filteredUsers.map((user) => (
+            {users.map((user) => (
               <div key={user.id} className="flex items-center justify-between p-4 bg-stone-50 rounded-lg hover:bg-stone-100 transition-colors">
                 <div className="flex items-center space-x-4">
                   <Avatar className="w-12 h-12">
@@ -217,6 +237,13 @@ const UserManagement = () => {
                 </div>
               </div>
             ))}
+            {nextCursor && (
+              <div className="flex justify-center">
+                <Button variant="outline" onClick={handleLoadMore} disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </Button>
+              </div>
+            )}
           </div>
         </CardContent>
       </Card>
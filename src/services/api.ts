@@ -133,11 +133,42 @@ export const authAPI = {
   },
 
   /**
-   * Get all users (admin only)
-   * Django endpoint: GET /api/auth/users/
+   * Admin bulk registration from a CSV file or an array of users
+   * Django endpoint: POST /api/auth/register/bulk/
+   */
+  bulkRegisterUsers: async (users: File | any[]) => {
+    if (users instanceof File) {
+      const formData = new FormData();
+      formData.append('file', users);
+      const response = await api.post('/auth/register/bulk/', formData, {
+        headers: {
+          'Content-Type': 'multipart/form-data',
+        },
+      });
+      return response.data;
+    }
+    const response = await api.post('/auth/register/bulk/', users);
+    return response.data;
+  },
+
+  /**
+   * Get users, one cursor page at a time (admin only)
+   * Django endpoint: GET /api/auth/users/?cursor=...&page_size=...&include_count=...&search=...&role=...
    */
-  getUsers: async () => {
-    const response = await api.get('/auth/users/');
+  getUsers: async (params?: {
+    cursor?: string;
+    page_size?: number;
+    include_count?: boolean;
+    search?: string;
+    role?: string;
+  }) => {
+    const query = new URLSearchParams();
+    if (params?.cursor) query.append('cursor', params.cursor);
+    if (params?.search) query.append('search', params.search);
+    if (params?.role && params.role !== 'all') query.append('role', params.role);
+    if (params?.page_size) query.append('page_size', String(params.page_size));
+    if (params?.include_count) query.append('include_count', 'true');
+    const response = await api.get(`/auth/users/?${query.toString()}`);
     return response.data;
   },
 };
@@ -145,15 +176,22 @@ export const authAPI = {
 // GIS Planning API
 export const gisAPI = {
   /**
-   * Upload shapefile
+   * Upload shapefile (.shp/.shx/.dbf/.prj or one .zip) - imported in the background
    * Django endpoint: POST /api/gis/shapefiles/
+   * Returns the import job (202); poll getShapefileJob(job.id) for progress
    */
-  uploadShapefile: async (files: FileList) => {
+  uploadShapefile: async (
+    files: FileList,
+    options?: { project_id?: string; irrigation_type?: string; crop_type?: string; status?: string }
+  ) => {
     const formData = new FormData();
     Array.from(files).forEach(file => {
       formData.append('files', file);
     });
-    
+    Object.entries(options || {}).forEach(([key, value]) => {
+      if (value) formData.append(key, value);
+    });
+
     const response = await api.post('/gis/shapefiles/', formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
@@ -162,6 +200,15 @@ export const gisAPI = {
     return response.data;
   },
 
+  /**
+   * Get shapefile import progress
+   * Django endpoint: GET /api/gis/shapefiles/jobs/{job_id}/
+   */
+  getShapefileJob: async (jobId: string) => {
+    const response = await api.get(`/gis/shapefiles/jobs/${jobId}/`);
+    return response.data;
+  },
+
   /**
    * Get project zones
    * Django endpoint: GET /api/gis/zones/
@@ -197,6 +244,16 @@ export const gisAPI = {
   deleteZone: async (zoneId: string) => {
     await api.delete(`/gis/zones/${zoneId}/`);
   },
+
+  /**
+   * Vector tile URL template for zones (layer "zones", Mapbox Vector Tiles)
+   * Django endpoint: GET /api/gis/tiles/{z}/{x}/{y}.mvt
+   * Send the Authorization header through the tile layer's fetch options.
+   */
+  getZoneTileUrl: (projectId?: string) => {
+    const params = projectId ? `?project_id=${projectId}` : '';
+    return `${API_BASE_URL}/gis/tiles/{z}/{x}/{y}.mvt${params}`;
+  },
 };
 
 // BOQ Builder API
@@ -277,11 +334,13 @@ export const boqAPI = {
   },
 
   /**
-   * Export BOQ analysis
-   * Django endpoint: GET /api/boq/analyses/{id}/export_boq/
+   * Export BOQ analysis (streamed file download)
+   * Django endpoint: GET /api/boq/analyses/{id}/export_boq/?export=csv|xlsx
    */
-  exportBOQ: async (analysisId: string, format: 'pdf' | 'excel') => {
-    const response = await api.get(`/boq/analyses/${analysisId}/export_boq/?format=${format}`);
+  exportBOQ: async (analysisId: string, format: 'csv' | 'xlsx' | 'excel') => {
+    const response = await api.get<Blob>(`/boq/analyses/${analysisId}/export_boq/?export=${format}`, {
+      responseType: 'blob',
+    });
     return response.data;
   },
 
@@ -347,6 +406,15 @@ export const projectsAPI = {
     return response.data;
   },
 
+  /**
+   * Get project wizard data with its ETag for patchProjectWizard
+   * Django endpoint: GET /api/projects/{id}/wizard/
+   */
+  getProjectWizardVersioned: async (projectId: string) => {
+    const response = await api.get(`/projects/${projectId}/wizard/`);
+    return { data: response.data, etag: response.headers['etag'] as string };
+  },
+
   /**
    * Update project wizard data
    * Django endpoint: PUT /api/projects/{id}/wizard/
@@ -356,6 +424,22 @@ export const projectsAPI = {
     return response.data;
   },
 
+  /**
+   * Save only the changed parts of the wizard. `patch` is a JSON Patch
+   * operation array or a merge patch object (see utils/wizard-patch.ts);
+   * a 412 response means the wizard changed since `etag` was read.
+   * Django endpoint: PATCH /api/projects/{id}/wizard/
+   */
+  patchProjectWizard: async (projectId: string, patch: any, etag: string) => {
+    const response = await api.patch(`/projects/${projectId}/wizard/`, patch, {
+      headers: {
+        'Content-Type': Array.isArray(patch) ? 'application/json-patch+json' : 'application/merge-patch+json',
+        'If-Match': etag,
+      },
+    });
+    return { version: response.data.version as number, etag: response.headers['etag'] as string };
+  },
+
   /**
    * Submit project for approval
    * Django endpoint: POST /api/projects/{id}/submit/
@@ -375,8 +459,34 @@ export const projectsAPI = {
   },
 };
 
+// Concurrent callers on one page load share a single bootstrap request
+let catalogBootstrapRequest: Promise<any> | null = null;
+
 // Materials API - All resources, technologies, equipment, labor consolidated
 export const materialsAPI = {
+  /**
+   * Get every catalog the project wizard needs in one request
+   * Django endpoint: GET /api/materials/bootstrap/
+   * Returns { materials, equipment, labor, technologies, costing_rules, suitability_criteria }
+   */
+  getCatalogBootstrap: async () => {
+    if (!catalogBootstrapRequest) {
+      catalogBootstrapRequest = api
+        .get('/materials/bootstrap/')
+        .then((response) => response.data)
+        .finally(() => {
+          catalogBootstrapRequest = null;
+        });
+    }
+    return catalogBootstrapRequest;
+  },
+
+  /**
+   * The bootstrap request already in flight, if any - lets a hook that needs
+   * one catalog piggyback on it instead of fetching the whole bundle
+   */
+  getPendingCatalogBootstrap: (): Promise<any> | null => catalogBootstrapRequest,
+
   /**
    * Get materials
    * Django endpoint: GET /api/materials/materials/
@@ -413,6 +523,28 @@ export const materialsAPI = {
     return response.data;
   },
 
+  /**
+   * Match site conditions against technology suitability criteria
+   * Django endpoint: GET /api/materials/technologies/match/
+   */
+  matchTechnologies: async (site: {
+    soil?: string;
+    crop?: string;
+    farm_size?: string;
+    water_quality?: string;
+    topography?: string;
+    climate?: string;
+    min_score?: number;
+    limit?: number;
+  }) => {
+    const params = new URLSearchParams();
+    Object.entries(site).forEach(([key, value]) => {
+      if (value !== undefined && value !== '') params.append(key, String(value));
+    });
+    const response = await api.get(`/materials/technologies/match/?${params.toString()}`);
+    return response.data;
+  },
+
   /**
    * Create irrigation technology
    * Django endpoint: POST /api/materials/technologies/
@@ -422,6 +554,15 @@ export const materialsAPI = {
     return response.data;
   },
 
+  /**
+   * Bulk upsert irrigation technologies (conflicts on name + type update)
+   * Django endpoint: POST /api/materials/technologies/ with a JSON array
+   */
+  bulkUpsertTechnologies: async (rows: any[]) => {
+    const response = await api.post('/materials/technologies/', rows);
+    return response.data;
+  },
+
   /**
    * Update irrigation technology
    * Django endpoint: PUT /api/materials/technologies/{id}/
@@ -439,6 +580,96 @@ export const materialsAPI = {
     await api.delete(`/materials/technologies/${id}/`);
   },
 
+  /**
+   * Cost BOQ lines for one or many projects with catalog prices and costing rules
+   * Django endpoint: POST /api/materials/boq-costing/
+   */
+  costBOQ: async (payload: { projects: any[]; rules?: any[]; include_lines?: boolean }) => {
+    const response = await api.post('/materials/boq-costing/', payload);
+    return response.data;
+  },
+
+  /**
+   * Crop water requirements (FAO-56 ET0, Kc curves, technology efficiency) for many zones and crops
+   * Django endpoint: POST /api/materials/cwr/
+   */
+  calculateCropWaterRequirements: async (payload: {
+    climate: Record<string, any>;
+    zones: any[];
+    effective_rainfall_fraction?: number;
+    include_daily?: boolean;
+  }) => {
+    const response = await api.post('/materials/cwr/', payload);
+    return response.data;
+  },
+
+  /**
+   * Hydraulic design: friction losses, pressure profiles and cheapest catalog pipe per lateral/main
+   * Django endpoint: POST /api/materials/hydraulic-design/
+   */
+  designHydraulics: async (payload: {
+    runs: any[];
+    method?: 'darcy-weisbach' | 'hazen-williams';
+    pipes?: any[];
+    include_profile?: boolean;
+  }) => {
+    const response = await api.post('/materials/hydraulic-design/', payload);
+    return response.data;
+  },
+
+  /**
+   * Technology x region x farm size what-if sweep, streamed as NDJSON
+   * Django endpoint: POST /api/materials/scenarios/sweep/
+   * onEvent receives each progress/result/summary line as it arrives; resolves with the ranked results
+   */
+  runScenarioSweep: async (
+    payload: {
+      project: Record<string, any>;
+      farm_sizes: { label: string; area: number }[];
+      regions?: string[];
+      technology_ids?: number[];
+      rank_by?: 'suitability' | 'cost' | 'water';
+      min_suitability?: number;
+      limit?: number;
+    },
+    onEvent?: (event: any) => void
+  ) => {
+    const token = localStorage.getItem('auth_token');
+    const response = await fetch(`${API_BASE_URL}/materials/scenarios/sweep/`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+      body: JSON.stringify(payload),
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Scenario sweep failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const results: any[] = [];
+    let buffer = '';
+    const handleLine = (line: string) => {
+      if (!line.trim()) return;
+      const event = JSON.parse(line);
+      if (event.type === 'error') throw new Error(event.error);
+      if (event.type === 'result') results.push(event);
+      onEvent?.(event);
+    };
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop() || '';
+      lines.forEach(handleLine);
+    }
+    handleLine(buffer);
+    return results;
+  },
+
   /**
    * Suitability Criteria CRUD
    * Django endpoint: /api/materials/suitability-criteria/
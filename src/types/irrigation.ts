@@ -106,4 +106,8 @@ export interface DashboardStats {
   viewer_reports_available?: number;
   viewer_locations_covered?: number;
   viewer_last_updated?: string;
+  total_area?: number;
+  projects_by_status?: { status: string; count: number; total_area: number }[];
+  projects_by_irrigation_type?: { irrigation_type: string; count: number; total_area: number }[];
+  projects_by_zone?: { zone: string; count: number; total_area: number }[];
 }
@@ -0,0 +1,22 @@
+const isObject = (value: unknown): value is Record<string, unknown> =>
+  typeof value === 'object' && value !== null && !Array.isArray(value);
+
+/**
+ * JSON Merge Patch (RFC 7386) turning `previous` into `next`.
+ * Returns undefined when nothing changed; removed keys become null.
+ */
+export const createMergePatch = (previous: unknown, next: unknown): unknown => {
+  if (!isObject(previous) || !isObject(next)) {
+    return JSON.stringify(previous) === JSON.stringify(next) ? undefined : next;
+  }
+  const patch: Record<string, unknown> = {};
+  for (const key of Object.keys(previous)) {
+    if (!(key in next) || next[key] === undefined) patch[key] = null;
+  }
+  for (const [key, value] of Object.entries(next)) {
+    if (value === undefined) continue;
+    const change = key in previous ? createMergePatch(previous[key], value) : value;
+    if (change !== undefined) patch[key] = change;
+  }
+  return Object.keys(patch).length ? patch : undefined;
+};